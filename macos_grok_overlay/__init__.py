@@ -5,11 +5,22 @@ macOS Grok Overlay - A macOS overlay app for Grok.
 import os
 DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 ABOUT_DIR = os.path.join(DIRECTORY, "about")
-with open(os.path.join(ABOUT_DIR,"version.txt")) as f:
-    __version__ = f.read().strip()
-with open(os.path.join(ABOUT_DIR,"author.txt")) as f:
-    __author__ = f.read().strip()
 
 __all__ = ["main"]
 
-from .main import main
+
+# Read the package information and import the entry point only when first used (so that
+# importing the package, e.g. for `grok --check-permissions`, stays cheap).
+def __getattr__(name):
+    if name == "__version__":
+        with open(os.path.join(ABOUT_DIR,"version.txt")) as f:
+            value = f.read().strip()
+    elif name == "__author__":
+        with open(os.path.join(ABOUT_DIR,"author.txt")) as f:
+            value = f.read().strip()
+    elif name == "main":
+        from .main import main as value
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
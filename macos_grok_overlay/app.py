@@ -1,14 +1,23 @@
 # Python libraries
+import functools
+import json
 import os
 import sys
 
+# Local libraries (imported first, so that the Apple framework imports can be traced)
+from .tracing import TRACER
+
 # Apple libraries
 import objc
-from AppKit import *
-from WebKit import *
-from Quartz import *
-from Foundation import NSObject, NSURL, NSURLRequest, NSDate
-import AVFoundation
+with TRACER.span("import AppKit", "import"):
+    from AppKit import *
+with TRACER.span("import WebKit", "import"):
+    from WebKit import *
+with TRACER.span("import Quartz", "import"):
+    from Quartz import *
+from Foundation import NSBundle, NSObject, NSURL, NSURLRequest
+with TRACER.span("import AVFoundation", "import"):
+    import AVFoundation
 
 
 def request_microphone_permission():
@@ -20,15 +29,23 @@ def request_microphone_permission():
         # Request permission
         AVFoundation.AVCaptureDevice.requestAccessForMediaType_completionHandler_(
             AVFoundation.AVMediaTypeAudio,
-            lambda granted: print(f"Microphone permission {'granted' if granted else 'denied'}")
+            lambda granted: LOGGER.info(f"Microphone permission {'granted' if granted else 'denied'}")
         )
     elif auth_status == AVFoundation.AVAuthorizationStatusAuthorized:
-        print("Microphone permission already granted")
+        LOGGER.info("Microphone permission already granted")
     else:
-        print("Microphone permission denied. Please enable in System Settings > Privacy & Security > Microphone")
+        LOGGER.warning("Microphone permission denied. Please enable in System Settings > Privacy & Security > Microphone")
+
 
+# Get an (opaque) NSColor for an (r, g, b) tuple, reusing previously created colors.
+@functools.lru_cache(maxsize=64)
+def ns_color_for_rgb(rgb):
+    r, g, b = rgb
+    return NSColor.colorWithCalibratedRed_green_blue_alpha_(r, g, b, 1.0)
 
-# UI Delegate to handle permission requests (microphone, camera, etc.)
+
+# UI Delegate to handle permission requests (microphone, camera, etc.) and popups. Its
+# `app` is the application delegate (which owns the popup windows).
 class WebViewUIDelegate(NSObject):
     # Handle media capture permission requests (microphone, camera)
     # This method is called when a webpage requests access to microphone/camera
@@ -39,26 +56,157 @@ class WebViewUIDelegate(NSObject):
         # Call the decision handler to grant permission
         decisionHandler(1)
 
+    # Handle links opening a new window (target="_blank", window.open).
+    def webView_createWebViewWithConfiguration_forNavigationAction_windowFeatures_(self, webView, configuration, navigationAction, windowFeatures):
+        return self.app.openPopup(webView, configuration, navigationAction)
+
+    # Handle window.close() in a popup.
+    def webViewDidClose_(self, webView):
+        self.app.closePopup(webView)
+
+    # Popup window closed by the user.
+    def windowWillClose_(self, notification):
+        self.app.forgetPopup(notification.object())
+
+# Download delegate for the overlay webviews. Its `app` is the application delegate
+# (which keeps track of the downloads, see DownloadManager). Web downloads are handed
+# over to a StreamingDownload (WebKit's download is then cancelled), others (e.g., blob:
+# URLs of generated files) are saved by WebKit.
+class WebViewDownloadDelegate(NSObject):
+    # Download to a temporary file in the download folder (renamed when finished).
+    def download_decideDestinationUsingResponse_suggestedFilename_completionHandler_(self, download, response, suggestedFilename, completionHandler):
+        temp_path = self.app.downloadStarted(download, response, suggestedFilename)
+        completionHandler(None if temp_path is None else NSURL.fileURLWithPath_(temp_path))
+
+    def downloadDidFinish_(self, download):
+        self.app.downloadFinished(download)
+
+    def download_didFailWithError_resumeData_(self, download, error, resumeData):
+        self.app.downloadFailed(download, error.localizedDescription(), resumeData)
+
+# Navigation delegate for popup webviews (e.g., sign-in windows). It applies the link and
+# download policies of the overlay, without the page load bookkeeping of the overlay
+# webview (timings, warmth, low power). Its `app` is the application delegate.
+class PopupNavigationDelegate(NSObject):
+    def webView_decidePolicyForNavigationAction_decisionHandler_(self, webview, navigationAction, decisionHandler):
+        self.app.decideNavigationAction(navigationAction, decisionHandler)
+
+    def webView_decidePolicyForNavigationResponse_decisionHandler_(self, webview, navigationResponse, decisionHandler):
+        self.app.decideNavigationResponse(navigationResponse, decisionHandler)
+
+    def webView_navigationAction_didBecomeDownload_(self, webview, navigationAction, download):
+        download.setDelegate_(self.app.download_delegate)
+
+    def webView_navigationResponse_didBecomeDownload_(self, webview, navigationResponse, download):
+        download.setDelegate_(self.app.download_delegate)
+
 # Local libraries
+from .bridge import (
+    BRIDGE_HANDLER_NAME,
+    BRIDGE_SCRIPT,
+    MessageRouter,
+    log_page_error,
+)
+from .colors import parse_css_color
 from .constants import (
     APP_TITLE,
+    BACKGROUND_COLOR_DEBOUNCE_MS,
     CORNER_RADIUS,
     DRAG_AREA_HEIGHT,
     LOGO_BLACK_PATH,
     LOGO_WHITE_PATH,
     FRAME_SAVE_NAME,
+    HANG_CHECK_INTERVAL,
+    HANG_REPORT_INTERVAL,
+    HANG_THRESHOLD,
+    LOW_POWER_GRACE,
+    LAUNCHER_TRIGGER,
+    POPUP_WINDOW_SIZE,
+    RECLAIM_CHECK_INTERVAL,
+    STARTUP_BENCHMARK_TIMEOUT,
     STATUS_ITEM_CONTEXT,
     WEBSITE,
 )
+from .contentrules import (
+    ContentRuleListLoader,
+    WebKitRuleListStore,
+    load_content_rules,
+)
+from .downloads import (
+    STREAMED_SCHEMES,
+    DownloadManager,
+    StreamingDownload,
+    cookie_header,
+)
+from .control import (
+    ControlServer,
+)
+from .hang_detector import (
+    HangDetector,
+    appkit_post,
+)
+from .health_checks import (
+    HANG_REPORT_PATH,
+    record_clean_exit,
+)
 from .launcher import (
     install_startup,
+    started_by_launch_agent,
     uninstall_startup,
 )
+from .linkpolicy import (
+    POLICY_EXTERNAL,
+    LinkPolicy,
+)
+from .logs import (
+    dropped_records,
+    get_logger,
+)
 from .listener import (
-    global_show_hide_listener,
     load_custom_launcher_trigger,
+    save_custom_launcher_trigger,
     set_custom_launcher_trigger,
 )
+from .hotkeys import (
+    start_hotkey_backend,
+)
+from .settings import (
+    load_settings,
+)
+from .startup import (
+    PRIORITY_HIGH,
+    PRIORITY_IDLE,
+    PRIORITY_NORMAL,
+    AppKitRunLoop,
+    StartupScheduler,
+)
+from .lowpower import (
+    POWER_SCRIPT,
+    LowPowerController,
+)
+from .reclaim import (
+    PRESSURE_WARNING,
+    SAVE_STATE_SCRIPT,
+    MemoryMonitor,
+    WebContentReclaimer,
+    restore_state_script,
+)
+from .telemetry import (
+    PAGE_TIMING_SCRIPT,
+    NavigationTimer,
+    PageLoadRecorder,
+    PageTimingStore,
+)
+from .warmth import (
+    WarmthController,
+)
+from .webdata import (
+    WebDataClearer,
+    WebKitDataStore,
+    web_data_directories,
+)
+
+LOGGER = get_logger(__name__)
 
 
 # Custom window (contains entire application).
@@ -127,10 +275,77 @@ class DragArea(NSView):
 
 # The main delegate for running the overlay app.
 class AppDelegate(NSObject):
-    # The main application setup.
+    # The main application setup. The window (and, unless the warmth policy is "lazy", the
+    # webview) are built right away for the first paint, everything else is scheduled as
+    # named startup tasks.
     def applicationDidFinishLaunching_(self, notification):
+        TRACER.begin("applicationDidFinishLaunching_")
+        self.settings = getattr(self, "settings", None) or load_settings()
+        self.benchmark_startup = getattr(self, "benchmark_startup", False)
+        self.startup_complete = False
+        self.first_navigation_done = False
+        self.webview = None
+        self.placeholder = None
+        self.overlay_hidden = False
+        self.warmth = WarmthController(self.settings["warmth"], self)
+        self.low_power = None
+        if self.settings["low_power"]:
+            self.low_power = LowPowerController(self.runPageScript, AppKitRunLoop().call_later, grace=LOW_POWER_GRACE)
+        self.snapshot_view = None
+        self.restore_state = None
+        self.reclaimer = None
+        if self.settings["reclaim_after_hidden_min"] or self.settings["reclaim_on_memory_pressure"]:
+            self.reclaimer = WebContentReclaimer(
+                self, MemoryMonitor(),
+                hidden_after=60.0 * float(self.settings["reclaim_after_hidden_min"] or 0),
+                pressure_level=PRESSURE_WARNING if self.settings["reclaim_on_memory_pressure"] else None,
+            )
+        self.page_timings = PageTimingStore()
+        # One record per page load, with both the native and the page's own phases.
+        self.page_loads = PageLoadRecorder(self.page_timings, AppKitRunLoop().call_later)
+        self.link_policy = LinkPolicy.from_settings(self.settings)
+        self.popups = []
+        self.downloads = DownloadManager(self.settings["download_folder"])
+        self.active_downloads = {}  # Download ID -> WKDownload.
+        self.streaming_downloads = {}  # Download ID -> StreamingDownload.
+        self.download_delegate = WebViewDownloadDelegate.alloc().init()
+        self.download_delegate.app = self
+        self.popup_navigation_delegate = PopupNavigationDelegate.alloc().init()
+        self.popup_navigation_delegate.app = self
+        self.navigation_timer = NavigationTimer()
+        self.startup = StartupScheduler(AppKitRunLoop(), on_complete=self.startupDidComplete, tracer=TRACER)
         # Run as regular app (shows in Dock)
         NSApp.setActivationPolicy_(NSApplicationActivationPolicyRegular)
+        self.startup.run_now("window", self.createWindow)
+        # Look up (or compile) the content blocking rules, the page loads once they are attached.
+        self.content_rules = None
+        if self.settings["content_blocking"]:
+            self.content_rules = ContentRuleListLoader(WebKitRuleListStore(), load_content_rules())
+            self.startup.run_now("content-rules", self.content_rules.start)
+        self.startup.run_now("webview", self.warmth.launch)
+        # Start loading the website as soon as possible (loading is asynchronous).
+        self.startup.add("load-website", self.warmth.preload, PRIORITY_HIGH, after=["webview"])
+        # Make sure this window is shown and focused (a lazy overlay started at login
+        # instead waits for the first hotkey).
+        show_at_launch = (self.warmth.policy != "lazy") or (not started_by_launch_agent())
+        self.startup.add("show-window", (lambda: self.showWindow_(None)) if show_at_launch else None, PRIORITY_HIGH, after=["window", "webview"])
+        self.startup.add("hotkeys", self.startHotkeys, PRIORITY_NORMAL, after=["window", "webview"])
+        # Everything else waits until after the window has been shown.
+        self.startup.add("status-item", self.createStatusItem, PRIORITY_IDLE, after=["show-window"])
+        self.startup.add("menus", self.createMenus, PRIORITY_IDLE, after=["status-item", "hotkeys"])
+        self.startup.add("microphone-permission", request_microphone_permission, PRIORITY_IDLE, after=["show-window"])
+        self.startup.add("hang-detector", self.startHangDetector, PRIORITY_IDLE, after=["show-window"])
+        self.startup.add("control-socket", self.startControlServer, PRIORITY_NORMAL, after=["window", "webview"])
+        self.startup.add("reclaim-timer", self.startReclaimTimer, PRIORITY_IDLE, after=["show-window"])
+        self.startup.start()
+        TRACER.end("applicationDidFinishLaunching_")
+        # Do not wait forever for the first navigation when benchmarking (e.g., when offline).
+        if self.benchmark_startup:
+            self.performSelector_withObject_afterDelay_("finishStartupTrace:", None, STARTUP_BENCHMARK_TIMEOUT)
+
+    # Create the overlay window, with its rounded content view and drag area.
+    @objc.python_method
+    def createWindow(self):
         # Create a borderless, resizable, miniaturizable window
         self.window = AppWindow.alloc().initWithContentRect_styleMask_backing_defer_(
             NSMakeRect(500, 200, 550, 580),
@@ -145,24 +360,6 @@ class AppDelegate(NSObject):
         )
         # Save the last position and size
         self.window.setFrameAutosaveName_(FRAME_SAVE_NAME)
-        # Create the webview for the main application.
-        config = WKWebViewConfiguration.alloc().init()
-        config.preferences().setJavaScriptCanOpenWindowsAutomatically_(True)
-        # Enable media capture (microphone and camera) without user action
-        # Setting to 0 means no media types require user action (allows all media types)
-        config.setMediaTypesRequiringUserActionForPlayback_(0)  # Allow all media without user action
-        # Initialize the WebView with a frame
-        self.webview = WKWebView.alloc().initWithFrame_configuration_(
-            ((0, 0), (800, 600)),  # Frame: origin (0,0), size (800x600)
-            config
-        )
-        self.webview.setAutoresizingMask_(NSViewWidthSizable | NSViewHeightSizable)  # Resizes with window
-        # Set UI delegate for handling permission requests (microphone, camera)
-        self.ui_delegate = WebViewUIDelegate.alloc().init()
-        self.webview.setUIDelegate_(self.ui_delegate)
-        # Set a custom user agent
-        safari_user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
-        self.webview.setCustomUserAgent_(safari_user_agent)
         # Make window transparent so that the corners can be rounded
         self.window.setOpaque_(False)
         self.window.setBackgroundColor_(NSColor.clearColor())
@@ -196,27 +393,288 @@ class AppDelegate(NSObject):
         zoom_button.setTarget_(self)
         zoom_button.setAction_("zoomWindow:")
         self.drag_area.addSubview_(zoom_button)
+        # Add resize observer
+        NSNotificationCenter.defaultCenter().addObserver_selector_name_object_(
+            self, 'windowDidResize:', NSWindowDidResizeNotification, self.window
+        )
+        # Add local mouse event monitor for left mouse down
+        self.local_mouse_monitor = NSEvent.addLocalMonitorForEventsMatchingMask_handler_(
+            NSEventMaskLeftMouseDown,  # Monitor left mouse-down events
+            self.handleLocalMouseEvent  # Handler method
+        )
+        # Set the delegate of the window to this parent application.
+        self.window.setDelegate_(self)
+
+    # Create the webview for the main application, with the page bridge and scripts.
+    @objc.python_method
+    def createWebView(self):
+        # Configure the webview (pop-up windows and media)
+        config = WKWebViewConfiguration.alloc().init()
+        config.preferences().setJavaScriptCanOpenWindowsAutomatically_(True)
+        # Enable media capture (microphone and camera) without user action
+        # Setting to 0 means no media types require user action (allows all media types)
+        config.setMediaTypesRequiringUserActionForPlayback_(0)  # Allow all media without user action
+        # Initialize the WebView with a frame
+        self.webview = WKWebView.alloc().initWithFrame_configuration_(
+            ((0, 0), (800, 600)),  # Frame: origin (0,0), size (800x600)
+            config
+        )
+        self.webview.setAutoresizingMask_(NSViewWidthSizable | NSViewHeightSizable)  # Resizes with window
+        # Set UI delegate for handling permission requests (microphone, camera)
+        self.ui_delegate = WebViewUIDelegate.alloc().init()
+        self.ui_delegate.app = self
+        self.webview.setUIDelegate_(self.ui_delegate)
+        # Set navigation delegate (for knowing when pages finish loading)
+        self.webview.setNavigationDelegate_(self)
+        # Set a custom user agent
+        safari_user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
+        self.webview.setCustomUserAgent_(safari_user_agent)
         # Update the webview sizing and insert it below drag area.
-        content_view.addSubview_(self.webview)
+        content_view = self.window.contentView()
+        content_bounds = content_view.bounds()
+        content_view.addSubview_positioned_relativeTo_(self.webview, NSWindowBelow, None)  # Below any snapshot or placeholder.
         self.webview.setFrame_(NSMakeRect(0, 0, content_bounds.size.width, content_bounds.size.height - DRAG_AREA_HEIGHT))
-        # Set up script message handler for background color changes
+        # Set up the single script message handler (bridge) for all page events
         configuration = self.webview.configuration()
         user_content_controller = configuration.userContentController()
-        user_content_controller.addScriptMessageHandler_name_(self, "backgroundColorHandler")
-        # Inject JavaScript to monitor background color changes
+        # Attach the content blocking rules (before the page is loaded, see loadWebsite_)
+        if self.content_rules is not None:
+            def attach_rules(rule_list):
+                if rule_list is not None:
+                    user_content_controller.addContentRuleList_(rule_list)
+            self.content_rules.when_ready(attach_rules)
+        user_content_controller.addScriptMessageHandler_name_(self, BRIDGE_HANDLER_NAME)
+        self.bridge = MessageRouter()
+        self.background_color = None
+        self.bridge.register("background-color", self.handleBackgroundColor)
+        self.bridge.register("page-timing", self.handlePageTiming)
+        self.bridge.register("error", log_page_error)
+        # Inject the bridge (queues page events and posts them in batches) before any page script runs
+        bridge_script = WKUserScript.alloc().initWithSource_injectionTime_forMainFrameOnly_(BRIDGE_SCRIPT, WKUserScriptInjectionTimeAtDocumentStart, True)
+        user_content_controller.addUserScript_(bridge_script)
+        # Inject the page load timing reporter
+        timing_script = WKUserScript.alloc().initWithSource_injectionTime_forMainFrameOnly_(PAGE_TIMING_SCRIPT, WKUserScriptInjectionTimeAtDocumentStart, True)
+        user_content_controller.addUserScript_(timing_script)
+        # Inject the low-power controls (throttles the page while the overlay is hidden)
+        if self.low_power is not None:
+            self.bridge.register("power-stats", self.low_power.handle_page_stats)
+            power_script = WKUserScript.alloc().initWithSource_injectionTime_forMainFrameOnly_(POWER_SCRIPT, WKUserScriptInjectionTimeAtDocumentStart, True)
+            user_content_controller.addUserScript_(power_script)
+        # Inject JavaScript to monitor background color changes. Mutations are coalesced
+        # into at most one check per debounce window (and animation frame), and a color
+        # is only emitted when it differs from the last one emitted.
         script = """
-            function _post(bg){try{const h=window.webkit?.messageHandlers?.backgroundColorHandler;h&&h.postMessage(bg);}catch(e){}}
+            (function(){
+            let _last=null, _scheduled=false;
             function _getColor(el){if(!el) return null; const c=getComputedStyle(el).backgroundColor; return (!c||c==='rgba(0, 0, 0, 0)'||c==='transparent')?null:c;}
             function sendBackgroundColor(){
+                _scheduled=false;
                 const bg=_getColor(document.body)||_getColor(document.documentElement)||'rgb(255,255,255)';
-                _post(bg);
+                if(bg!==_last){_last=bg;window.__grokBridge&&window.__grokBridge.emit('background-color',bg);}
             }
-            document.addEventListener('DOMContentLoaded', sendBackgroundColor);
-            window.addEventListener('load', sendBackgroundColor);
-            new MutationObserver(sendBackgroundColor).observe(document.documentElement,{attributes:true,attributeFilter:['style'],subtree:true,childList:true});
-        """
+            function scheduleBackgroundColor(){
+                if(_scheduled) return;
+                _scheduled=true;
+                setTimeout(function(){window.requestAnimationFrame?window.requestAnimationFrame(sendBackgroundColor):sendBackgroundColor();}, __DELAY_MS__);
+            }
+            document.addEventListener('DOMContentLoaded', scheduleBackgroundColor);
+            window.addEventListener('load', scheduleBackgroundColor);
+            const _observer=new MutationObserver(scheduleBackgroundColor);
+            function observe(){_observer.observe(document.documentElement,{attributes:true,attributeFilter:['style'],subtree:true,childList:true});}
+            observe();
+            // Stop observing while the page is in low-power mode (the overlay is hidden).
+            window.addEventListener('grok-power', function(e){if(e.detail.suspended){_observer.disconnect();}else{observe();scheduleBackgroundColor();}});
+            })();
+        """.replace("__DELAY_MS__", str(BACKGROUND_COLOR_DEBOUNCE_MS))
         user_script = WKUserScript.alloc().initWithSource_injectionTime_forMainFrameOnly_(script, WKUserScriptInjectionTimeAtDocumentEnd, True)
         user_content_controller.addUserScript_(user_script)
+
+    # Native placeholder (logo and label) shown while a lazily created page loads.
+    @objc.python_method
+    def showPlaceholder(self):
+        # The snapshot of a reclaimed page is shown instead.
+        if (self.placeholder is not None) or (self.snapshot_view is not None):
+            return
+        bounds = self.window.contentView().bounds()
+        self.placeholder = NSView.alloc().initWithFrame_(NSMakeRect(0, 0, bounds.size.width, bounds.size.height - DRAG_AREA_HEIGHT))
+        self.placeholder.setAutoresizingMask_(NSViewWidthSizable | NSViewHeightSizable)
+        logo = NSImageView.alloc().initWithFrame_(NSMakeRect((bounds.size.width - 48) / 2, bounds.size.height / 2, 48, 48))
+        logo.setImage_(NSImage.alloc().initWithContentsOfFile_(os.path.join(os.path.dirname(os.path.abspath(__file__)), LOGO_BLACK_PATH)))
+        logo.setAutoresizingMask_(NSViewMinXMargin | NSViewMaxXMargin | NSViewMinYMargin | NSViewMaxYMargin)
+        self.placeholder.addSubview_(logo)
+        label = NSTextField.labelWithString_(f"Loading {APP_TITLE}…")
+        label.setFrame_(NSMakeRect(0, bounds.size.height / 2 - 36, bounds.size.width, 24))
+        label.setAlignment_(NSTextAlignmentCenter)
+        label.setTextColor_(NSColor.secondaryLabelColor())
+        label.setAutoresizingMask_(NSViewWidthSizable | NSViewMinYMargin | NSViewMaxYMargin)
+        self.placeholder.addSubview_(label)
+        self.window.contentView().addSubview_positioned_relativeTo_(self.placeholder, NSWindowAbove, self.webview)
+
+    @objc.python_method
+    def hidePlaceholder(self):
+        if self.placeholder is not None:
+            self.placeholder.removeFromSuperview()
+            self.placeholder = None
+
+    # Snapshot of a reclaimed page, shown (above the new webview) while the page restores.
+    @objc.python_method
+    def showSnapshot(self):
+        if (self.snapshot_view is not None) or (self.restore_state is None) or (self.restore_state.get("image") is None):
+            return
+        bounds = self.window.contentView().bounds()
+        self.snapshot_view = NSImageView.alloc().initWithFrame_(NSMakeRect(0, 0, bounds.size.width, bounds.size.height - DRAG_AREA_HEIGHT))
+        self.snapshot_view.setImage_(self.restore_state["image"])
+        self.snapshot_view.setImageScaling_(NSImageScaleAxesIndependently)
+        self.snapshot_view.setAutoresizingMask_(NSViewWidthSizable | NSViewHeightSizable)
+        self.window.contentView().addSubview_positioned_relativeTo_(self.snapshot_view, NSWindowBelow, self.drag_area)
+
+    @objc.python_method
+    def hideSnapshot(self):
+        if self.snapshot_view is not None:
+            self.snapshot_view.removeFromSuperview()
+            self.snapshot_view = None
+
+    # Identifier of the WebContent process rendering the page (private API, None if unavailable).
+    @objc.python_method
+    def webContentProcessIdentifier(self):
+        if self.webview is None:
+            return None
+        try:
+            return int(self.webview._webProcessIdentifier()) or None
+        except (AttributeError, TypeError, objc.error):
+            return None
+
+    # Free the memory of the hidden page: save its URL and interaction state, take a
+    # snapshot, then tear down the webview (its WebContent process exits with it). Calls
+    # `done(torn_down)` when finished.
+    @objc.python_method
+    def reclaimWebView(self, done):
+        webview = self.webview
+        if (webview is None) or (self.warmth.state != "ready"):
+            return done(False)
+        state = {"url": None if webview.URL() is None else str(webview.URL().absoluteString()), "image": None}
+        def snapshot_taken(image, error):
+            state["image"] = image
+            # Give up if the overlay was shown (or the webview replaced) meanwhile.
+            if (self.webview is not webview) or (not self.reclaimer.still_hidden()):
+                return done(False)
+            self.restore_state = state
+            self.tearDownWebView()
+            done(True)
+        def state_saved(result, error):
+            try:
+                state["page"] = json.loads(result) if result else {}
+            except (TypeError, ValueError):
+                state["page"] = {}
+            webview.takeSnapshotWithConfiguration_completionHandler_(None, snapshot_taken)
+        webview.evaluateJavaScript_completionHandler_(SAVE_STATE_SCRIPT, state_saved)
+
+    # Remove the webview (the next summon creates a new one through the warmth policy).
+    @objc.python_method
+    def tearDownWebView(self):
+        if self.webview is None:
+            return
+        self.webview.configuration().userContentController().removeScriptMessageHandlerForName_(BRIDGE_HANDLER_NAME)
+        self.webview.setNavigationDelegate_(None)
+        self.webview.setUIDelegate_(None)
+        self.webview.removeFromSuperview()
+        self.webview = None
+        self.warmth.reset()
+        if self.low_power is not None:
+            self.low_power.page_reset()
+
+    # The page recreated after a reclaim has loaded: restore its state, drop the snapshot.
+    @objc.python_method
+    def finishRestore(self):
+        state = self.restore_state or {}
+        self.restore_state = None
+        if state.get("page"):
+            self.runPageScript(restore_state_script(state["page"]))
+        self.hideSnapshot()
+        self.reclaimer.restored()
+
+    # Evaluate JavaScript in the page (ignored while there is no webview).
+    @objc.python_method
+    def runPageScript(self, source):
+        if self.webview is not None:
+            self.webview.evaluateJavaScript_completionHandler_(source, None)
+
+    # Focus the typing area of the page.
+    @objc.python_method
+    def focusInput(self):
+        if self.webview is not None:
+            self.webview.evaluateJavaScript_completionHandler_(
+                "document.querySelector('textarea').focus();", None
+            )
+
+    # Load the custom launch trigger and start listening for the global hotkeys.
+    @objc.python_method
+    def startHotkeys(self):
+        # Load the custom launch trigger if the user set it (before compiling the listener).
+        load_custom_launcher_trigger()
+        # Start listening for the global hotkeys with the configured backend.
+        self.hotkey_backend = start_hotkey_backend(self, self.settings["hotkey_backend"], self.settings)
+
+    # Watch for main thread stalls (which also freeze the global hotkey).
+    @objc.python_method
+    def startHangDetector(self):
+        self.hang_detector = HangDetector(
+            appkit_post, threshold=HANG_THRESHOLD, interval=HANG_CHECK_INTERVAL,
+            report_interval=HANG_REPORT_INTERVAL, report_path=HANG_REPORT_PATH,
+        )
+        self.hang_detector.start()
+
+    # Periodically check whether the hidden page should be reclaimed.
+    @objc.python_method
+    def startReclaimTimer(self):
+        if self.reclaimer is not None:
+            self.reclaim_timer = NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
+                RECLAIM_CHECK_INTERVAL, self, "checkReclaim:", None, True
+            )
+
+    def checkReclaim_(self, timer):
+        self.reclaimer.check()
+
+    # Serve the local control socket (used by `grok ctl`).
+    @objc.python_method
+    def startControlServer(self):
+        self.control_server = ControlServer(self, post=appkit_post)
+        self.control_server.start()
+
+    # Set (and save) a new launcher trigger, then start matching it.
+    @objc.python_method
+    def setLauncherTrigger(self, flags, key):
+        LAUNCHER_TRIGGER.update({"flags": flags, "key": key})
+        save_custom_launcher_trigger()
+        self.hotkey_backend.rebind()
+        return dict(LAUNCHER_TRIGGER)
+
+    # Counters from the hotkey listener, page bridge, startup phases, and hang detector.
+    @objc.python_method
+    def controlStats(self):
+        stats = {"startup": self.startup.timings(), "log_records_dropped": dropped_records()}
+        for name, attribute in (("warmth", "warmth"), ("low_power", "low_power"), ("reclaim", "reclaimer"), ("web_data", "web_data_clearer"), ("content_rules", "content_rules"), ("page_timings", "page_loads"), ("links", "link_policy"), ("downloads", "downloads"), ("hotkeys", "hotkey_backend"), ("bridge", "bridge"), ("hangs", "hang_detector"), ("control", "control_server")):
+            component = getattr(self, attribute, None)
+            if component is not None:
+                stats[name] = component.stats()
+        return stats
+
+    # Short health summary of the running overlay.
+    @objc.python_method
+    def controlHealth(self):
+        hotkey_backend = getattr(self, "hotkey_backend", None)
+        return {
+            "pid": os.getpid(),
+            "startup_pending": self.startup.pending(),
+            "window_visible": bool(self.window.isVisible()),
+            "window_key": bool(self.window.isKeyWindow()),
+            "hotkey_backend": None if hotkey_backend is None else hotkey_backend.name,
+            "hotkeys_listening": (hotkey_backend is not None) and bool(hotkey_backend.check()),
+        }
+
+    # Create the status bar item (with the logo matching the current appearance).
+    @objc.python_method
+    def createStatusItem(self):
         # Create status bar item with logo
         self.status_item = NSStatusBar.systemStatusBar().statusItemWithLength_(NSSquareStatusItemLength)
         script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -232,6 +690,10 @@ class AppDelegate(NSObject):
         self.status_item.button().addObserver_forKeyPath_options_context_(
             self, "effectiveAppearance", NSKeyValueObservingOptionNew, STATUS_ITEM_CONTEXT
         )
+
+    # Create the main application menu bar and the status bar menu.
+    @objc.python_method
+    def createMenus(self):
         # Create the main application menu bar
         mainMenu = NSMenu.alloc().init()
         # Create the application menu (appears under "Grok" in menu bar)
@@ -259,7 +721,6 @@ class AppDelegate(NSObject):
         appMenu.addItem_(quitMenuItem)
         appMenuItem.setSubmenu_(appMenu)
         NSApp.setMainMenu_(mainMenu)
-        
         # Create status bar menu
         menu = NSMenu.alloc().init()
         # Create and configure menu items with explicit targets
@@ -272,8 +733,21 @@ class AppDelegate(NSObject):
         home_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_("Home", "goToWebsite:", "g")
         home_item.setTarget_(self)
         menu.addItem_(home_item)
-        clear_data_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_("Clear Web Cache", "clearWebViewData:", "")
-        clear_data_item.setTarget_(self)
+        # Clear web data submenu (only the last two items sign out of the website)
+        clear_data_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_("Clear Web Data", None, "")
+        clear_data_menu = NSMenu.alloc().init()
+        for title, preset in (
+            ("Cache", "cache"),
+            ("Cache From the Last Hour", "recent-cache"),
+            ("Service Workers", "service-workers"),
+            ("Cookies (Signs Out)", "cookies"),
+            ("Everything (Signs Out)", "all"),
+        ):
+            preset_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(title, "clearWebDataPreset:", "")
+            preset_item.setRepresentedObject_(preset)
+            preset_item.setTarget_(self)
+            clear_data_menu.addItem_(preset_item)
+        clear_data_item.setSubmenu_(clear_data_menu)
         menu.addItem_(clear_data_item)
         set_trigger_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_("Set New Trigger", "setTrigger:", "")
         set_trigger_item.setTarget_(self)
@@ -294,61 +768,280 @@ class AppDelegate(NSObject):
         menu.addItem_(quit_item)
         # Set the menu for the status item
         self.status_item.setMenu_(menu)
-        # Add resize observer
-        NSNotificationCenter.defaultCenter().addObserver_selector_name_object_(
-            self, 'windowDidResize:', NSWindowDidResizeNotification, self.window
-        )
-        # Add local mouse event monitor for left mouse down
-        self.local_mouse_monitor = NSEvent.addLocalMonitorForEventsMatchingMask_handler_(
-            NSEventMaskLeftMouseDown,  # Monitor left mouse-down events
-            self.handleLocalMouseEvent  # Handler method
-        )
-        # Create the event tap for key-down events
-        tap = CGEventTapCreate(
-            kCGSessionEventTap, # Tap at the session level
-            kCGHeadInsertEventTap, # Insert at the head of the event queue
-            kCGEventTapOptionDefault, # Actively filter events
-            CGEventMaskBit(kCGEventKeyDown), # Capture key-down events
-            global_show_hide_listener(self), # Your callback function
-            None # Optional user info (refcon)
-        )
-        if tap:
-            # Integrate the tap into the run loop
-            source = CFMachPortCreateRunLoopSource(None, tap, 0)
-            CFRunLoopAddSource(CFRunLoopGetCurrent(), source, kCFRunLoopCommonModes)
-            CGEventTapEnable(tap, True)
-            # CFRunLoopRun() # Start the run loop (causes HANG as of Tahoe)
+
+    # Quitting (NSApp terminate exits without returning from `run`) is a clean exit.
+    def applicationWillTerminate_(self, notification):
+        control_server = getattr(self, "control_server", None)
+        if control_server is not None:
+            control_server.stop()
+        page_loads = getattr(self, "page_loads", None)
+        if page_loads is not None:
+            page_loads.flush()
+        record_clean_exit()
+
+    # Called once every startup task has run, reports how long each phase took.
+    @objc.python_method
+    def startupDidComplete(self, scheduler):
+        LOGGER.info(f"Startup phases: {scheduler.report()}", extra={"timings": scheduler.timings()})
+        self.startup_complete = True
+        if self.first_navigation_done:
+            self.finishStartupTrace_(None)
+
+    # Navigation delegate, decides where followed links open (see LinkPolicy).
+    def webView_decidePolicyForNavigationAction_decisionHandler_(self, webview, navigationAction, decisionHandler):
+        self.decideNavigationAction(navigationAction, decisionHandler)
+
+    # Navigation delegate, saves responses that the webview cannot show, or that the server
+    # marks as attachments, instead of displaying them.
+    def webView_decidePolicyForNavigationResponse_decisionHandler_(self, webview, navigationResponse, decisionHandler):
+        self.decideNavigationResponse(navigationResponse, decisionHandler)
+
+    # Link policy of the overlay and popup webviews. Subframe navigations (embedded
+    # content) always load in place.
+    @objc.python_method
+    def decideNavigationAction(self, navigationAction, decisionHandler):
+        # Links with a download attribute are saved (see webView_navigationAction_didBecomeDownload_).
+        if navigationAction.shouldPerformDownload():
+            decisionHandler(WKNavigationActionPolicyDownload)
+            return
+        target_frame = navigationAction.targetFrame()
+        if (target_frame is None) or target_frame.isMainFrame():
+            url = navigationAction.request().URL()
+            user_initiated = navigationAction.navigationType() == WKNavigationTypeLinkActivated
+            if (url is not None) and (self.link_policy.decide(url.absoluteString(), user_initiated) == POLICY_EXTERNAL):
+                NSWorkspace.sharedWorkspace().openURL_(url)
+                decisionHandler(WKNavigationActionPolicyCancel)
+                return
+        decisionHandler(WKNavigationActionPolicyAllow)
+
+    # Download policy of the overlay and popup webviews.
+    @objc.python_method
+    def decideNavigationResponse(self, navigationResponse, decisionHandler):
+        response = navigationResponse.response()
+        disposition = ""
+        if hasattr(response, "valueForHTTPHeaderField_"):
+            disposition = str(response.valueForHTTPHeaderField_("Content-Disposition") or "")
+        if (not navigationResponse.canShowMIMEType()) or disposition.lower().startswith("attachment"):
+            decisionHandler(WKNavigationResponsePolicyDownload)
         else:
-            print("Failed to create event tap. Check Accessibility permissions.")
-        # Load the custom launch trigger if the user set it.
-        load_custom_launcher_trigger()
-        # Set the delegate of the window to this parent application.
-        self.window.setDelegate_(self)
-        # Make sure this window is shown and focused.
-        self.showWindow_(None)
-        # Defer website loading until after window is visible (improves startup time)
-        self.performSelector_withObject_afterDelay_("loadWebsite:", None, 0.1)
-        # Request microphone permission after a short delay (non-blocking)
-        self.performSelector_withObject_afterDelay_("requestMicrophonePermissionDeferred:", None, 1.0)
-
-    # Deferred website loading to improve startup performance
+            decisionHandler(WKNavigationResponsePolicyAllow)
+
+    def webView_navigationAction_didBecomeDownload_(self, webview, navigationAction, download):
+        download.setDelegate_(self.download_delegate)
+
+    def webView_navigationResponse_didBecomeDownload_(self, webview, navigationResponse, download):
+        download.setDelegate_(self.download_delegate)
+
+    # A download is starting, returns the temporary path WebKit streams it to (None for
+    # web downloads, streamed by this process instead, see streamDownload).
+    @objc.python_method
+    def downloadStarted(self, download, response, suggested_filename):
+        url = response.URL()
+        if (url is not None) and (str(url.scheme() or "").lower() in STREAMED_SCHEMES) and (self.webview is not None):
+            self.streamDownload(str(url.absoluteString()), suggested_filename, response.expectedContentLength())
+            return None
+        try:
+            entry = self.downloads.begin(suggested_filename, None if url is None else str(url.absoluteString()), response.expectedContentLength())
+        except OSError as e:
+            LOGGER.warning(f"Cannot save {suggested_filename} to {self.downloads.folder}: {e}")
+            return None
+        self.watchDownload(entry["id"], download)
+        return entry["temp_path"]
+
+    # Stream a web download to the download folder on a background thread, with the
+    # cookies (e.g., the sign-in session) and user agent of the overlay webview.
+    @objc.python_method
+    def streamDownload(self, url, suggested_filename, expected_bytes=None):
+        webview = self.webview
+        def got_cookies(cookies):
+            headers = {"User-Agent": str(webview.customUserAgent() or "")}
+            if webview.URL() is not None:
+                headers["Referer"] = str(webview.URL().absoluteString())
+            cookie = cookie_header([(c.name(), c.value(), c.domain(), c.path(), c.isSecure()) for c in (cookies or [])], url)
+            if cookie:
+                headers["Cookie"] = cookie
+            try:
+                download = StreamingDownload(self.downloads, url, suggested_filename, headers, expected_bytes, post=appkit_post)
+            except OSError as e:
+                LOGGER.warning(f"Cannot save {suggested_filename} to {self.downloads.folder}: {e}")
+                return
+            self.streaming_downloads[download.entry["id"]] = download
+            download.start()
+        webview.configuration().websiteDataStore().httpCookieStore().getAllCookies_(got_cookies)
+
+    @objc.python_method
+    def watchDownload(self, download_id, download):
+        self.active_downloads[download_id] = download
+        progress = download.progress()
+        self.downloads.watch(download_id, lambda: (progress.completedUnitCount(), progress.totalUnitCount()))
+
+    # The ID of a download in progress (None if unknown).
+    @objc.python_method
+    def downloadID(self, download):
+        for download_id, active_download in self.active_downloads.items():
+            if active_download == download:
+                return download_id
+        return None
+
+    @objc.python_method
+    def downloadFinished(self, download):
+        download_id = self.downloadID(download)
+        if download_id is not None:
+            del self.active_downloads[download_id]
+            self.downloads.finished(download_id)
+
+    @objc.python_method
+    def downloadFailed(self, download, error, resume_data=None, cancelled=False):
+        download_id = self.downloadID(download)
+        if download_id is not None:
+            del self.active_downloads[download_id]
+            self.downloads.failed(download_id, error, resume_data, cancelled=cancelled)
+
+    # Cancel a download (keeping its resume data), returns False if it is not in progress.
+    @objc.python_method
+    def cancelDownload(self, download_id):
+        if int(download_id) in self.streaming_downloads:
+            return self.streaming_downloads[int(download_id)].cancel()
+        download = self.active_downloads.get(int(download_id))
+        if download is None:
+            return False
+        download.cancel_(lambda resume_data: self.downloadFailed(download, None, resume_data, cancelled=True))
+        return True
+
+    # Resume a cancelled or failed download, returns False if it cannot be resumed.
+    @objc.python_method
+    def resumeDownload(self, download_id):
+        if int(download_id) in self.streaming_downloads:
+            return self.streaming_downloads[int(download_id)].resume()
+        entry = self.downloads.downloads.get(int(download_id))
+        if (entry is None) or (entry["resume_data"] is None) or (self.webview is None):
+            return False
+        resume_data = entry["resume_data"]
+        def resumed(download):
+            download.setDelegate_(self.download_delegate)
+            self.downloads.resumed(entry["id"])
+            self.watchDownload(entry["id"], download)
+        self.webview.resumeDownloadFromResumeData_completionHandler_(resume_data, resumed)
+        return True
+
+    # Open a page popup: off-site links go to the default browser, others (e.g., sign-in
+    # windows) to a small window with a child webview. The child uses the configuration
+    # provided by WebKit, so it shares the process pool and data store of the overlay,
+    # and links followed in it go through the same link and download policies.
+    @objc.python_method
+    def openPopup(self, parent, configuration, navigationAction):
+        url = navigationAction.request().URL()
+        if (url is not None) and (url.absoluteString() not in ("", "about:blank")):
+            if self.link_policy.decide(url.absoluteString()) == POLICY_EXTERNAL:
+                NSWorkspace.sharedWorkspace().openURL_(url)
+                return None
+        width, height = POPUP_WINDOW_SIZE
+        window = NSWindow.alloc().initWithContentRect_styleMask_backing_defer_(
+            NSMakeRect(0, 0, width, height),
+            NSWindowStyleMaskTitled | NSWindowStyleMaskClosable | NSWindowStyleMaskResizable,
+            NSBackingStoreBuffered,
+            False
+        )
+        window.setReleasedWhenClosed_(False)
+        window.setTitle_(APP_TITLE)
+        child = WKWebView.alloc().initWithFrame_configuration_(window.contentView().bounds(), configuration)
+        child.setAutoresizingMask_(NSViewWidthSizable | NSViewHeightSizable)
+        child.setUIDelegate_(self.ui_delegate)
+        child.setNavigationDelegate_(self.popup_navigation_delegate)
+        child.setCustomUserAgent_(parent.customUserAgent())
+        window.setContentView_(child)
+        window.setDelegate_(self.ui_delegate)
+        window.center()
+        window.makeKeyAndOrderFront_(None)
+        self.popups.append((window, child))
+        return child
+
+    # Close the window of a popup (the page called window.close()).
+    @objc.python_method
+    def closePopup(self, webview):
+        for window, child in list(self.popups):
+            if child == webview:
+                window.close()
+
+    @objc.python_method
+    def forgetPopup(self, window):
+        self.popups = [(popup_window, child) for popup_window, child in self.popups if popup_window != window]
+
+    # Navigation delegate, called when a page starts loading.
+    def webView_didStartProvisionalNavigation_(self, webview, navigation):
+        self.navigation_timer.start()
+
+    # Navigation delegate, called when the page starts receiving content.
+    def webView_didCommitNavigation_(self, webview, navigation):
+        self.navigation_timer.commit()
+
+    # Navigation delegate, called when a page failed to load (before or after committing).
+    def webView_didFailProvisionalNavigation_withError_(self, webview, navigation, error):
+        self.navigation_timer.fail()
+        LOGGER.warning(f"Page failed to load: {error.localizedDescription()}")
+
+    def webView_didFailNavigation_withError_(self, webview, navigation, error):
+        self.navigation_timer.fail()
+        LOGGER.warning(f"Page failed to load: {error.localizedDescription()}")
+
+    # Navigation delegate, called when a page has finished loading.
+    def webView_didFinishNavigation_(self, webview, navigation):
+        self.page_loads.navigation_finished(self.navigation_timer.finish())
+        self.warmth.navigation_finished()
+        if (self.reclaimer is not None) and self.reclaimer.reclaimed:
+            self.finishRestore()
+        # A new page starts out active (re-suspended if the overlay is still hidden).
+        if self.low_power is not None:
+            self.low_power.page_reset()
+        if not self.first_navigation_done:
+            self.first_navigation_done = True
+            TRACER.end("first-navigation", url=str(webview.URL()))
+            if self.startup_complete:
+                self.finishStartupTrace_(None)
+
+    # Write the startup trace (if tracing), and exit when benchmarking startup.
+    def finishStartupTrace_(self, sender):
+        if TRACER.enabled and (not getattr(self, "startup_trace_path", None)):
+            self.startup_trace_path = TRACER.write()
+            LOGGER.info(f"Startup trace saved at: {self.startup_trace_path}")
+            if self.benchmark_startup:
+                print(json.dumps({"trace": str(self.startup_trace_path), "spans_ms": TRACER.summary()}, indent=2), flush=True)
+        if self.benchmark_startup:
+            NSApp.terminate_(None)
+
+    # Load the website in the overlay (started as soon as the webview exists).
     def loadWebsite_(self, sender):
-        url = NSURL.URLWithString_(WEBSITE)
+        TRACER.begin("first-navigation")
+        # A page recreated after a reclaim returns to where it was.
+        url = NSURL.URLWithString_((self.restore_state or {}).get("url") or WEBSITE)
         request = NSURLRequest.requestWithURL_(url)
-        self.webview.loadRequest_(request)
+        webview = self.webview
+        if self.content_rules is None:
+            webview.loadRequest_(request)
+        else:
+            self.content_rules.when_ready(lambda rule_list: webview.loadRequest_(request))
+
+    # Called from the event tap thread to schedule a drain of the trigger handoff queue.
+    @objc.python_method
+    def wakeMainThreadForTriggers(self):
+        self.performSelectorOnMainThread_withObject_waitUntilDone_("drainTriggerHandoff:", None, False)
 
-    # Deferred microphone permission request (non-blocking)
-    def requestMicrophonePermissionDeferred_(self, sender):
-        request_microphone_permission()
+    # Run the triggers handed off from the event tap thread (on the main thread).
+    def drainTriggerHandoff_(self, sender):
+        self.trigger_handoff.drain()
+
+    # Periodic check that the hotkey backend is still listening (e.g., event tap not disabled).
+    def checkHotkeyBackend_(self, timer):
+        self.hotkey_backend.check()
 
     # Logic to show the overlay, make it the key window, and focus on the typing area.
     def showWindow_(self, sender):
+        page_ready = self.overlayWillShow()
         self.window.makeKeyAndOrderFront_(None)
         NSApp.activateIgnoringOtherApps_(True)
         # Execute the JavaScript to focus the textarea in the WKWebView
-        self.webview.evaluateJavaScript_completionHandler_(
-            "document.querySelector('textarea').focus();", None
-        )
+        if page_ready:
+            self.focusInput()
 
     # Hide the overlay and allow focus to return to the next visible application.
     def hideWindow_(self, sender):
@@ -357,7 +1050,43 @@ class AppDelegate(NSObject):
             self.aboutWindow.close()
             self.aboutWindow = None
         NSApp.hide_(None)
+
+    # Page bookkeeping when the overlay is shown: restore a reclaimed page, create (or
+    # finish loading) the page as the warmth policy requires, and leave low-power mode.
+    # Returns True if the page input should be focused.
+    @objc.python_method
+    def overlayWillShow(self):
+        self.overlay_hidden = False
+        # A reclaimed page shows its snapshot right away while it restores behind it.
+        if (self.reclaimer is not None) and self.reclaimer.shown():
+            self.showSnapshot()
+        page_ready = self.warmth.summon()
+        if self.low_power is not None:
+            self.low_power.show()
+        return page_ready
+
+    # Every way the app gets hidden (hideWindow_, the Hide menu item, ⌘H, another app
+    # hiding it) ends here, so the page is throttled and may be reclaimed.
+    def applicationDidHide_(self, notification):
+        self.overlay_hidden = True
+        self.warmth.dismiss()
+        if self.low_power is not None:
+            self.low_power.hide()
+        if self.reclaimer is not None:
+            self.reclaimer.hidden()
+
+    # Unhidden other than by showWindow_ (e.g., clicking the Dock icon, or Show All).
+    def applicationDidUnhide_(self, notification):
+        if self.overlay_hidden and self.overlayWillShow():
+            self.focusInput()
     
+    # Show the overlay if it is not the key window, otherwise hide it.
+    def toggleWindow_(self, sender):
+        if self.window.isKeyWindow():
+            self.hideWindow_(sender)
+        else:
+            self.showWindow_(sender)
+
     # Minimize the window to the dock with animation.
     def minimizeWindow_(self, sender):
         # Standard macOS minimize animation to Dock
@@ -369,28 +1098,50 @@ class AppDelegate(NSObject):
     
     # Go to the default landing website for the overlay (in case accidentally navigated away).
     def goToWebsite_(self, sender):
+        if self.webview is None:
+            return
         url = NSURL.URLWithString_(WEBSITE)
         request = NSURLRequest.requestWithURL_(url)
         self.webview.loadRequest_(request)
     
-    # Clear the webview cache data (in case cookies cause errors).
+    # Reload the current page in the overlay.
+    def reloadWebsite_(self, sender):
+        if self.webview is not None:
+            self.webview.reload_(None)
+
+    # Clear the webview caches (keeps cookies, so the user stays signed in).
     def clearWebViewData_(self, sender):
-        dataStore = self.webview.configuration().websiteDataStore()
-        dataTypes = WKWebsiteDataStore.allWebsiteDataTypes()
-        dataStore.removeDataOfTypes_modifiedSince_completionHandler_(
-            dataTypes,
-            NSDate.distantPast(),
-            lambda: print("Data cleared")
-        )
+        self.webDataClearer().clear_preset("cache")
+
+    # Clear the web data selection of a "Clear Web Data" menu item.
+    def clearWebDataPreset_(self, sender):
+        self.webDataClearer().clear_preset(str(sender.representedObject()))
+
+    # Clear a named selection, or the given categories (optionally only data modified in
+    # the last `max_age` seconds). Returns the WebKit data types being cleared.
+    @objc.python_method
+    def clearWebData(self, preset=None, categories=None, max_age=None):
+        if categories:
+            return self.webDataClearer().clear(categories, None if max_age is None else float(max_age))
+        return self.webDataClearer().clear_preset(preset or "cache")
+
+    # Clearer for the data store shared by the overlay webviews (created on first use).
+    @objc.python_method
+    def webDataClearer(self):
+        if getattr(self, "web_data_clearer", None) is None:
+            store = WKWebsiteDataStore.defaultDataStore() if self.webview is None else self.webview.configuration().websiteDataStore()
+            bundle_id = NSBundle.mainBundle().bundleIdentifier() or os.path.basename(sys.executable)
+            self.web_data_clearer = WebDataClearer(WebKitDataStore(store), web_data_directories(str(bundle_id)), post=appkit_post)
+        return self.web_data_clearer
 
     # Go to the default landing website for the overlay (in case accidentally navigated away).
     def install_(self, sender):
         if install_startup():
             # Exit the current process since a new one will launch.
-            print("Installation successful, exiting.", flush=True)
+            LOGGER.info("Installation successful, exiting.")
             NSApp.terminate_(None)
         else:
-            print("Installation unsuccessful.", flush=True)
+            LOGGER.warning("Installation unsuccessful.")
 
     # Go to the default landing website for the overlay (in case accidentally navigated away).
     def uninstall_(self, sender):
@@ -586,18 +1337,32 @@ class AppDelegate(NSObject):
         bounds = self.window.contentView().bounds()
         w, h = bounds.size.width, bounds.size.height
         self.drag_area.setFrame_(NSMakeRect(0, h - DRAG_AREA_HEIGHT, w, DRAG_AREA_HEIGHT))
-        self.webview.setFrame_(NSMakeRect(0, 0, w, h - DRAG_AREA_HEIGHT))
+        if self.webview is not None:
+            self.webview.setFrame_(NSMakeRect(0, 0, w, h - DRAG_AREA_HEIGHT))
 
-    # Handler for setting the background color based on the web page background color.
+    # Handler for batches of page events posted through the bridge.
     def userContentController_didReceiveScriptMessage_(self, userContentController, message):
-        if message.name() == "backgroundColorHandler":
-            bg_color_str = message.body()
-            # Convert CSS color to NSColor (assuming RGB for simplicity)
-            if bg_color_str.startswith("rgb") and ("(" in bg_color_str) and (")" in bg_color_str):
-                rgb_values = [float(val) for val in bg_color_str[bg_color_str.index("(")+1:bg_color_str.index(")")].split(",")]
-                r, g, b = [val / 255.0 for val in rgb_values[:3]]
-                color = NSColor.colorWithCalibratedRed_green_blue_alpha_(r, g, b, 1.0)
-                self.drag_area.setBackgroundColor_(color)
+        if message.name() == BRIDGE_HANDLER_NAME:
+            self.bridge.handle_batch(message.body())
+
+    # Bridge handler for the "page-timing" event (the phases of a page load, in milliseconds).
+    @objc.python_method
+    def handlePageTiming(self, timings):
+        if not self.page_loads.page_timing(timings):
+            return False
+        LOGGER.debug(f"Page load timings: {timings}")
+
+    # Bridge handler for setting the background color based on the web page background color.
+    @objc.python_method
+    def handleBackgroundColor(self, bg_color_str):
+        # Drop repeats of the color that is already applied.
+        if bg_color_str == self.background_color:
+            return False
+        self.background_color = bg_color_str
+        # Convert CSS color to NSColor (ignoring colors that cannot be parsed)
+        rgba = parse_css_color(bg_color_str)
+        if rgba is not None:
+            self.drag_area.setBackgroundColor_(ns_color_for_rgb(rgba[:3]))
 
     # Logic for checking what color the logo in the status bar should be, and setting appropriate logo.
     def updateStatusItemImage(self):
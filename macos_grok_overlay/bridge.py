@@ -0,0 +1,131 @@
+# Python libraries
+import json
+
+# Local libraries
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+# Versioned JS -> Python message channel. The injected BRIDGE_SCRIPT queues typed events
+# from `window.__grokBridge.emit(type, data)` and posts them as one JSON batch per
+# animation frame (or timeout while the page is hidden) to a single message handler:
+#   {"v": 1, "events": [{"type": "background-color", "data": "rgb(0, 0, 0)", "t": 1712345678901}, ...]}
+BRIDGE_VERSION = 1
+BRIDGE_HANDLER_NAME = "grokBridge"
+BRIDGE_SCRIPT = """
+    (function(){
+    if(window.__grokBridge) return;
+    const _queue=[]; let _scheduled=false;
+    function flush(){
+        _scheduled=false;
+        if(!_queue.length) return;
+        const batch=JSON.stringify({v:__VERSION__,events:_queue.splice(0)});
+        try{window.webkit.messageHandlers.__HANDLER__.postMessage(batch);}catch(e){}
+    }
+    function schedule(){
+        if(_scheduled) return;
+        _scheduled=true;
+        if(document.hidden||!window.requestAnimationFrame){setTimeout(flush,100);}else{window.requestAnimationFrame(flush);}
+    }
+    window.__grokBridge={
+        emit:function(type,data){_queue.push({type:type,data:(data===undefined?null:data),t:Date.now()});schedule();},
+        flush:flush
+    };
+    window.addEventListener('pagehide',flush);
+    window.addEventListener('error',function(e){window.__grokBridge.emit('error',{message:String(e.message||''),source:String(e.filename||''),line:e.lineno||0});});
+    })();
+""".replace("__VERSION__", str(BRIDGE_VERSION)).replace("__HANDLER__", BRIDGE_HANDLER_NAME)
+
+
+# Raised for a batch that does not follow the bridge schema.
+class BridgeSchemaError(ValueError):
+    pass
+
+
+# Parse and validate a batch (JSON string) into a list of (type, data) pairs.
+def parse_batch(body):
+    try:
+        batch = json.loads(body)
+    except (TypeError, ValueError) as e:
+        raise BridgeSchemaError(f"Batch is not valid JSON: {e}")
+    if not isinstance(batch, dict):
+        raise BridgeSchemaError("Batch must be a JSON object.")
+    if batch.get("v") != BRIDGE_VERSION:
+        raise BridgeSchemaError(f"Unsupported bridge version {batch.get('v')!r} (expected {BRIDGE_VERSION}).")
+    events = batch.get("events")
+    if not isinstance(events, list):
+        raise BridgeSchemaError("Batch \"events\" must be a list.")
+    parsed = []
+    for event in events:
+        if (not isinstance(event, dict)) or (not isinstance(event.get("type"), str)):
+            raise BridgeSchemaError(f"Malformed event {event!r}.")
+        parsed.append((event["type"], event.get("data")))
+    return parsed
+
+
+# Bridge handler for the "error" events of BRIDGE_SCRIPT (uncaught page errors), logs them.
+def log_page_error(data):
+    if not isinstance(data, dict):
+        return False
+    message = str(data.get("message") or "Unknown error")
+    source = str(data.get("source") or "")
+    line = data.get("line") if isinstance(data.get("line"), int) else 0
+    LOGGER.warning(f"Page error: {message}" + (f" ({source}:{line})" if source else ""), extra={"page_error": {"message": message, "source": source, "line": line}})
+
+
+# Dispatches the events of each batch to the handler registered for their type, keeping
+# per-type counts of events, payload bytes, and events a handler dropped (returned False).
+class MessageRouter:
+    def __init__(self):
+        self.handlers = {}
+        self.type_stats = {}
+        self.batches = 0
+        self.batch_bytes = 0
+        self.invalid_batches = 0
+        self.handler_errors = 0
+
+    def register(self, event_type, handler):
+        self.handlers[event_type] = handler
+
+    def unregister(self, event_type):
+        self.handlers.pop(event_type, None)
+
+    # Handle one batch posted by the page, returns the number of events dispatched.
+    def handle_batch(self, body):
+        self.batches += 1
+        self.batch_bytes += len(body) if isinstance(body, str) else 0
+        try:
+            events = parse_batch(body)
+        except BridgeSchemaError as e:
+            self.invalid_batches += 1
+            LOGGER.debug(f"Ignoring bridge batch: {e}")
+            return 0
+        dispatched = 0
+        for event_type, data in events:
+            stats = self.type_stats.get(event_type)
+            if stats is None:
+                stats = self.type_stats[event_type] = {"events": 0, "bytes": 0, "dropped": 0, "unhandled": 0}
+            stats["events"] += 1
+            stats["bytes"] += len(json.dumps(data, separators=(",", ":")))
+            handler = self.handlers.get(event_type)
+            if handler is None:
+                stats["unhandled"] += 1
+                continue
+            try:
+                if handler(data) is False:
+                    stats["dropped"] += 1
+                else:
+                    dispatched += 1
+            except Exception as e:
+                self.handler_errors += 1
+                LOGGER.warning(f"Bridge handler for {event_type!r} failed: {e!r}")
+        return dispatched
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "batch_bytes": self.batch_bytes,
+            "invalid_batches": self.invalid_batches,
+            "handler_errors": self.handler_errors,
+            "types": {event_type: dict(stats) for event_type, stats in self.type_stats.items()},
+        }
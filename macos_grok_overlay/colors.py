@@ -0,0 +1,223 @@
+# Python libraries
+import functools
+import math
+
+
+# Parser for the CSS color strings that WebKit and Chrome report from getComputedStyle
+# (CSS Color 4): hex, rgb()/rgba(), hsl()/hsla(), hwb(), color(srgb | srgb-linear |
+# display-p3 ...), lab()/lch() and oklab()/oklch(), in legacy comma or modern space
+# syntax with an optional "/ alpha". Results are (r, g, b, a) sRGB floats in [0, 1].
+
+NAMED_COLORS = {
+    "transparent": (0.0, 0.0, 0.0, 0.0),
+    "black": (0.0, 0.0, 0.0, 1.0),
+    "white": (1.0, 1.0, 1.0, 1.0),
+}
+HUE_UNITS = {"deg": 1.0, "grad": 0.9, "rad": 180.0 / math.pi, "turn": 360.0}
+
+# Linear-light conversion matrices (CSS Color 4, D65 unless noted).
+P3_TO_XYZ = (
+    (0.4865709486482162, 0.26566769316909306, 0.1982172852343625),
+    (0.2289745640697488, 0.6917385218365064, 0.079286914093745),
+    (0.0, 0.04511338185890264, 1.043944368900976),
+)
+XYZ_TO_SRGB = (
+    (3.2409699419045226, -1.537383177570094, -0.4986107602930034),
+    (-0.9692436362808796, 1.8759675015077202, 0.04155505740717559),
+    (0.05563007969699366, -0.20397695888897652, 1.0569715142428786),
+)
+D50_TO_D65 = (
+    (0.955473421488075, -0.02309845494876471, 0.06325924320057072),
+    (-0.0283697093338637, 1.0099953980813041, 0.021041441191917323),
+    (0.012314014864481998, -0.020507649298898964, 1.330365926242124),
+)
+D50_WHITE = (0.3457 / 0.3585, 1.0, (1.0 - 0.3457 - 0.3585) / 0.3585)
+
+
+# Parse a CSS color string into an (r, g, b, a) tuple, or None if it is not understood.
+@functools.lru_cache(maxsize=256)
+def parse_css_color(text):
+    if not isinstance(text, str):
+        return None
+    text = text.strip().lower()
+    try:
+        if text in NAMED_COLORS:
+            return NAMED_COLORS[text]
+        if text.startswith("#"):
+            return _parse_hex(text[1:])
+        if text.endswith(")") and ("(" in text):
+            name, inner = text[:-1].split("(", 1)
+            parser = FUNCTION_PARSERS.get(name.strip())
+            if parser is not None:
+                rgba = parser(*_split_arguments(inner))
+                return tuple(min(1.0, max(0.0, value)) for value in rgba)
+    except (ValueError, TypeError, IndexError, ZeroDivisionError):
+        pass
+    return None
+
+
+# Split function arguments into (components, alpha), for both syntaxes.
+def _split_arguments(inner):
+    if "," in inner:
+        parts = [part.strip() for part in inner.split(",")]
+        if len(parts) == 4:
+            return parts[:3], parts[3]
+        return parts, None
+    if "/" in inner:
+        components, alpha = inner.split("/", 1)
+        return components.split(), alpha.strip()
+    return inner.split(), None
+
+def _number(token, percent_scale=1.0):
+    if token == "none":
+        return 0.0
+    if token.endswith("%"):
+        return float(token[:-1]) / 100.0 * percent_scale
+    return float(token)
+
+def _alpha(token):
+    return 1.0 if token is None else _number(token)
+
+def _hue(token):
+    if token == "none":
+        return 0.0
+    for unit, scale in HUE_UNITS.items():
+        if token.endswith(unit):
+            return float(token[:-len(unit)]) * scale
+    return float(token)
+
+def _expect(components, count):
+    if len(components) != count:
+        raise ValueError(f"Expected {count} color components, got {len(components)}.")
+
+def _parse_hex(digits):
+    if len(digits) in (3, 4):
+        digits = "".join(c * 2 for c in digits)
+    if len(digits) == 6:
+        digits += "ff"
+    if len(digits) != 8:
+        return None
+    return tuple(int(digits[i:i + 2], 16) / 255.0 for i in range(0, 8, 2))
+
+def _rgb(components, alpha):
+    _expect(components, 3)
+    r, g, b = (_number(c, 255.0) / 255.0 for c in components)
+    return (r, g, b, _alpha(alpha))
+
+def _hsl_to_rgb(hue, saturation, lightness):
+    hue = (hue % 360.0) / 30.0
+    chroma = saturation * min(lightness, 1.0 - lightness)
+    def channel(n):
+        k = (n + hue) % 12.0
+        return lightness - chroma * max(-1.0, min(k - 3.0, 9.0 - k, 1.0))
+    return channel(0), channel(8), channel(4)
+
+def _hsl(components, alpha):
+    _expect(components, 3)
+    saturation = _number(components[1], 100.0) / 100.0
+    lightness = _number(components[2], 100.0) / 100.0
+    return _hsl_to_rgb(_hue(components[0]), saturation, lightness) + (_alpha(alpha),)
+
+def _hwb(components, alpha):
+    _expect(components, 3)
+    white = _number(components[1], 100.0) / 100.0
+    black = _number(components[2], 100.0) / 100.0
+    if white + black >= 1.0:
+        gray = white / (white + black)
+        return (gray, gray, gray, _alpha(alpha))
+    r, g, b = _hsl_to_rgb(_hue(components[0]), 1.0, 0.5)
+    scale = 1.0 - white - black
+    return (r * scale + white, g * scale + white, b * scale + white, _alpha(alpha))
+
+# sRGB transfer functions (extended to negative values).
+def _to_linear(value):
+    sign = -1.0 if value < 0 else 1.0
+    value = abs(value)
+    return sign * (value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4)
+
+def _from_linear(value):
+    sign = -1.0 if value < 0 else 1.0
+    value = abs(value)
+    return sign * (12.92 * value if value <= 0.0031308 else 1.055 * value ** (1.0 / 2.4) - 0.055)
+
+def _multiply(matrix, vector):
+    return tuple(sum(m * v for m, v in zip(row, vector)) for row in matrix)
+
+def _linear_srgb_to_rgb(linear):
+    return tuple(_from_linear(value) for value in linear)
+
+def _color(components, alpha):
+    space, components = components[0], components[1:]
+    _expect(components, 3)
+    values = tuple(_number(c) for c in components)
+    if space == "srgb":
+        rgb = values
+    elif space == "srgb-linear":
+        rgb = _linear_srgb_to_rgb(values)
+    elif space == "display-p3":
+        xyz = _multiply(P3_TO_XYZ, tuple(_to_linear(value) for value in values))
+        rgb = _linear_srgb_to_rgb(_multiply(XYZ_TO_SRGB, xyz))
+    else:
+        raise ValueError(f"Unsupported color space {space!r}.")
+    return rgb + (_alpha(alpha),)
+
+def _lab_to_rgb(lightness, a, b):
+    epsilon, kappa = 216.0 / 24389.0, 24389.0 / 27.0
+    fy = (lightness + 16.0) / 116.0
+    fx = fy + a / 500.0
+    fz = fy - b / 200.0
+    x = fx ** 3 if fx ** 3 > epsilon else (116.0 * fx - 16.0) / kappa
+    y = fy ** 3 if lightness > kappa * epsilon else lightness / kappa
+    z = fz ** 3 if fz ** 3 > epsilon else (116.0 * fz - 16.0) / kappa
+    xyz_d50 = (x * D50_WHITE[0], y * D50_WHITE[1], z * D50_WHITE[2])
+    return _linear_srgb_to_rgb(_multiply(XYZ_TO_SRGB, _multiply(D50_TO_D65, xyz_d50)))
+
+def _lab(components, alpha):
+    _expect(components, 3)
+    lightness = _number(components[0], 100.0)
+    a, b = (_number(c, 125.0) for c in components[1:])
+    return _lab_to_rgb(lightness, a, b) + (_alpha(alpha),)
+
+def _lch(components, alpha):
+    _expect(components, 3)
+    lightness = _number(components[0], 100.0)
+    chroma = _number(components[1], 150.0)
+    hue = math.radians(_hue(components[2]))
+    return _lab_to_rgb(lightness, chroma * math.cos(hue), chroma * math.sin(hue)) + (_alpha(alpha),)
+
+def _oklab_to_rgb(lightness, a, b):
+    l = (lightness + 0.3963377774 * a + 0.2158037573 * b) ** 3
+    m = (lightness - 0.1055613458 * a - 0.0638541728 * b) ** 3
+    s = (lightness - 0.0894841775 * a - 1.2914855480 * b) ** 3
+    return _linear_srgb_to_rgb((
+        4.0767416621 * l - 3.3077115913 * m + 0.2309699292 * s,
+        -1.2684380046 * l + 2.6097574011 * m - 0.3413193965 * s,
+        -0.0041960863 * l - 0.7034186147 * m + 1.7076147010 * s,
+    ))
+
+def _oklab(components, alpha):
+    _expect(components, 3)
+    lightness = _number(components[0])
+    a, b = (_number(c, 0.4) for c in components[1:])
+    return _oklab_to_rgb(lightness, a, b) + (_alpha(alpha),)
+
+def _oklch(components, alpha):
+    _expect(components, 3)
+    lightness = _number(components[0])
+    chroma = _number(components[1], 0.4)
+    hue = math.radians(_hue(components[2]))
+    return _oklab_to_rgb(lightness, chroma * math.cos(hue), chroma * math.sin(hue)) + (_alpha(alpha),)
+
+
+FUNCTION_PARSERS = {
+    "rgb": _rgb,
+    "rgba": _rgb,
+    "hsl": _hsl,
+    "hsla": _hsl,
+    "hwb": _hwb,
+    "color": _color,
+    "lab": _lab,
+    "lch": _lch,
+    "oklab": _oklab,
+    "oklch": _oklch,
+}
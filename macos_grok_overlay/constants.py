@@ -1,11 +1,9 @@
-
-# Apple libraries
-from Quartz import (
-    kCGEventFlagMaskAlternate,
-    kCGEventFlagMaskCommand,
-    kCGEventFlagMaskControl,
-    kCGEventFlagMaskShift,
-)
+# Modifier flag masks, with the values of Quartz's kCGEventFlagMask* constants (spelled
+# out so that importing the constants does not load the Quartz framework).
+kCGEventFlagMaskShift = 1 << 17
+kCGEventFlagMaskControl = 1 << 18
+kCGEventFlagMaskAlternate = 1 << 19
+kCGEventFlagMaskCommand = 1 << 20
 
 
 WEBSITE = "https://grok.com?referrer=grok-macos"
@@ -14,9 +12,35 @@ LOGO_BLACK_PATH = "logo/logo_black.png"
 FRAME_SAVE_NAME = "GrokWindowFrame"
 APP_TITLE = "Grok"
 PERMISSION_CHECK_EXIT = 1
+PERMISSION_PROBE_INITIAL_DELAY = 0.5  # Seconds before the second permission probe.
+PERMISSION_PROBE_MAX_DELAY = 8.0  # Longest delay between permission probes.
+PERMISSION_PROBE_JITTER = 0.2  # Random +/- fraction applied to each probe delay.
 CORNER_RADIUS = 15.0
 DRAG_AREA_HEIGHT = 30
+BACKGROUND_COLOR_DEBOUNCE_MS = 100  # Minimum delay between page background color checks.
 STATUS_ITEM_CONTEXT = 1
+EVENT_TAP_CHECK_INTERVAL = 5.0  # Seconds between checks that the event tap is still enabled.
+TAP_THREAD_ENV = "GROK_TAP_THREAD"  # Set to run the event tap on a dedicated thread.
+STARTUP_BENCHMARK_TIMEOUT = 30.0  # Seconds to wait for the first page load with --benchmark-startup.
+LOG_LEVEL_ENV = "GROK_LOG_LEVEL"  # Set to DEBUG, INFO, WARNING, or ERROR (overrides the setting).
+LOG_MAX_BYTES = 1_000_000  # Size at which the JSONL log file is rotated.
+LOG_BACKUP_COUNT = 3  # Number of rotated log files kept.
+LOG_QUEUE_SIZE = 10_000  # Log records buffered for the writer thread (more are dropped).
+HANG_THRESHOLD = 0.5  # Seconds the main thread may be unresponsive before it counts as a hang.
+HANG_CHECK_INTERVAL = 0.25  # Seconds between hang detector checks.
+HANG_REPORT_INTERVAL = 60.0  # Minimum seconds between hang reports (with stacks).
+CONTROL_TIMEOUT = 5.0  # Seconds a control socket command may take (client and server).
+HANDOFF_TIMEOUT = 30.0  # Seconds a second launch waits for the running overlay (which may still be starting) to respond.
+RECLAIM_AFTER_HIDDEN_MAX_MIN = 24 * 60  # Largest "reclaim_after_hidden_min" setting (larger values are clamped).
+LOW_POWER_GRACE = 5.0  # Seconds hidden before the page is put in low-power mode.
+LOW_POWER_MIN_TIMER_MS = 1000  # Shortest page timer delay while in low-power mode.
+DOWNLOAD_CHUNK_SIZE = 256 * 1024  # Bytes read and written at a time by stream_download.
+DOWNLOAD_TIMEOUT = 30.0  # Seconds stream_download waits for the server.
+POPUP_WINDOW_SIZE = (480, 640)  # Default size of the windows opened for page popups (e.g., sign-in).
+PAGE_TIMING_ROLLING_LIMIT = 1000  # Samples per page load phase before older ones are down-weighted.
+PAGE_TIMING_TEXTAREA_TIMEOUT_MS = 30000  # Longest the page waits for the chat input before reporting timings.
+PAGE_TIMING_MERGE_TIMEOUT = PAGE_TIMING_TEXTAREA_TIMEOUT_MS / 1000 + 5.0  # Seconds the native and page timings of a load wait for each other.
+RECLAIM_CHECK_INTERVAL = 60.0  # Seconds between checks whether the hidden page should be reclaimed.
 LAUNCHER_TRIGGER_MASK = (
     kCGEventFlagMaskShift |
     kCGEventFlagMaskControl |
@@ -28,3 +52,31 @@ LAUNCHER_TRIGGER = {
     "flags": kCGEventFlagMaskAlternate,
     "key": 49
 }
+# Optional extra bindings (action name -> key combination), disabled by default.
+# These can be set under "bindings" in the custom trigger file.
+TRIGGER_BINDINGS = {
+    "home": {"flags": None, "key": None},
+    "reload": {"flags": None, "key": None},
+}
+# Optional sequence triggers, e.g. double-tapping Option to toggle the overlay:
+#   {"action": "toggle", "steps": [{"flags": 524288, "key": None}, {"flags": 524288, "key": None}]}
+# A step with "key" None is a modifier-only press. These can be set under "sequences"
+# in the custom trigger file (along with "sequence_window").
+SEQUENCE_TRIGGERS = []
+SEQUENCE_WINDOW = 0.4  # Seconds allowed between the first and last step of a sequence.
+SEQUENCE_HISTORY = 8  # Number of recent key events kept (also the maximum sequence length).
+# Default user settings (overridden by "settings.json" in the log directory).
+WARMTH_POLICIES = ("lazy", "warm", "hot")  # How much of the page is kept ready while hidden (see warmth.py).
+DEFAULT_SETTINGS = {
+    "hotkey_backend": "event-tap",  # "event-tap" or "carbon" (registered hot keys).
+    "tap_thread": False,  # Run the event tap on a dedicated thread.
+    "log_level": "INFO",  # DEBUG, INFO, WARNING, or ERROR.
+    "warmth": "warm",  # "lazy" (create the page on first use), "warm" (load at launch), or "hot" (also keep it focused).
+    "low_power": True,  # Throttle the page (timers, animations, media) while the overlay is hidden.
+    "reclaim_after_hidden_min": 30,  # Minutes hidden before the page is torn down to free memory (0 to disable).
+    "reclaim_on_memory_pressure": True,  # Also tear down the hidden page when the system is low on memory.
+    "internal_link_patterns": [],  # Extra sites kept in the overlay when a link is followed, e.g. "*.example.com".
+    "external_link_patterns": [],  # Sites always opened in the default browser, e.g. "grok.com/share/*".
+    "download_folder": "~/Downloads",  # Where files saved from the page are written.
+    "content_blocking": True,  # Block trackers (built-in rules and "content_rules.json" in the log directory).
+}
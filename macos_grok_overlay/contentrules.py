@@ -0,0 +1,199 @@
+# Python libraries
+import hashlib
+import json
+import re
+import time
+
+# Local libraries
+from .health_checks import LOG_DIR
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+# User content blocking rules (a JSON list in the WebKit content blocker format), used
+# along with the built-in rules below. Invalid rules are skipped with a warning.
+CONTENT_RULES_PATH = LOG_DIR / "content_rules.json"
+# Compiled rule lists are stored by WebKit under this prefix and the hash of their source.
+CONTENT_RULES_PREFIX = "grok-overlay-rules-"
+
+# Analytics and ad trackers loaded by the page, blocked when loaded from another site.
+BUILTIN_CONTENT_RULES = [
+    {"trigger": {"url-filter": rf"^https?://([^/]+\.)?{re.escape(domain)}[:/]", "load-type": ["third-party"]}, "action": {"type": "block"}}
+    for domain in (
+        "google-analytics.com",
+        "googletagmanager.com",
+        "doubleclick.net",
+        "connect.facebook.net",
+        "analytics.twitter.com",
+        "static.ads-twitter.com",
+        "bat.bing.com",
+    )
+]
+
+CONTENT_RULE_ACTIONS = ("block", "block-cookies", "css-display-none", "ignore-previous-rules", "make-https")
+CONTENT_RULE_RESOURCE_TYPES = ("document", "image", "style-sheet", "script", "font", "raw", "svg-document", "media", "popup")
+CONTENT_RULE_LOAD_TYPES = ("first-party", "third-party")
+# Regular expression features WebKit content blockers do not support.
+UNSUPPORTED_FILTER = re.compile(r"\\[1-9]|\(\?|\{\d*,?\d*\}|\|")
+
+
+# Problems with a content blocking rule (empty if valid).
+def validate_rule(rule):
+    if not isinstance(rule, dict):
+        return ["rule must be an object"]
+    problems = []
+    trigger, action = rule.get("trigger"), rule.get("action")
+    if not isinstance(trigger, dict):
+        problems.append("missing trigger object")
+    else:
+        url_filter = trigger.get("url-filter")
+        if not isinstance(url_filter, str) or (not url_filter):
+            problems.append("trigger needs a non-empty url-filter")
+        elif not url_filter.isascii():
+            problems.append("url-filter must be ASCII")
+        elif UNSUPPORTED_FILTER.search(url_filter):
+            problems.append(f"url-filter {url_filter!r} uses unsupported syntax (groups with ?, back references, {{}} quantifiers, or |)")
+        else:
+            try:
+                re.compile(url_filter)
+            except re.error as e:
+                problems.append(f"url-filter {url_filter!r} is not a valid pattern ({e})")
+        if ("if-domain" in trigger) and ("unless-domain" in trigger):
+            problems.append("trigger cannot have both if-domain and unless-domain")
+        for key in ("if-domain", "unless-domain"):
+            if (key in trigger) and ((not isinstance(trigger[key], list)) or (not trigger[key]) or (not all(isinstance(domain, str) for domain in trigger[key]))):
+                problems.append(f"{key} must be a non-empty list of domains")
+        for key, allowed in (("resource-type", CONTENT_RULE_RESOURCE_TYPES), ("load-type", CONTENT_RULE_LOAD_TYPES)):
+            if (key in trigger) and ((not isinstance(trigger[key], list)) or any(value not in allowed for value in trigger[key])):
+                problems.append(f"{key} must be a list of: {', '.join(allowed)}")
+    if not isinstance(action, dict):
+        problems.append("missing action object")
+    elif action.get("type") not in CONTENT_RULE_ACTIONS:
+        problems.append(f"action type must be one of: {', '.join(CONTENT_RULE_ACTIONS)}")
+    elif (action["type"] == "css-display-none") and (not isinstance(action.get("selector"), str)):
+        problems.append("css-display-none needs a selector")
+    return problems
+
+
+# The built-in rules followed by the valid user rules from the file (if it exists).
+def load_content_rules(path=CONTENT_RULES_PATH, builtin=BUILTIN_CONTENT_RULES):
+    rules = list(builtin)
+    try:
+        with open(path, "r") as f:
+            user_rules = json.load(f)
+    except FileNotFoundError:
+        return rules
+    except (OSError, ValueError) as e:
+        LOGGER.warning(f"Ignoring unreadable content rules file {path}: {e}")
+        return rules
+    if not isinstance(user_rules, list):
+        LOGGER.warning(f"Ignoring content rules file {path}: expected a JSON list of rules.")
+        return rules
+    for index, rule in enumerate(user_rules):
+        problems = validate_rule(rule)
+        if problems:
+            LOGGER.warning(f"Skipping content rule {index} in {path}: {'; '.join(problems)}.")
+        else:
+            rules.append(rule)
+    return rules
+
+
+# Canonical JSON source of the rules (the same rules always give the same source).
+def encode_rules(rules):
+    return json.dumps(rules, sort_keys=True, separators=(",", ":"))
+
+
+# Identifier of a compiled rule list (changes whenever the rule source changes).
+def rules_identifier(source):
+    return CONTENT_RULES_PREFIX + hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+# Adapts WKContentRuleListStore to the store interface used by ContentRuleListLoader.
+class WebKitRuleListStore:
+    def __init__(self, store=None):
+        if store is None:
+            from WebKit import WKContentRuleListStore
+            store = WKContentRuleListStore.defaultStore()
+        self.store = store
+
+    def lookup(self, identifier, callback):
+        self.store.lookUpContentRuleListForIdentifier_completionHandler_(identifier, lambda rule_list, error: callback(rule_list))
+
+    def compile(self, identifier, source, callback):
+        self.store.compileContentRuleListForIdentifier_encodedContentRuleList_completionHandler_(identifier, source, callback)
+
+    def identifiers(self, callback):
+        self.store.getAvailableContentRuleListIdentifiers_(lambda identifiers: callback(list(identifiers or [])))
+
+    def remove(self, identifier):
+        self.store.removeContentRuleListForIdentifier_completionHandler_(identifier, lambda error: None)
+
+
+# Gets the compiled rule list for the rules, from the store when it was compiled by an
+# earlier launch (keyed by the hash of the rule source), compiling (and storing) it
+# otherwise. Lists compiled from older rules are removed. The `store` provides
+# lookup(identifier, callback), compile(identifier, source, callback),
+# identifiers(callback), and remove(identifier) (see WebKitRuleListStore).
+class ContentRuleListLoader:
+    def __init__(self, store, rules, clock=time.perf_counter):
+        self.store = store
+        self.rule_count = len(rules)
+        self.source = encode_rules(rules)
+        self.identifier = rules_identifier(self.source)
+        self.clock = clock
+        self.started = None
+        self.ready = False
+        self.rule_list = None
+        self.cached = None
+        self.duration_ms = None
+        self.waiting = []
+
+    def start(self):
+        self.started = self.clock()
+        self.store.lookup(self.identifier, self._looked_up)
+
+    # Call `callback(rule_list)` once the rule list is available (None if it failed).
+    def when_ready(self, callback):
+        if self.ready:
+            callback(self.rule_list)
+        else:
+            self.waiting.append(callback)
+
+    def _looked_up(self, rule_list):
+        if rule_list is not None:
+            self.cached = True
+            self._finish(rule_list)
+            return
+        self.cached = False
+        self.store.compile(self.identifier, self.source, self._compiled)
+
+    def _compiled(self, rule_list, error):
+        if rule_list is None:
+            LOGGER.warning(f"Could not compile the content blocking rules: {error}")
+        else:
+            self.store.identifiers(self._remove_stale)
+        self._finish(rule_list)
+
+    def _remove_stale(self, identifiers):
+        for identifier in identifiers:
+            if identifier.startswith(CONTENT_RULES_PREFIX) and (identifier != self.identifier):
+                self.store.remove(identifier)
+
+    def _finish(self, rule_list):
+        self.ready = True
+        self.rule_list = rule_list
+        self.duration_ms = round(1000 * (self.clock() - self.started), 1)
+        LOGGER.info(f"Content blocking rules ({self.rule_count}) {'loaded' if self.cached else 'compiled'} in {self.duration_ms} ms.")
+        waiting, self.waiting = self.waiting, []
+        for callback in waiting:
+            callback(rule_list)
+
+    def stats(self):
+        return {
+            "identifier": self.identifier,
+            "rules": self.rule_count,
+            "ready": self.ready,
+            "attached": self.rule_list is not None,
+            "cached": self.cached,
+            "duration_ms": self.duration_ms,
+        }
@@ -0,0 +1,226 @@
+# Python libraries
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+# Local libraries (no Apple frameworks, so `grok ctl` starts in milliseconds)
+from .constants import CONTROL_TIMEOUT
+from .health_checks import LOG_DIR
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+# Unix domain socket served by the running overlay. The protocol is one JSON object per
+# line in each direction:
+#   request:  {"id": 1, "cmd": "show", "args": {}}
+#   response: {"id": 1, "ok": true, "result": ...} or {"id": 1, "ok": false, "error": "..."}
+CONTROL_SOCKET_PATH = LOG_DIR / "control.sock"
+# Exit code of `grok ctl` when no overlay is running.
+CONTROL_NOT_RUNNING_EXIT = 2
+
+
+# Set the launcher trigger directly (with "flags" and "key"), or start the interactive
+# capture (like the 'Set Trigger' menu item) when no trigger is given.
+def set_trigger_command(app, args):
+    if ("flags" in args) != ("key" in args):
+        raise ValueError("flags and key must be given together.")
+    if "flags" in args:
+        return app.setLauncherTrigger(int(args["flags"]), int(args["key"]))
+    return app.setTrigger_(None)
+
+# Clear a named selection ("preset") or the given "categories" of web data (optionally
+# only data modified in the last "max_age" seconds).
+def clear_data_command(app, args):
+    return app.clearWebData(args.get("preset"), args.get("categories"), args.get("max_age"))
+
+# Commands, each called on the main thread with the application delegate and arguments.
+CONTROL_COMMANDS = {
+    "show": lambda app, args: app.showWindow_(None),
+    "hide": lambda app, args: app.hideWindow_(None),
+    "toggle": lambda app, args: app.toggleWindow_(None),
+    "home": lambda app, args: app.goToWebsite_(None),
+    "reload": lambda app, args: app.reloadWebsite_(None),
+    "clear-cache": lambda app, args: app.clearWebViewData_(None),
+    "clear-data": clear_data_command,
+    "set-trigger": set_trigger_command,
+    "downloads": lambda app, args: app.downloads.stats(),
+    "cancel-download": lambda app, args: app.cancelDownload(args.get("id", 0)),
+    "resume-download": lambda app, args: app.resumeDownload(args.get("id", 0)),
+    "stats": lambda app, args: app.controlStats(),
+    "health": lambda app, args: app.controlHealth(),
+    "ping": lambda app, args: {"pid": os.getpid()},
+}
+
+
+# Runs a function on the main thread (with `post`) and waits for its result.
+def call_on_main_thread(post, func, timeout=CONTROL_TIMEOUT):
+    if post is None:
+        return func()
+    done = threading.Event()
+    outcome = {}
+    def run():
+        try:
+            outcome["result"] = func()
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+    post(run)
+    if not done.wait(timeout):
+        raise TimeoutError(f"The main thread did not respond within {timeout} seconds.")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+# Execute one request (a decoded JSON object), returns the response object.
+def handle_request(app, request, post=None, commands=CONTROL_COMMANDS):
+    request_id = request.get("id") if isinstance(request, dict) else None
+    try:
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object.")
+        command = commands.get(request.get("cmd"))
+        if command is None:
+            raise ValueError(f"Unknown command {request.get('cmd')!r} (expected one of: {', '.join(sorted(commands))}).")
+        args = request.get("args") or {}
+        result = call_on_main_thread(post, lambda: command(app, args))
+        return {"id": request_id, "ok": True, "result": result}
+    except Exception as e:
+        return {"id": request_id, "ok": False, "error": str(e) or repr(e)}
+
+
+class ControlRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"id": None, "ok": False, "error": f"Invalid JSON: {e}"}
+            else:
+                response = handle_request(server.app, request, server.post, server.commands)
+            server.requests += 1
+            self.wfile.write((json.dumps(response, default=repr) + "\n").encode())
+            self.wfile.flush()
+
+
+class ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+# Serves the control socket on background threads, running commands on the main thread
+# through `post(func)` (or inline when `post` is None, e.g. with a fake delegate).
+class ControlServer:
+    def __init__(self, app, path=CONTROL_SOCKET_PATH, post=None, commands=CONTROL_COMMANDS):
+        self.app = app
+        self.path = str(path)
+        self.post = post
+        self.commands = commands
+        self.server = None
+        self.thread = None
+
+    # Bind the socket (replacing a stale one) and start serving, returns True on success.
+    def start(self):
+        if os.path.exists(self.path):
+            if is_socket_alive(self.path):
+                LOGGER.warning(f"Another process is already serving {self.path}.")
+                return False
+            os.unlink(self.path)
+        old_umask = os.umask(0o077)  # Only the current user may connect.
+        try:
+            self.server = ThreadingUnixServer(self.path, ControlRequestHandler)
+        except OSError as e:
+            LOGGER.warning(f"Could not start control socket at {self.path}: {e}")
+            return False
+        finally:
+            os.umask(old_umask)
+        self.server.app = self.app
+        self.server.post = self.post
+        self.server.commands = self.commands
+        self.server.requests = 0
+        self.thread = threading.Thread(target=self.server.serve_forever, name="control-server", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        self.thread = None
+
+    def stats(self):
+        return {"path": self.path, "requests": 0 if self.server is None else self.server.requests}
+
+
+# True if a server accepts connections on the socket path.
+def is_socket_alive(path, timeout=0.2):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+        return True
+    except OSError:
+        return False
+
+# Send one command to the running overlay, returns the response object. Raises
+# ConnectionError (or FileNotFoundError) when no overlay is listening.
+def send_command(cmd, args=None, path=CONTROL_SOCKET_PATH, timeout=CONTROL_TIMEOUT):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(path))
+        sock.sendall((json.dumps({"id": 1, "cmd": cmd, "args": args or {}}) + "\n").encode())
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("The overlay closed the connection without responding.")
+    return json.loads(line)
+
+
+# Command line client: `grok ctl <command> [--flags N --key N] [--preset P | --categories A,B] [--max-age S] [--id N]`.
+def ctl_main(argv=None):
+    parser = argparse.ArgumentParser(prog="grok ctl", description="Control the running overlay.")
+    parser.add_argument("command", choices=sorted(CONTROL_COMMANDS))
+    parser.add_argument("--flags", type=int, help="Modifier flags of the new trigger (set-trigger)")
+    parser.add_argument("--key", type=int, help="Keycode of the new trigger (set-trigger)")
+    parser.add_argument("--preset", help="Web data selection to clear (clear-data): cache, recent-cache, service-workers, cookies, or all")
+    parser.add_argument("--categories", help="Comma separated web data categories to clear (clear-data): disk-cache, memory-cache, service-workers, cookies, storage")
+    parser.add_argument("--max-age", type=float, help="Only clear web data modified in the last this many seconds (clear-data)")
+    parser.add_argument("--id", type=int, help="Download ID (cancel-download, resume-download), see the downloads command")
+    parser.add_argument("--timeout", type=float, default=CONTROL_TIMEOUT, help="Seconds to wait for a response")
+    args = parser.parse_args(argv)
+    if (args.flags is None) != (args.key is None):
+        parser.error("--flags and --key must be given together")
+    command_args = {}
+    if args.flags is not None:
+        command_args = {"flags": args.flags, "key": args.key}
+    if args.preset:
+        command_args["preset"] = args.preset
+    if args.categories:
+        command_args["categories"] = [category.strip() for category in args.categories.split(",") if category.strip()]
+    if args.max_age is not None:
+        command_args["max_age"] = args.max_age
+    if args.id is not None:
+        command_args["id"] = args.id
+    try:
+        response = send_command(args.command, command_args, timeout=args.timeout)
+    except (OSError, ValueError) as e:
+        print(f"Could not reach the running overlay at {CONTROL_SOCKET_PATH} ({e}).", file=sys.stderr)
+        return CONTROL_NOT_RUNNING_EXIT
+    if not response.get("ok"):
+        print(f"Error: {response.get('error')}", file=sys.stderr)
+        return 1
+    if response.get("result") is not None:
+        print(json.dumps(response["result"], indent=2, default=repr))
+    return 0
@@ -0,0 +1,294 @@
+# Python libraries
+import http.client
+import itertools
+import os
+import secrets
+import threading
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+# Local libraries
+from .constants import DOWNLOAD_CHUNK_SIZE, DOWNLOAD_TIMEOUT
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+# Suffix of the temporary file a download is written to before it is renamed.
+PARTIAL_SUFFIX = ".part"
+# Schemes of the downloads streamed by StreamingDownload (WebKit saves the others, e.g. blob:).
+STREAMED_SCHEMES = ("http", "https")
+
+
+# Raised by stream_download when cancelled, after `bytes_written` bytes (kept for resuming).
+class DownloadCancelled(Exception):
+    def __init__(self, bytes_written):
+        super().__init__(f"The download was cancelled after {bytes_written} bytes.")
+        self.bytes_written = bytes_written
+
+
+# A file name safe to create in the download folder (no directories, no hidden files).
+def safe_filename(name, default="download"):
+    name = os.path.basename(str(name or "").replace("\\", "/")).strip()
+    name = "".join(character for character in name if (character >= " ") and (character != ":"))
+    name = name.lstrip(".").strip()
+    return name[:255] or default
+
+
+# Candidate paths for a file name in a folder: "name.ext", "name (1).ext", "name (2).ext", ...
+def candidate_paths(folder, filename):
+    stem, extension = os.path.splitext(filename)
+    yield os.path.join(folder, filename)
+    for number in itertools.count(1):
+        yield os.path.join(folder, f"{stem} ({number}){extension}")
+
+
+# A new (not yet existing) temporary path for downloading a file into the folder.
+def temporary_path(folder, filename):
+    return os.path.join(folder, f".{safe_filename(filename)}.{secrets.token_hex(4)}{PARTIAL_SUFFIX}")
+
+
+# Atomically move a finished temporary file to the first free name for `filename` in its
+# folder (an existing file is never replaced, even by a concurrent download). Returns the path.
+def commit_file(temp_path, filename):
+    folder = os.path.dirname(temp_path)
+    for path in candidate_paths(folder, safe_filename(filename)):
+        try:
+            os.link(temp_path, path)
+        except FileExistsError:
+            continue
+        except OSError:
+            # No hard links on this volume, fall back to a rename (checked, not atomic).
+            if os.path.exists(path):
+                continue
+            os.rename(temp_path, path)
+            return path
+        os.unlink(temp_path)
+        return path
+
+
+# Cookie header for a request to `url`, from the cookies of the web view given as (name,
+# value, domain, path, secure) tuples. A domain starting with "." also matches its subdomains.
+def cookie_header(cookies, url):
+    url_parts = urlsplit(url)
+    host, path = (url_parts.hostname or "").lower(), url_parts.path or "/"
+    pairs = []
+    for name, value, domain, cookie_path, secure in cookies:
+        domain = str(domain).lower()
+        if domain.startswith("."):
+            if (host != domain[1:]) and (not host.endswith(domain)):
+                continue
+        elif host != domain:
+            continue
+        cookie_path = str(cookie_path or "/")
+        if not ((path == cookie_path) or path.startswith(cookie_path.rstrip("/") + "/")):
+            continue
+        if secure and (url_parts.scheme != "https"):
+            continue
+        pairs.append(f"{name}={value}")
+    return "; ".join(pairs)
+
+
+# Download `url` in chunks of `chunk_size` bytes straight to `temp_path` (the payload is
+# never held in memory). With an `offset`, the bytes already in the file are kept and the
+# rest is requested with a range request (starting over if the server sends the whole
+# file). Calls `progress(bytes_written, total_bytes)` after each chunk (total_bytes is
+# None if unknown), and raises DownloadCancelled once `cancelled()` is true, or IOError
+# if the body ends before its Content-Length. Returns the size of the file.
+def stream_download(url, temp_path, offset=0, headers=None, progress=None, cancelled=None,
+                    chunk_size=DOWNLOAD_CHUNK_SIZE, timeout=DOWNLOAD_TIMEOUT, opener=urllib.request.urlopen):
+    request = urllib.request.Request(url, headers=dict(headers or {}))
+    if offset:
+        request.add_header("Range", f"bytes={offset}-")
+    with opener(request, timeout=timeout) as response:
+        if offset and (getattr(response, "status", 200) != 206):
+            offset = 0  # The server sent the whole file.
+        length = response.headers.get("Content-Length")
+        total = (offset + int(length)) if (length is not None) and length.isdigit() else None
+        written = offset
+        with open(temp_path, "r+b" if offset else "wb") as f:
+            f.seek(offset)
+            f.truncate()
+            while True:
+                if (cancelled is not None) and cancelled():
+                    raise DownloadCancelled(written)
+                try:
+                    chunk = response.read(chunk_size)
+                except http.client.IncompleteRead as e:
+                    raise IOError(f"The download of {url} was cut short: {e}") from e
+                if not chunk:
+                    break
+                f.write(chunk)
+                written += len(chunk)
+                if progress is not None:
+                    progress(written, total)
+            f.flush()
+            os.fsync(f.fileno())
+    if (total is not None) and (written != total):
+        raise IOError(f"The download of {url} ended after {written} of {total} bytes.")
+    return written
+
+
+# A download streamed by this process (instead of WebKit, see stream_download) to the
+# temporary path of its DownloadManager entry, on a background thread. The outcome is
+# handed back through `post(func)` (to the main thread, called directly if None), where
+# the manager is updated. Cancelling keeps the partial file, which `resume()` continues.
+class StreamingDownload:
+    def __init__(self, manager, url, suggested_filename, headers=None, expected_bytes=None, post=None, stream=stream_download):
+        self.manager = manager
+        self.url = url
+        self.headers = dict(headers or {})
+        self.post = post
+        self.stream = stream
+        self.entry = manager.begin(suggested_filename, url, expected_bytes)
+        self.written = 0
+        self.total = None
+        self.cancel_requested = False
+        self.thread = None
+        manager.watch(self.entry["id"], lambda: (self.written, self.total))
+
+    def start(self, offset=0):
+        self.cancel_requested = False
+        self.written = offset
+        self.thread = threading.Thread(target=self._run, args=(offset,), name=f"download-{self.entry['id']}", daemon=True)
+        self.thread.start()
+
+    def _run(self, offset):
+        download_id = self.entry["id"]
+        try:
+            self.stream(self.url, self.entry["temp_path"], offset, self.headers, progress=self._progress, cancelled=lambda: self.cancel_requested)
+        except DownloadCancelled as e:
+            resume_data = {"url": self.url, "bytes": e.bytes_written}
+            self._post(lambda: self.manager.failed(download_id, None, resume_data, cancelled=True))
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            self._post(lambda: self.manager.failed(download_id, e))
+        else:
+            self._post(lambda: self.manager.finished(download_id))
+
+    def _progress(self, written, total):
+        self.written, self.total = written, total
+
+    def _post(self, func):
+        if self.post is None:
+            func()
+        else:
+            self.post(func)
+
+    # Stop the download (keeping its resume data), returns False if it is not in progress.
+    def cancel(self):
+        if self.manager.active(self.entry["id"]) is None:
+            return False
+        self.cancel_requested = True
+        return True
+
+    # Continue a cancelled or failed download, returns False if it cannot be resumed.
+    def resume(self):
+        resume_data = self.entry["resume_data"]
+        if (resume_data is None) or (self.manager.active(self.entry["id"]) is not None):
+            return False
+        self.manager.resumed(self.entry["id"])
+        self.start(resume_data["bytes"])
+        return True
+
+
+# Bookkeeping for the downloads of the overlay (streamed to the temporary path given here
+# by StreamingDownload, or by WebKit). Finished downloads are renamed to a free name.
+class DownloadManager:
+    def __init__(self, folder, clock=time.monotonic):
+        self.folder = os.path.expanduser(str(folder))
+        self.clock = clock
+        self.downloads = {}
+        self.next_id = 1
+
+    # A download is starting, returns its entry (with the temporary path to write to).
+    def begin(self, suggested_filename, url=None, expected_bytes=None):
+        os.makedirs(self.folder, exist_ok=True)
+        filename = safe_filename(suggested_filename)
+        entry = {
+            "id": self.next_id,
+            "url": url,
+            "filename": filename,
+            "temp_path": temporary_path(self.folder, filename),
+            "path": None,
+            "state": "downloading",
+            "expected_bytes": expected_bytes if (expected_bytes or 0) > 0 else None,
+            "bytes": 0,
+            "started": self.clock(),
+            "duration_sec": None,
+            "error": None,
+            "resume_data": None,
+            "progress": None,
+        }
+        self.downloads[entry["id"]] = entry
+        self.next_id += 1
+        LOGGER.info(f"Downloading {filename} from {url}.")
+        return entry
+
+    # Watch the progress of a download, `progress()` returns (bytes written, expected bytes).
+    def watch(self, download_id, progress):
+        self.downloads[download_id]["progress"] = progress
+
+    def update_progress(self, download_id):
+        entry = self.downloads[download_id]
+        if (entry["state"] != "downloading") or (entry["progress"] is None):
+            return
+        bytes_written, expected_bytes = entry["progress"]()
+        entry["bytes"] = max(0, int(bytes_written))
+        if (expected_bytes or 0) > 0:
+            entry["expected_bytes"] = int(expected_bytes)
+
+    # The entry of a download still in progress (None if it already ended).
+    def active(self, download_id):
+        entry = self.downloads.get(download_id)
+        return entry if (entry is not None) and (entry["state"] == "downloading") else None
+
+    # The temporary file is complete, give it its final name.
+    def finished(self, download_id):
+        entry = self.downloads[download_id]
+        entry["duration_sec"] = round(self.clock() - entry["started"], 2)
+        entry["progress"] = None
+        try:
+            entry["bytes"] = os.path.getsize(entry["temp_path"])
+            entry["path"] = commit_file(entry["temp_path"], entry["filename"])
+        except OSError as e:
+            return self.failed(download_id, e)
+        entry["state"] = "finished"
+        LOGGER.info(f"Downloaded {entry['path']} ({entry['bytes'] / 2**20:.1f} MB in {entry['duration_sec']} s).")
+        return entry
+
+    # The download failed or was cancelled, `resume_data` (if any) allows resuming it.
+    def failed(self, download_id, error, resume_data=None, cancelled=False):
+        entry = self.downloads[download_id]
+        entry["state"] = "cancelled" if cancelled else "failed"
+        entry["error"] = None if cancelled else str(error)
+        entry["resume_data"] = resume_data
+        entry["progress"] = None
+        entry["duration_sec"] = round(self.clock() - entry["started"], 2)
+        if resume_data is None:
+            try:
+                os.unlink(entry["temp_path"])
+            except FileNotFoundError:
+                pass
+        if cancelled:
+            LOGGER.info(f"Cancelled the download of {entry['filename']}{' (resumable)' if resume_data else ''}.")
+        else:
+            LOGGER.warning(f"Download of {entry['filename']} failed: {error}")
+        return entry
+
+    # A failed or cancelled download is being resumed (it keeps its temporary path).
+    def resumed(self, download_id):
+        entry = self.downloads[download_id]
+        entry.update(state="downloading", error=None, resume_data=None, started=self.clock(), duration_sec=None)
+        return entry
+
+    def stats(self):
+        for download_id in self.downloads:
+            self.update_progress(download_id)
+        return {
+            "folder": self.folder,
+            "downloads": [
+                {key: value for key, value in entry.items() if key not in ("resume_data", "progress", "started")}
+                | {"resumable": entry["resume_data"] is not None}
+                for entry in self.downloads.values()
+            ],
+        }
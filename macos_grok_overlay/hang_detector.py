@@ -0,0 +1,143 @@
+# Python libraries
+import bisect
+import json
+import sys
+import threading
+import time
+import traceback
+
+# Local libraries
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+# Upper bounds (seconds) of the stall histogram buckets (the last one is unbounded).
+STALL_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, float("inf"))
+
+
+# Detects main thread stalls. A watchdog thread posts a "ping" to the main loop (with
+# `post(func)`, which must run `func` on the main thread) and, if the ping has not run
+# within `threshold` seconds, captures the main thread's Python stack and records it
+# (at most once per `report_interval` seconds). When the ping finally runs, the total
+# stall duration is added to a histogram.
+class HangDetector:
+    def __init__(self, post, main_thread_id=None, threshold=0.5, interval=0.25, report_interval=60.0, report_path=None, clock=time.monotonic, frames=sys._current_frames):
+        self.post = post
+        self.main_thread_id = threading.main_thread().ident if main_thread_id is None else main_thread_id
+        self.threshold = threshold
+        self.interval = interval
+        self.report_interval = report_interval
+        self.report_path = report_path
+        self.clock = clock
+        self.frames = frames
+        self.lock = threading.Lock()
+        self.ping_sent = None
+        self.ping_reported = False
+        self.last_report = None
+        self.histogram = [0] * len(STALL_BUCKETS)
+        self.pings = 0
+        self.stalls = 0
+        self.reports = 0
+        self.suppressed = 0
+        self.longest = 0.0
+        self.thread = None
+        self.stopping = threading.Event()
+
+    # Runs on the main thread when the ping is processed.
+    def pong(self):
+        with self.lock:
+            sent, reported = self.ping_sent, self.ping_reported
+            self.ping_sent = None
+            self.ping_reported = False
+        if sent is None:
+            return
+        stalled = self.clock() - sent
+        if stalled >= self.threshold:
+            self.stalls += 1
+            self.histogram[bisect.bisect_left(STALL_BUCKETS, stalled)] += 1
+            self.longest = max(self.longest, stalled)
+            if reported:
+                LOGGER.warning(f"Main thread recovered after a {stalled:.2f} second stall.", extra={"stalled_sec": stalled})
+
+    # One watchdog step: send a ping if none is outstanding, otherwise check how long
+    # the outstanding ping has been waiting. Returns the stall report, if one was made.
+    def check(self):
+        now = self.clock()
+        with self.lock:
+            sent = self.ping_sent
+            if sent is None:
+                self.ping_sent = now
+                self.pings += 1
+            elif (now - sent < self.threshold) or self.ping_reported:
+                return None
+            else:
+                self.ping_reported = True
+        if sent is None:
+            self.post(self.pong)
+            return None
+        if (self.last_report is not None) and (now - self.last_report < self.report_interval):
+            self.suppressed += 1
+            return None
+        self.last_report = now
+        return self.report(now - sent)
+
+    # Capture the main thread's stack and record the stall.
+    def report(self, stalled):
+        frame = self.frames().get(self.main_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        report = {
+            "time": time.time(),
+            "stalled_sec": round(stalled, 3),
+            "suppressed": self.suppressed,
+            "stack": stack,
+        }
+        self.reports += 1
+        self.suppressed = 0
+        LOGGER.warning(f"Main thread stalled for {stalled:.2f} seconds, stack:\n{''.join(stack)}")
+        if self.report_path is not None:
+            try:
+                with open(self.report_path, "a") as f:
+                    f.write(json.dumps(report) + "\n")
+            except OSError as e:
+                LOGGER.warning(f"Could not write hang report to {self.report_path}: {e}")
+        return report
+
+    # Run the watchdog on a daemon thread.
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="hang-detector", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                LOGGER.error(f"Hang detector check failed: {e!r}")
+
+    def stop(self):
+        self.stopping.set()
+        if (self.thread is not None) and (self.thread is not threading.current_thread()):
+            self.thread.join()
+        self.thread = None
+
+    def stats(self):
+        return {
+            "pings": self.pings,
+            "stalls": self.stalls,
+            "reports": self.reports,
+            "longest_stall_sec": round(self.longest, 3),
+            "histogram": {
+                (f"<={bound:g}s" if bound != float("inf") else f">{STALL_BUCKETS[-2]:g}s"): count
+                for bound, count in zip(STALL_BUCKETS, self.histogram)
+            },
+        }
+
+
+# Run `func` on the main thread of the running NSApplication.
+def appkit_post(func):
+    from PyObjCTools import AppHelper
+    AppHelper.callAfter(func)
@@ -5,9 +5,13 @@ import tempfile
 import traceback
 import functools
 import platform
-import objc
 from pathlib import Path
 
+# Local libraries
+from .constants import LOG_MAX_BYTES
+from .journal import HealthJournal
+from .tracing import TRACER
+
 
 # Get a path for logging errors that is persistent.
 def get_log_dir():
@@ -22,7 +26,8 @@ def get_log_dir():
 # Settings for crash loop detection.
 LOG_DIR = get_log_dir()
 LOG_PATH = LOG_DIR / "macos_grok_overlay_error_log.txt"
-CRASH_COUNTER_FILE = LOG_DIR / "macos_grok_overlay_crash_counter.txt"
+JOURNAL_PATH = LOG_DIR / "macos_grok_overlay_health_journal.bin"
+HANG_REPORT_PATH = LOG_DIR / "macos_grok_overlay_hangs.jsonl"
 CRASH_THRESHOLD = 3    # Maximum allowed crashes within the time window.
 CRASH_TIME_WINDOW = 60 # Time window in seconds.
 
@@ -31,6 +36,7 @@ CRASH_TIME_WINDOW = 60 # Time window in seconds.
 def get_system_info():
     macos_version = platform.mac_ver()[0]
     python_version = platform.python_version()
+    import objc
     pyobjc_version = getattr(objc, '__version__', 'unknown')
     info = (
         "\n"
@@ -41,53 +47,60 @@ def get_system_info():
     )
     return info
 
-# Reads and updates the crash counter; exits if a crash loop is detected.
-def check_crash_loop():
-    current_time = time.time()
-    count = 0
-    last_time = 0
-    # Read previous crash info if it exists.
-    if os.path.exists(CRASH_COUNTER_FILE):
-        try:
-            with open(CRASH_COUNTER_FILE, "r") as f:
-                line = f.read().strip()
-                if line:
-                    last_time_str, count_str = line.split(",")
-                    last_time = float(last_time_str)
-                    count = int(count_str)
-        except Exception:
-            # On any error, reset the counter.
-            count = 0
-    # If the last crash was within the time window, increment; otherwise, reset.
-    if current_time - last_time < CRASH_TIME_WINDOW:
-        count += 1
-    else:
-        count = 1
-    # Write the updated crash info back to the file.
+# Open the health journal (shared by the checks below), None if it cannot be opened.
+@functools.lru_cache(maxsize=1)
+def get_journal():
     try:
-        with open(CRASH_COUNTER_FILE, "w") as f:
-            f.write(f"{current_time},{count}")
+        return HealthJournal(JOURNAL_PATH)
     except Exception as e:
-        print("Warning: Could not update crash counter file:", e)
+        print("Warning: Could not open health journal:", e)
+        return None
 
+# Records this start in the health journal; exits if a crash loop is detected.
+@TRACER.traced("check_crash_loop")
+def check_crash_loop():
+    journal = get_journal()
+    if journal is None:
+        return
+    try:
+        journal.record_start()
+        count = journal.failed_starts(CRASH_TIME_WINDOW)
+    except Exception as e:
+        print("Warning: Could not update health journal:", e)
+        return
     # If the count exceeds the threshold, abort further restarts.
     if count > CRASH_THRESHOLD:
-        print("ERROR: Crash loop detected (more than {} crashes within {} seconds). Crash counter file (for reference) at:\n  {}\n\nAborting further restarts. To resume attempts to launch, delete the counter file with:\n  rm {}\n\nError log (most recent) at:\n  {}".format(
+        print("ERROR: Crash loop detected (more than {} crashes within {} seconds). Health journal (for reference) at:\n  {}\n\nAborting further restarts. To review recent starts and crashes, run:\n  grok --dump-journal\nTo resume attempts to launch, delete the journal with:\n  rm {}\n\nError log at:\n  {}".format(
             CRASH_THRESHOLD,
             CRASH_TIME_WINDOW,
-            CRASH_COUNTER_FILE,
-            CRASH_COUNTER_FILE,
+            JOURNAL_PATH,
+            JOURNAL_PATH,
             LOG_PATH
         ))
         sys.exit(1)
 
-# Resets the crash counter after a successful run.
-def reset_crash_counter():
-    if os.path.exists(CRASH_COUNTER_FILE):
+# Records a clean exit (this run no longer counts towards a crash loop).
+def record_clean_exit(code=0):
+    journal = get_journal()
+    if journal is not None:
         try:
-            os.remove(CRASH_COUNTER_FILE)
+            journal.record_clean_exit(code)
         except Exception as e:
-            print("Warning: Could not reset crash counter file:", e)
+            print("Warning: Could not update health journal:", e)
+
+# Records a crash (an unhandled exception) in the health journal.
+def record_crash(code=1):
+    journal = get_journal()
+    if journal is not None:
+        try:
+            journal.record_crash(code)
+        except Exception as e:
+            print("Warning: Could not update health journal:", e)
+
+# Prints the contents of the health journal.
+def dump_journal():
+    journal = get_journal()
+    print("Health journal unavailable." if journal is None else journal.dump(), flush=True)
 
 # Decorator to wrap the main function with crash loop detection and error logging.
 # If the wrapped function raises an exception, the error is logged (with system info)
@@ -98,13 +111,22 @@ def health_check_decorator(func):
         check_crash_loop()
         try:
             result = func(*args, **kwargs)
-            reset_crash_counter()
+            record_clean_exit()
             print("SUCCESS")
             return result
+        except SystemExit as e:
+            # Deliberate exits (e.g., `--check-permissions`) are not crashes.
+            record_clean_exit(e.code if isinstance(e.code, int) else 1)
+            raise
         except Exception:
+            record_crash()
             system_info = get_system_info()
             error_trace = traceback.format_exc()
-            with open(LOG_PATH, "w") as log_file:
+            # Append (keeping the history of earlier failures), one timestamped entry per error.
+            if os.path.exists(LOG_PATH) and (os.path.getsize(LOG_PATH) > LOG_MAX_BYTES):
+                os.replace(LOG_PATH, f"{LOG_PATH}.1")
+            with open(LOG_PATH, "a") as log_file:
+                log_file.write(f"\n=== {time.strftime('%Y-%m-%d %H:%M:%S')} ===\n")
                 log_file.write("An unhandled exception occurred:\n")
                 log_file.write(system_info)
                 log_file.write(error_trace)
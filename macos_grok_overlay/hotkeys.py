@@ -0,0 +1,402 @@
+# Python libraries
+import abc
+import ctypes
+import functools
+
+# Local libraries
+from .constants import (
+    EVENT_TAP_CHECK_INTERVAL,
+    LAUNCHER_TRIGGER,
+    LAUNCHER_TRIGGER_MASK,
+    SEQUENCE_HISTORY,
+    SEQUENCE_TRIGGERS,
+    SEQUENCE_WINDOW,
+    TRIGGER_BINDINGS,
+)
+from .logs import get_logger
+from .sequences import SequenceMatcher
+from .tap_thread import TriggerHandoff, cf_run_loop_thread
+from .tap_watchdog import EventTapWatchdog, QuartzEventTap
+
+LOGGER = get_logger(__name__)
+
+# Names of the application methods invoked by each trigger action.
+TRIGGER_ACTIONS = {
+    "toggle": "toggleWindow_",
+    "home": "goToWebsite_",
+    "reload": "reloadWebsite_",
+}
+# Holds the compiled dispatch table, which maps a packed (flags, keycode) integer to a
+# bound action. A table is never modified once published: recompiling builds a new dict
+# and swaps it in with a single assignment, so a listener reading `DISPATCH.table` once
+# per event always sees either the old bindings or the new ones, never a mix.
+class DispatchTable:
+    def __init__(self):
+        self.table = {}
+
+DISPATCH = DispatchTable()
+# Compiled sequence triggers (chords and modifier double-taps).
+SEQUENCE_MATCHER = SequenceMatcher(SEQUENCE_WINDOW, SEQUENCE_HISTORY)
+# Keycodes occupy the low 16 bits of a packed trigger.
+KEYCODE_MASK = 0xFFFF
+
+# Pack masked modifier flags and a keycode into a single integer. All of the
+# modifier mask bits sit above bit 16, so they never collide with a keycode.
+def pack_trigger(flags, keycode):
+    return (flags & LAUNCHER_TRIGGER_MASK) | keycode
+
+# Split a packed trigger back into (flags, keycode).
+def unpack_trigger(packed):
+    return packed & ~KEYCODE_MASK, packed & KEYCODE_MASK
+
+# Get the callable for a trigger action. When the tap runs on its own thread (app has
+# a `trigger_handoff`), the action is handed off to the main thread instead of called.
+def resolve_action(app, action):
+    method = getattr(app, TRIGGER_ACTIONS[action])
+    handoff = getattr(app, "trigger_handoff", None)
+    if handoff is not None:
+        method = functools.partial(handoff.post, method)
+    return method
+
+# Rebuild the dispatch table (and sequence matcher) from the current triggers. Both
+# are published through module-level objects, so a running listener sees the new
+# bindings without being recreated. Returns the new table.
+def compile_dispatch_table(app):
+    table = {}
+    # Insert the launcher trigger last so that it wins over any conflicting binding.
+    bindings = list(TRIGGER_BINDINGS.items()) + [("toggle", LAUNCHER_TRIGGER)]
+    for action, trigger in bindings:
+        if (trigger["flags"] is None) or (trigger["key"] is None):
+            continue
+        table[pack_trigger(trigger["flags"], trigger["key"])] = resolve_action(app, action)
+    DISPATCH.table = table
+    SEQUENCE_MATCHER.compile([
+        ([(step["flags"] & LAUNCHER_TRIGGER_MASK, step["key"]) for step in sequence["steps"]], resolve_action(app, sequence["action"]))
+        for sequence in SEQUENCE_TRIGGERS
+        if sequence.get("action") in TRIGGER_ACTIONS
+    ])
+    return table
+
+
+# Base class for the ways of listening for the global hotkeys. A backend is started
+# once, rebound whenever the triggers change, and switched into "capture" mode while
+# the user is choosing a new launcher trigger (see `set_custom_launcher_trigger`).
+class HotkeyBackend(abc.ABC):
+    name = None
+
+    def __init__(self, app, settings=None):
+        self.app = app
+        self.settings = settings or {}
+        self.capturing = False
+
+    # Start listening, returns True if the backend is active.
+    @abc.abstractmethod
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    # Apply the current triggers (after they have been changed).
+    def rebind(self):
+        compile_dispatch_table(self.app)
+
+    # Deliver every following key press to `listener.handle_new_trigger`.
+    def begin_capture(self):
+        self.capturing = True
+
+    # Return to normal trigger matching with the (new) current triggers.
+    def end_capture(self):
+        self.capturing = False
+        self.rebind()
+
+    # Periodic health check, returns True if the backend is still listening.
+    def check(self):
+        return True
+
+    def stats(self):
+        return {"backend": self.name, "capturing": self.capturing}
+
+
+# Session-level Quartz event tap, the callback sees every key-down system-wide and
+# matches it against the compiled dispatch table (see `listener.global_show_hide_listener`).
+class EventTapBackend(HotkeyBackend):
+    name = "event-tap"
+
+    def __init__(self, app, settings=None):
+        super().__init__(app, settings)
+        self.tap = None
+        self.source = None
+        self.thread = None
+        self.timer = None
+        self.watchdog = EventTapWatchdog(QuartzEventTap())
+
+    def start(self):
+        from AppKit import NSTimer
+        from Quartz import (
+            CFMachPortCreateRunLoopSource,
+            CFRunLoopAddSource,
+            CFRunLoopGetCurrent,
+            CGEventMaskBit,
+            CGEventTapCreate,
+            CGEventTapEnable,
+            kCFRunLoopCommonModes,
+            kCGEventFlagsChanged,
+            kCGEventKeyDown,
+            kCGEventTapOptionDefault,
+            kCGHeadInsertEventTap,
+            kCGSessionEventTap,
+        )
+        from .listener import global_show_hide_listener
+        app = self.app
+        # When the tap runs on its own thread, matched triggers are handed off to the main thread.
+        on_thread = self.settings.get("tap_thread", False)
+        app.trigger_handoff = TriggerHandoff(app.wakeMainThreadForTriggers) if on_thread else None
+        # Create the event tap for key-down events (kept for the lifetime of the backend).
+        self.callback = global_show_hide_listener(app, self.watchdog)
+        event_mask = CGEventMaskBit(kCGEventKeyDown)
+        # Modifier-only presses are only needed by sequence triggers (e.g., double-tap Option).
+        if SEQUENCE_MATCHER.active:
+            event_mask |= CGEventMaskBit(kCGEventFlagsChanged)
+        self.tap = CGEventTapCreate(
+            kCGSessionEventTap, # Tap at the session level
+            kCGHeadInsertEventTap, # Insert at the head of the event queue
+            kCGEventTapOptionDefault, # Actively filter events
+            event_mask, # Capture key-down (and maybe flags-changed) events
+            self.callback, # Your callback function
+            None # Optional user info (refcon)
+        )
+        if not self.tap:
+            LOGGER.error("Failed to create event tap. Check Accessibility permissions.")
+            return False
+        # Integrate the tap into a run loop (a dedicated thread's, or the main one)
+        self.source = CFMachPortCreateRunLoopSource(None, self.tap, 0)
+        if on_thread:
+            self.thread = cf_run_loop_thread(self.source)
+            self.thread.start()
+        else:
+            CFRunLoopAddSource(CFRunLoopGetCurrent(), self.source, kCFRunLoopCommonModes)
+            # CFRunLoopRun() # Start the run loop (causes HANG as of Tahoe)
+        CGEventTapEnable(self.tap, True)
+        self.watchdog.tap.tap = self.tap
+        # Periodically make sure the tap is still enabled (in case a disable event was missed).
+        self.timer = NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
+            EVENT_TAP_CHECK_INTERVAL, app, "checkHotkeyBackend:", None, True
+        )
+        return True
+
+    def stop(self):
+        from Quartz import CFMachPortInvalidate, CGEventTapEnable
+        if self.timer is not None:
+            self.timer.invalidate()
+            self.timer = None
+        if self.tap is not None:
+            CGEventTapEnable(self.tap, False)
+            CFMachPortInvalidate(self.tap)
+        if self.thread is not None:
+            self.thread.stop()
+            self.thread = None
+        self.tap = None
+        self.watchdog.tap.tap = None
+
+    def check(self):
+        was_enabled = self.watchdog.disabled_since is None
+        is_enabled = self.watchdog.check()
+        if (not is_enabled) and was_enabled:
+            LOGGER.warning(f"Event tap is disabled and could not be re-enabled. {self.watchdog.stats()}")
+        return is_enabled
+
+    def stats(self):
+        stats = super().stats()
+        stats["watchdog"] = self.watchdog.stats()
+        handoff = getattr(self.app, "trigger_handoff", None)
+        if handoff is not None:
+            stats["handoff"] = handoff.stats()
+        return stats
+
+
+# Carbon constants (four character codes and modifier bits) used by RegisterEventHotKey.
+def four_char_code(code):
+    return int.from_bytes(code.encode("ascii"), "big")
+
+CARBON_PATH = "/System/Library/Frameworks/Carbon.framework/Carbon"
+CARBON_SIGNATURE = four_char_code("grok")
+K_EVENT_CLASS_KEYBOARD = four_char_code("keyb")
+K_EVENT_HOT_KEY_PRESSED = 5
+K_EVENT_PARAM_DIRECT_OBJECT = four_char_code("----")
+TYPE_EVENT_HOT_KEY_ID = four_char_code("hkid")
+# Quartz modifier flag -> Carbon modifier bit (shiftKey, controlKey, optionKey, cmdKey).
+CARBON_MODIFIERS = (
+    (1 << 17, 1 << 9),
+    (1 << 18, 1 << 12),
+    (1 << 19, 1 << 11),
+    (1 << 20, 1 << 8),
+)
+
+# Convert Quartz event flags to Carbon hot key modifiers.
+def carbon_modifiers(flags):
+    modifiers = 0
+    for quartz_bit, carbon_bit in CARBON_MODIFIERS:
+        if flags & quartz_bit:
+            modifiers |= carbon_bit
+    return modifiers
+
+
+class EventTypeSpec(ctypes.Structure):
+    _fields_ = [("eventClass", ctypes.c_uint32), ("eventKind", ctypes.c_uint32)]
+
+class EventHotKeyID(ctypes.Structure):
+    _fields_ = [("signature", ctypes.c_uint32), ("id", ctypes.c_uint32)]
+
+EventHandlerProcPtr = ctypes.CFUNCTYPE(ctypes.c_int32, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p)
+
+
+# Registered hot keys (Carbon RegisterEventHotKey). The OS matches the key combination,
+# so Python only runs when a trigger actually fires. Raw keys are only seen while
+# capturing a new trigger, through a local monitor on the (focused) overlay window.
+class CarbonHotkeyBackend(HotkeyBackend):
+    name = "carbon"
+
+    def __init__(self, app, settings=None):
+        super().__init__(app, settings)
+        self.carbon = None
+        self.handler_ref = None
+        self.hotkey_refs = []
+        self.actions = {}
+        self.capture_monitor = None
+        self.fired = 0
+
+    def start(self):
+        try:
+            self.carbon = carbon = ctypes.cdll.LoadLibrary(CARBON_PATH)
+        except OSError as e:
+            LOGGER.warning(f"Carbon hot keys are unavailable ({e}).")
+            return False
+        carbon.GetApplicationEventTarget.restype = ctypes.c_void_p
+        carbon.InstallEventHandler.argtypes = [
+            ctypes.c_void_p, EventHandlerProcPtr, ctypes.c_ulong,
+            ctypes.POINTER(EventTypeSpec), ctypes.c_void_p, ctypes.POINTER(ctypes.c_void_p),
+        ]
+        carbon.RegisterEventHotKey.argtypes = [
+            ctypes.c_uint32, ctypes.c_uint32, EventHotKeyID,
+            ctypes.c_void_p, ctypes.c_uint32, ctypes.POINTER(ctypes.c_void_p),
+        ]
+        carbon.UnregisterEventHotKey.argtypes = [ctypes.c_void_p]
+        carbon.RemoveEventHandler.argtypes = [ctypes.c_void_p]
+        carbon.GetEventParameter.argtypes = [
+            ctypes.c_void_p, ctypes.c_uint32, ctypes.c_uint32, ctypes.c_void_p,
+            ctypes.c_ulong, ctypes.c_void_p, ctypes.c_void_p,
+        ]
+        # Keep a reference to the callback for as long as it is installed.
+        self.handler_proc = EventHandlerProcPtr(self._handle_hotkey)
+        event_type = EventTypeSpec(K_EVENT_CLASS_KEYBOARD, K_EVENT_HOT_KEY_PRESSED)
+        handler_ref = ctypes.c_void_p()
+        status = carbon.InstallEventHandler(
+            carbon.GetApplicationEventTarget(), self.handler_proc, 1,
+            ctypes.byref(event_type), None, ctypes.byref(handler_ref)
+        )
+        if status != 0:
+            LOGGER.error(f"Failed to install Carbon hot key handler (status {status}).")
+            return False
+        self.handler_ref = handler_ref
+        if SEQUENCE_TRIGGERS:
+            LOGGER.warning("Sequence triggers are not supported by registered hot keys, use the event tap backend.")
+        return self.register()
+
+    # Register one hot key per entry in the compiled dispatch table.
+    def register(self):
+        carbon = self.carbon
+        target = carbon.GetApplicationEventTarget()
+        ok = True
+        for hotkey_id, (packed, action) in enumerate(compile_dispatch_table(self.app).items(), start=1):
+            flags, keycode = unpack_trigger(packed)
+            hotkey_ref = ctypes.c_void_p()
+            status = carbon.RegisterEventHotKey(
+                keycode, carbon_modifiers(flags), EventHotKeyID(CARBON_SIGNATURE, hotkey_id),
+                target, 0, ctypes.byref(hotkey_ref)
+            )
+            if status != 0:
+                LOGGER.error(f"Failed to register hot key {(flags, keycode)} (status {status}).")
+                ok = False
+                continue
+            self.hotkey_refs.append(hotkey_ref)
+            self.actions[hotkey_id] = action
+        return ok
+
+    def unregister(self):
+        for hotkey_ref in self.hotkey_refs:
+            self.carbon.UnregisterEventHotKey(hotkey_ref)
+        self.hotkey_refs = []
+        self.actions = {}
+
+    def rebind(self):
+        self.unregister()
+        self.register()
+
+    def stop(self):
+        self.unregister()
+        if self.handler_ref is not None:
+            self.carbon.RemoveEventHandler(self.handler_ref)
+            self.handler_ref = None
+
+    def begin_capture(self):
+        from AppKit import NSEvent, NSEventMaskKeyDown
+        from Quartz import CGEventGetFlags
+        from .listener import dispatch_new_trigger
+        super().begin_capture()
+        # Registered hot keys would swallow the presses, so release them while capturing.
+        self.unregister()
+        def capture(event):
+            cg_event = event.CGEvent()
+            dispatch_new_trigger(cg_event, CGEventGetFlags(cg_event) & LAUNCHER_TRIGGER_MASK, event.keyCode())
+            return None
+        self.capture_monitor = NSEvent.addLocalMonitorForEventsMatchingMask_handler_(NSEventMaskKeyDown, capture)
+
+    def end_capture(self):
+        from AppKit import NSEvent
+        if self.capture_monitor is not None:
+            NSEvent.removeMonitor_(self.capture_monitor)
+            self.capture_monitor = None
+        super().end_capture()
+
+    def stats(self):
+        stats = super().stats()
+        stats["registered"] = len(self.hotkey_refs)
+        stats["fired"] = self.fired
+        return stats
+
+    def _handle_hotkey(self, next_handler, event, user_data):
+        hotkey_id = EventHotKeyID()
+        status = self.carbon.GetEventParameter(
+            event, K_EVENT_PARAM_DIRECT_OBJECT, TYPE_EVENT_HOT_KEY_ID, None,
+            ctypes.sizeof(hotkey_id), None, ctypes.byref(hotkey_id)
+        )
+        action = self.actions.get(hotkey_id.id) if status == 0 else None
+        if action is not None:
+            self.fired += 1
+            action(None)
+        return 0
+
+
+# Selectable backends (by the "hotkey_backend" setting or --hotkey-backend).
+HOTKEY_BACKENDS = {
+    EventTapBackend.name: EventTapBackend,
+    CarbonHotkeyBackend.name: CarbonHotkeyBackend,
+}
+DEFAULT_HOTKEY_BACKEND = EventTapBackend.name
+
+# Create and start the named backend, falling back to the default backend when the
+# requested one is unknown or fails to start. Returns the started backend (or the
+# default one, even if it failed to start, so that rebinding remains possible).
+def start_hotkey_backend(app, name, settings=None, backends=HOTKEY_BACKENDS, default=DEFAULT_HOTKEY_BACKEND):
+    if name not in backends:
+        LOGGER.warning(f"Unknown hotkey backend {name!r}, using {default!r}.")
+        name = default
+    backend = backends[name](app, settings)
+    if backend.start() or (name == default):
+        return backend
+    LOGGER.warning(f"Hotkey backend {name!r} failed to start, falling back to {default!r}.")
+    backend.stop()
+    backend = backends[default](app, settings)
+    backend.start()
+    return backend
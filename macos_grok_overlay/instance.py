@@ -0,0 +1,137 @@
+# Python libraries
+import contextlib
+import fcntl
+import os
+import time
+
+# Local libraries (no Apple frameworks, the lock is taken before the GUI is imported)
+from .constants import HANDOFF_TIMEOUT
+from .health_checks import LOG_DIR
+
+# Advisory lock held by the running overlay for its whole lifetime (contains its PID).
+INSTANCE_LOCK_PATH = LOG_DIR / "instance.lock"
+
+
+# True if a process with the given PID exists.
+def pid_alive(pid):
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Single-instance lock (flock on a file in the log directory). The lock is released by
+# the kernel when the holder exits, and a lock file whose recorded owner is gone (e.g.,
+# held through a descriptor inherited by an orphaned child) is replaced. Writing the PID
+# after taking the lock and replacing a stale lock file both hold a second (guard) lock,
+# so a file is never replaced between another process locking it and recording its PID.
+class InstanceLock:
+    def __init__(self, path=INSTANCE_LOCK_PATH, pid=None):
+        self.path = str(path)
+        self.pid = os.getpid() if pid is None else pid
+        self.fd = None
+
+    # Try to take the lock, returns True if this process now holds it. With `wait`, keep
+    # trying (every `poll_interval` seconds) until the current holder exits.
+    def acquire(self, wait=False, poll_interval=0.5):
+        while self.fd is None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                replaced = self._replace_if_stale(fd)
+                os.close(fd)
+                if replaced:
+                    continue
+                if not wait:
+                    return False
+                time.sleep(poll_interval)
+                continue
+            with self._guard():
+                os.ftruncate(fd, 0)
+                os.write(fd, f"{self.pid}\n".encode())
+                # The file may have been replaced (stale recovery by another process) meanwhile.
+                current = self._is_current_file(fd)
+            if not current:
+                os.close(fd)
+                continue
+            self.fd = fd
+        return True
+
+    # Hold the guard lock (on a file next to the lock file, which is never replaced).
+    @contextlib.contextmanager
+    def _guard(self):
+        fd = os.open(self.path + ".guard", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    # Unlink the lock file open as `fd` (locked by another process) if the owner it records
+    # is gone. Returns True if the file was replaced (by this or another process), so
+    # that the lock can be tried again on the new file.
+    def _replace_if_stale(self, fd):
+        with self._guard():
+            if not self._is_current_file(fd):
+                return True
+            try:
+                owner = int(os.pread(fd, 32, 0).decode().strip() or 0) or None
+            except (OSError, ValueError):
+                owner = None
+            if (owner is None) or (owner == self.pid) or pid_alive(owner):
+                return False
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            return True
+
+    def _is_current_file(self, fd):
+        try:
+            return os.fstat(fd).st_ino == os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+
+    # PID recorded by the current holder (None if unknown).
+    def owner_pid(self):
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    # False once the recorded holder has exited (an unknown holder may still be starting).
+    def holder_alive(self):
+        owner = self.owner_pid()
+        return (owner is None) or pid_alive(owner)
+
+    def release(self):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+# Forward a command to the instance holding the lock, retrying while it may still be
+# starting (its control socket opens after the window and web view are created). Gives
+# up after `timeout` seconds, or as soon as `holder_alive()` reports that the holder has
+# exited. Returns the response, or None if unreachable.
+def hand_off(command="show", timeout=HANDOFF_TIMEOUT, retry_interval=0.05, send=None, holder_alive=None):
+    if send is None:
+        from .control import send_command as send
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return send(command)
+        except (OSError, ValueError):
+            if time.monotonic() >= deadline:
+                return None
+            if (holder_alive is not None) and (not holder_alive()):
+                return None
+            time.sleep(retry_interval)
@@ -0,0 +1,200 @@
+# Python libraries
+import contextlib
+import fcntl
+import mmap
+import os
+import struct
+import time
+import zlib
+
+
+# Append-only health journal kept in a fixed-size, memory-mapped ring buffer. Every
+# record (start, crash, clean exit) is one 32 byte slot written with a single slice
+# assignment and carries a sequence number and CRC32. A torn or corrupt slot fails its
+# checksum and is skipped, and the write position is recovered from the highest valid
+# sequence number (so no separate head pointer needs to be updated). Several processes
+# may append to the same journal: each append holds an exclusive flock on the file and
+# first catches up with the records other processes appended since (checking only the
+# slots from its cached head on, with a full scan only if they do not follow on), so no
+# writer reuses another's slot or sequence.
+JOURNAL_MAGIC = b"GRKJ"
+JOURNAL_VERSION = 1
+JOURNAL_CAPACITY = 256
+HEADER = struct.Struct("<4sHHI20x")  # magic, version, record size, capacity
+RECORD_BODY = struct.Struct("<QdIhB")  # sequence, timestamp, pid, code, kind
+RECORD = struct.Struct(f"<{RECORD_BODY.size}sI5x")  # body, CRC32 of body
+
+RECORD_START = 1
+RECORD_CRASH = 2
+RECORD_CLEAN_EXIT = 3
+RECORD_NAMES = {RECORD_START: "start", RECORD_CRASH: "crash", RECORD_CLEAN_EXIT: "clean-exit"}
+
+
+class JournalRecord:
+    def __init__(self, sequence, timestamp, kind, pid, code=0):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.kind = kind
+        self.pid = pid
+        self.code = code
+
+    def __repr__(self):
+        return f"JournalRecord({self.sequence}, {self.timestamp}, {RECORD_NAMES.get(self.kind, self.kind)}, pid={self.pid}, code={self.code})"
+
+    def pack(self):
+        body = RECORD_BODY.pack(self.sequence, self.timestamp, self.pid, self.code, self.kind)
+        return RECORD.pack(body, zlib.crc32(body))
+
+    # Unpack a slot, returns None for an empty, torn, or corrupt slot.
+    @staticmethod
+    def unpack(data):
+        body, checksum = RECORD.unpack(data)
+        if (zlib.crc32(body) != checksum) or (not any(body)):
+            return None
+        sequence, timestamp, pid, code, kind = RECORD_BODY.unpack(body)
+        if (sequence == 0) or (kind not in RECORD_NAMES):
+            return None
+        return JournalRecord(sequence, timestamp, kind, pid, code)
+
+
+class HealthJournal:
+    def __init__(self, path, capacity=JOURNAL_CAPACITY, clock=time.time, pid=None, sync=True):
+        self.path = path
+        self.capacity = capacity
+        self.clock = clock
+        self.pid = os.getpid() if pid is None else pid
+        self.sync = sync
+        self.file, self.map = self._open()
+        self._recover()
+
+    # Map the journal file, (re)creating it when missing or not in the expected format.
+    def _open(self):
+        size = HEADER.size + self.capacity * RECORD.size
+        header = HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, RECORD.size, self.capacity)
+        f = open(self.path, "a+b")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                if (os.fstat(f.fileno()).st_size != size) or (f.read(HEADER.size) != header):
+                    f.truncate(0)
+                    f.write(header + bytes(size - HEADER.size))
+                    f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            return f, mmap.mmap(f.fileno(), size)
+        except Exception:
+            f.close()
+            raise
+
+    # Find the next sequence number and slot from the newest valid record.
+    def _recover(self):
+        sequence, head, invalid_slots = 0, 0, 0
+        for slot in range(self.capacity):
+            record = self._read(slot)
+            if record is None:
+                if any(self.map[self._offset(slot):self._offset(slot) + RECORD.size]):
+                    invalid_slots += 1
+            elif record.sequence > sequence:
+                sequence, head = record.sequence, (slot + 1) % self.capacity
+        self.sequence, self.head, self.invalid_slots = sequence, head, invalid_slots
+
+    # Advance the cached write position past the records appended by other processes,
+    # falling back to a full scan when the newest known record was overwritten or the
+    # next ones do not follow on (e.g., another process wrapped around the ring).
+    def _catch_up(self):
+        if self.sequence:
+            last = self._read((self.head - 1) % self.capacity)
+            if (last is None) or (last.sequence != self.sequence):
+                self._recover()
+                return
+        for _ in range(self.capacity):
+            record = self._read(self.head)
+            if (record is None) or (record.sequence <= self.sequence):
+                return
+            if record.sequence != self.sequence + 1:
+                self._recover()
+                return
+            self.sequence, self.head = record.sequence, (self.head + 1) % self.capacity
+
+    # Hold a lock on the journal file (shared for reading, exclusive for writing), with
+    # the write position caught up with the records written so far by any process.
+    @contextlib.contextmanager
+    def _locked(self, operation=fcntl.LOCK_EX):
+        fcntl.flock(self.file, operation)
+        try:
+            self._catch_up()
+            yield
+        finally:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+
+    def _offset(self, slot):
+        return HEADER.size + slot * RECORD.size
+
+    def _read(self, slot):
+        offset = self._offset(slot)
+        return JournalRecord.unpack(self.map[offset:offset + RECORD.size])
+
+    # Append a record (overwriting the oldest once the ring is full).
+    def append(self, kind, code=0):
+        with self._locked(fcntl.LOCK_EX):
+            self.sequence += 1
+            record = JournalRecord(self.sequence, self.clock(), kind, self.pid, code)
+            offset = self._offset(self.head)
+            self.map[offset:offset + RECORD.size] = record.pack()
+            if self.sync:
+                self.map.flush()
+            self.head = (self.head + 1) % self.capacity
+        return record
+
+    def record_start(self):
+        return self.append(RECORD_START)
+
+    def record_crash(self, code=1):
+        return self.append(RECORD_CRASH, code)
+
+    def record_clean_exit(self, code=0):
+        return self.append(RECORD_CLEAN_EXIT, code)
+
+    # Valid records, oldest first.
+    def records(self):
+        records = (self._read(slot) for slot in range(self.capacity))
+        return sorted((r for r in records if r is not None), key=lambda r: r.sequence)
+
+    # Valid records newer than `since` (timestamp), newest first, reading backwards from
+    # the head until a record is older than `since` (so, once the head is recovered, the
+    # cost is O(window)).
+    def recent(self, since):
+        recent = []
+        with self._locked(fcntl.LOCK_SH):
+            expected = self.sequence
+            for i in range(1, self.capacity + 1):
+                record = self._read((self.head - i) % self.capacity)
+                if record is None:
+                    continue
+                if (record.sequence > expected) or (record.timestamp < since):
+                    break
+                expected = record.sequence - 1
+                recent.append(record)
+        return recent
+
+    # Number of starts within the last `window` seconds that did not end in a clean exit
+    # (crashed, were killed, or are still running, like the current process).
+    def failed_starts(self, window):
+        recent = self.recent(self.clock() - window)
+        clean = {r.pid for r in recent if r.kind == RECORD_CLEAN_EXIT}
+        return sum(1 for r in recent if (r.kind == RECORD_START) and (r.pid not in clean))
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    # Human readable listing of the journal.
+    def dump(self):
+        with self._locked(fcntl.LOCK_SH):
+            self._recover()
+        lines = [f"Health journal {self.path} ({self.capacity} slots, {self.invalid_slots} invalid):"]
+        for record in self.records():
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.timestamp))
+            lines.append(f"  #{record.sequence:<6} {when}  {RECORD_NAMES[record.kind]:<10}  pid {record.pid:<7} code {record.code}")
+        return "\n".join(lines)
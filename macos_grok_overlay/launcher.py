@@ -1,19 +1,15 @@
 # Python libraries.
 import getpass
 import os
-import subprocess
 import sys
-import time
 from pathlib import Path
 
-# Apple libraries.
+# Apple libraries (Foundation and ApplicationServices are imported where needed).
 import plistlib
-from Foundation import NSDictionary
-from ApplicationServices import AXIsProcessTrustedWithOptions, kAXTrustedCheckOptionPrompt
 
 # Local libraries
 from .constants import APP_TITLE
-from .health_checks import reset_crash_counter
+from .probe import subprocess_trust_oracle, wait_for_trust
 
 
 # Get the executable path.
@@ -30,21 +26,30 @@ def get_executable():
         program_args = [sys.executable, "-m", f"macos_{APP_TITLE.lower()}_overlay"]
     return program_args
 
+# Label of the Launch Agent installed by `install_startup`.
+def get_launch_agent_label():
+    return f"com.{getpass.getuser()}.macos{APP_TITLE.lower()}overlay"
+
+# True if this process was started by the installed Launch Agent (launchd sets the
+# XPC_SERVICE_NAME environment variable to the job label).
+def started_by_launch_agent():
+    return os.environ.get("XPC_SERVICE_NAME") == get_launch_agent_label()
+
 # Install the app as a startup application using a Launch Agent.
 def install_startup():
     # Get the absolute path to the macos-*-overlay script
-    username = getpass.getuser()
+    label = get_launch_agent_label()
     program_args = get_executable()
     # Define the PLIST data..
     plist = {
-        "Label": f"com.{username}.macos{APP_TITLE.lower()}overlay",
+        "Label": label,
         "ProgramArguments": program_args,
         "RunAtLoad": True,
         "KeepAlive": True,  # Will be restarted automatically on failure.
     }
     launch_agents_dir = Path.home() / "Library" / "LaunchAgents"
     launch_agents_dir.mkdir(parents=True, exist_ok=True)
-    plist_path = launch_agents_dir / f"com.{username}.macos{APP_TITLE.lower()}overlay.plist"
+    plist_path = launch_agents_dir / f"{label}.plist"
     with open(plist_path, "wb") as f:
         plistlib.dump(plist, f)
     result = os.system(f"launchctl load {plist_path}")
@@ -58,9 +63,8 @@ def install_startup():
 
 # Uninstall the app from running at login.
 def uninstall_startup():
-    username = getpass.getuser()
     launch_agents_dir = Path.home() / "Library" / "LaunchAgents"
-    plist_path = launch_agents_dir / f"com.{username}.macos{APP_TITLE.lower()}overlay.plist"
+    plist_path = launch_agents_dir / f"{get_launch_agent_label()}.plist"
     if plist_path.exists():
         try:
             os.system(f"launchctl unload {plist_path}")
@@ -76,6 +80,8 @@ def uninstall_startup():
 
 # Check if the current process has Accessibility permissions.
 def check_permissions(ask=True):
+    from Foundation import NSDictionary
+    from ApplicationServices import AXIsProcessTrustedWithOptions, kAXTrustedCheckOptionPrompt
     print("\nChecking permission to utilize macOS Accessibility features to listen for the Option+Space keyboard sequence. If permission is not currently granted, a request will be made through the dialogue for the current executor (e.g., Terminal, python3, ...).\n", flush=True)
     options = NSDictionary.dictionaryWithObject_forKey_(
         True,
@@ -84,25 +90,14 @@ def check_permissions(ask=True):
     is_trusted = AXIsProcessTrustedWithOptions(options if ask else None)
     return is_trusted
 
-# Spawn a child process to check the latest permission status.
+# Spawn a (minimal) child process to check the latest permission status.
 def get_updated_permission_status():
-    result = subprocess.run(
-        get_executable() + ["--check-permissions"],
-        capture_output=True,
-        text=True
-    )
-    return result.returncode == 0
+    return subprocess_trust_oracle(get_executable())()
 
-# Wait for permissions to be granted, checking periodically.
-def wait_for_permissions(max_wait_sec=60, wait_interval_sec=5):
-    elapsed = 0
-    while elapsed < max_wait_sec:
-        if get_updated_permission_status():
-            return True
-        time.sleep(wait_interval_sec)
-        elapsed += wait_interval_sec
-        reset_crash_counter()
-    return False
+# Wait for permissions to be granted, probing with backoff (and as soon as macOS
+# reports an Accessibility change).
+def wait_for_permissions(max_wait_sec=60):
+    return wait_for_trust(subprocess_trust_oracle(get_executable()), max_wait_sec=max_wait_sec)
 
 # Ensure Accessibility permissions are granted, relaunching if necessary.
 def ensure_accessibility_permissions():
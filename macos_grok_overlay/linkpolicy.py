@@ -0,0 +1,109 @@
+# Python libraries
+import re
+from urllib.parse import urlsplit
+
+# Local libraries
+from .constants import WEBSITE
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+# Sites kept inside the overlay when a link to them is followed: the website itself and
+# the sign-in flows. Patterns are "host" or "host/path", where "*" matches anything and a
+# leading "*." also matches the bare domain ("*.x.com" matches x.com and api.x.com).
+DEFAULT_INTERNAL_LINK_PATTERNS = (
+    f"*.{urlsplit(WEBSITE).hostname}",
+    "*.x.ai",
+    "*.x.com",
+    "*.twitter.com",
+    "accounts.google.com",
+    "appleid.apple.com",
+    "challenges.cloudflare.com",
+)
+# Schemes that never leave the overlay (they do not load a new site).
+INTERNAL_SCHEMES = ("about", "blob", "data", "javascript")
+WEB_SCHEMES = ("http", "https")
+
+POLICY_OVERLAY = "overlay"
+POLICY_EXTERNAL = "external"
+
+
+# Regular expression (for "host/path" strings) of one pattern.
+def pattern_regex(pattern):
+    pattern = pattern.strip()
+    if "://" in pattern:
+        pattern = pattern.split("://", 1)[1]
+    host, slash, path = pattern.partition("/")
+    if not host:
+        raise ValueError(f"Link pattern {pattern!r} has no host.")
+    if host.startswith("*."):
+        host_regex = r"(?:[^/]*\.)?" + re.escape(host[2:]).replace(r"\*", "[^/]*")
+    else:
+        host_regex = re.escape(host).replace(r"\*", "[^/]*")
+    path_regex = "(?:/.*)?" if not slash else "/" + re.escape(path).replace(r"\*", ".*")
+    return host_regex + path_regex
+
+
+# One precompiled regular expression matching any of the patterns (None if there are none).
+def compile_link_patterns(patterns):
+    regexes = [pattern_regex(pattern) for pattern in patterns]
+    if not regexes:
+        return None
+    return re.compile("(?:" + "|".join(regexes) + ")", re.DOTALL | re.IGNORECASE)
+
+
+# Decides where a followed link opens: in the overlay, or in the default browser. Links
+# matching `external` always open in the browser, then links matching `internal` stay in
+# the overlay. Other web links open in the browser when the user followed them (a click
+# or a popup), while other navigations (e.g., redirects during sign-in) stay. Links with
+# non-web schemes (mailto:, tel:, ...) always go to their application.
+class LinkPolicy:
+    def __init__(self, internal=DEFAULT_INTERNAL_LINK_PATTERNS, external=()):
+        self.internal = compile_link_patterns(internal)
+        self.external = compile_link_patterns(external)
+        self.counts = {POLICY_OVERLAY: 0, POLICY_EXTERNAL: 0}
+
+    # Build from the settings (extra patterns), skipping invalid patterns.
+    @classmethod
+    def from_settings(cls, settings):
+        patterns = {}
+        for key, defaults in (("internal_link_patterns", DEFAULT_INTERNAL_LINK_PATTERNS), ("external_link_patterns", ())):
+            patterns[key] = list(defaults)
+            for pattern in settings.get(key) or []:
+                try:
+                    pattern_regex(pattern)
+                except (ValueError, AttributeError) as e:
+                    LOGGER.warning(f"Ignoring link pattern {pattern!r} in {key}: {e}")
+                    continue
+                patterns[key].append(pattern)
+        return cls(patterns["internal_link_patterns"], patterns["external_link_patterns"])
+
+    def matches(self, regex, url_parts):
+        if regex is None:
+            return False
+        target = (url_parts.hostname or "") + (url_parts.path or "/")
+        return regex.fullmatch(target) is not None
+
+    # POLICY_OVERLAY or POLICY_EXTERNAL for a URL, `user_initiated` if the user followed it.
+    def decide(self, url, user_initiated=True):
+        try:
+            url_parts = urlsplit(str(url))
+            scheme = url_parts.scheme.lower()
+        except ValueError:
+            return self._count(POLICY_OVERLAY)
+        if (not scheme) or (scheme in INTERNAL_SCHEMES):
+            return self._count(POLICY_OVERLAY)
+        if scheme not in WEB_SCHEMES:
+            return self._count(POLICY_EXTERNAL)
+        if self.matches(self.external, url_parts):
+            return self._count(POLICY_EXTERNAL)
+        if self.matches(self.internal, url_parts) or (not user_initiated):
+            return self._count(POLICY_OVERLAY)
+        return self._count(POLICY_EXTERNAL)
+
+    def _count(self, decision):
+        self.counts[decision] += 1
+        return decision
+
+    def stats(self):
+        return dict(self.counts)
@@ -20,6 +20,8 @@ from Quartz import (
     CGEventKeyboardGetUnicodeString,
     CGEventGetFlags,
     CGEventGetIntegerValueField,
+    CGEventGetTimestamp,
+    kCGEventFlagsChanged,
     kCGEventKeyDown,
     kCGKeyboardEventKeycode,
 )
@@ -32,8 +34,14 @@ from AppKit import (
 
 
 # Local libraries
-from .constants import LAUNCHER_TRIGGER, LAUNCHER_TRIGGER_MASK
+from .constants import LAUNCHER_TRIGGER, LAUNCHER_TRIGGER_MASK, SEQUENCE_TRIGGERS, TRIGGER_BINDINGS
 from .health_checks import LOG_DIR
+from .hotkeys import DISPATCH, SEQUENCE_MATCHER, TRIGGER_ACTIONS, compile_dispatch_table
+from .logs import get_logger
+from .sequences import MODIFIER_KEY
+from .tracing import TRACER
+
+LOGGER = get_logger(__name__)
 
 # File for storing the custom trigger
 TRIGGER_FILE = LOG_DIR / "custom_trigger.json"
@@ -48,24 +56,56 @@ SPECIAL_KEY_NAMES = {
 handle_new_trigger = None
 
 # Load trigger from JSON file if it exists
+@TRACER.traced("load_custom_launcher_trigger")
 def load_custom_launcher_trigger():
     if TRIGGER_FILE.exists():
         try:
             with open(TRIGGER_FILE, "r") as f:
                 data = json.load(f)
                 launcher_trigger = {"flags": data["flags"], "key": data["key"]}
-            print(f"Overwriting default with a custom launch trigger:\n  {launcher_trigger}", flush=True)
-            print(f"Disable custom override and return to default by deleting the file:\n  {TRIGGER_FILE}", flush=True)
+                bindings = {
+                    action: {"flags": trigger["flags"], "key": trigger["key"]}
+                    for action, trigger in data.get("bindings", {}).items()
+                    if action in TRIGGER_BINDINGS
+                }
+                sequences = [
+                    {"action": sequence["action"], "steps": [{"flags": step["flags"], "key": step["key"]} for step in sequence["steps"]]}
+                    for sequence in data.get("sequences", [])
+                    if sequence["action"] in TRIGGER_ACTIONS
+                ]
+                sequence_window = float(data.get("sequence_window", SEQUENCE_MATCHER.window))
+            LOGGER.info(f"Overwriting default with a custom launch trigger:\n  {launcher_trigger}")
+            LOGGER.info(f"Disable custom override and return to default by deleting the file:\n  {TRIGGER_FILE}")
             LAUNCHER_TRIGGER.update(launcher_trigger)
-        except (json.JSONDecodeError, KeyError):
+            for action, trigger in bindings.items():
+                TRIGGER_BINDINGS[action].update(trigger)
+            SEQUENCE_TRIGGERS[:] = sequences
+            SEQUENCE_MATCHER.window = sequence_window
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError, ValueError):
             pass
 
+# Save the launcher trigger (and any extra bindings) to the JSON file.
+def save_custom_launcher_trigger():
+    data = {"flags": LAUNCHER_TRIGGER["flags"], "key": LAUNCHER_TRIGGER["key"]}
+    bindings = {
+        action: dict(trigger) for action, trigger in TRIGGER_BINDINGS.items()
+        if (trigger["flags"] is not None) and (trigger["key"] is not None)
+    }
+    if bindings:
+        data["bindings"] = bindings
+    if SEQUENCE_TRIGGERS:
+        data["sequences"] = SEQUENCE_TRIGGERS
+        data["sequence_window"] = SEQUENCE_MATCHER.window
+    with open(TRIGGER_FILE, "w") as f:
+        json.dump(data, f)
+
 def set_custom_launcher_trigger(app):
     app.showWindow_(None)
-    print("Setting new launcher trigger.", flush=True)
+    LOGGER.info("Setting new launcher trigger.")
     # Disable the current trigger
     LAUNCHER_TRIGGER["flags"] = None
     LAUNCHER_TRIGGER["key"] = None
+    app.hotkey_backend.begin_capture()
     # Get the content view bounds
     content_view = app.window.contentView()
     content_bounds = content_view.bounds()
@@ -135,26 +175,29 @@ def set_custom_launcher_trigger(app):
     # Define the handler for the new trigger
     def custom_handle_new_trigger(event, flags, keycode):
         launcher_trigger = {"flags": flags, "key": keycode}
-        with open(TRIGGER_FILE, "w") as f:
-            json.dump(launcher_trigger, f)
         LAUNCHER_TRIGGER.update(launcher_trigger)
+        save_custom_launcher_trigger()
         trigger_str = get_trigger_string(event, flags, keycode)
-        print("New launcher trigger set:", flush=True)
-        print(f"  {launcher_trigger}", flush=True)
-        print(f"  {trigger_str}", flush=True)
+        LOGGER.info(f"New launcher trigger set:\n  {launcher_trigger}\n  {trigger_str}", extra={"trigger": launcher_trigger})
         # Update only the trigger display, not the message label
         trigger_display.setStringValue_(trigger_str)
         # Remove the overlay after 3 seconds
         overlay_view.performSelector_withObject_afterDelay_("removeFromSuperview", None, 1.5)
-        # Reset the handler
+        # Reset the handler and return the hotkey backend to matching the new trigger
         global handle_new_trigger
         handle_new_trigger = None
+        app.hotkey_backend.end_capture()
         app.showWindow_(None)
         return None
     # Set the global handler
     global handle_new_trigger
     handle_new_trigger = custom_handle_new_trigger
 
+# Pass captured keys to the new-trigger handler, if capturing is still in progress.
+def dispatch_new_trigger(event, flags, keycode):
+    if handle_new_trigger is not None:
+        handle_new_trigger(event, flags, keycode)
+
 # Helper function to get modifier names
 def get_modifier_names(flags):
     modifier_names = []
@@ -180,21 +223,44 @@ def get_trigger_string(event, flags, keycode):
     # Generate a plain text of the keys.
     return " + ".join(modifier_names + [key_name]) if modifier_names else key_name
 
-# Global event listener for showing/hiding the application and setting new triggers
-def global_show_hide_listener(app):
+# Global event listener for showing/hiding the application and setting new triggers.
+# This runs for every key pressed anywhere on the system, so the matching is a single
+# lookup in the compiled dispatch table (no allocation per key, regardless of binding count).
+# The table is read once per event, so a rebind swapping in a new one is picked up
+# by the next key.
+# Keys that miss the table (and modifier-only presses) go to the sequence matcher when
+# sequence triggers are configured. Any other event type is offered to the (optional)
+# watchdog, which re-enables the tap when macOS disables it.
+def global_show_hide_listener(app, watchdog=None):
+    compile_dispatch_table(app)
+    holder = DISPATCH
+    sequences = SEQUENCE_MATCHER
+    handoff = getattr(app, "trigger_handoff", None)
     def listener(proxy, event_type, event, refcon):
         if event_type == kCGEventKeyDown:
             keycode = CGEventGetIntegerValueField(event, kCGKeyboardEventKeycode)
             flags = CGEventGetFlags(event) & LAUNCHER_TRIGGER_MASK
-            if (None in set(LAUNCHER_TRIGGER.values())) and handle_new_trigger:
-                print("  received keys, establishing new trigger..", flush=True)
-                handle_new_trigger(event, flags, keycode)
-                return None
-            elif (flags == LAUNCHER_TRIGGER["flags"]) and (keycode == LAUNCHER_TRIGGER["key"]):
-                if app.window.isKeyWindow():
-                    app.hideWindow_(None)
+            if handle_new_trigger is not None:
+                LOGGER.debug("Received keys, establishing new trigger.")
+                if handoff is not None:
+                    handoff.post(dispatch_new_trigger, event, flags, keycode)
                 else:
-                    app.showWindow_(None)
+                    dispatch_new_trigger(event, flags, keycode)
+                return None
+            action = holder.table.get(flags | keycode)
+            if (action is None) and sequences.active:
+                action = sequences.feed(CGEventGetTimestamp(event) * 1e-9, flags, keycode)
+            if action is not None:
+                action(None)
                 return None
+        elif event_type == kCGEventFlagsChanged:
+            flags = CGEventGetFlags(event) & LAUNCHER_TRIGGER_MASK
+            # Only presses advance a sequence, releases (no modifiers held) are ignored.
+            if flags and sequences.active and (handle_new_trigger is None):
+                action = sequences.feed(CGEventGetTimestamp(event) * 1e-9, flags, MODIFIER_KEY)
+                if action is not None:
+                    action(None)
+        elif watchdog is not None:
+            watchdog.handle_event(event_type)
         return event
     return listener
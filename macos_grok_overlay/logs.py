@@ -0,0 +1,141 @@
+# Python libraries
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+# Local libraries
+from .constants import (
+    LOG_BACKUP_COUNT,
+    LOG_LEVEL_ENV,
+    LOG_MAX_BYTES,
+    LOG_QUEUE_SIZE,
+)
+
+
+# All loggers of the package are children of this one (so they share its handlers).
+LOGGER_NAME = "macos_grok_overlay"
+LOG_FILE_NAME = "macos_grok_overlay.jsonl"
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+DEFAULT_LOG_LEVEL = "INFO"
+# Attributes of every LogRecord (anything else was passed with `extra=` and is kept).
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+# Logger for a module, e.g. `get_logger(__name__)`.
+def get_logger(name):
+    if not name.startswith(LOGGER_NAME):
+        name = f"{LOGGER_NAME}.{name}"
+    return logging.getLogger(name)
+
+
+# Formats a record as one JSON object per line, including any `extra=` fields.
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=repr)
+
+
+# Queue handler that drops (and counts) records instead of blocking when the queue is
+# full, so that logging from the event tap callback never waits on I/O.
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    # Merge the arguments into the message and the traceback into `exc_text` (the base
+    # class appends the traceback to the message, which loses the "exception" field).
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# Active queue handler and the background listener thread writing its records.
+QUEUE_HANDLER = None
+LISTENER = None
+
+
+# Level from the argument, else the environment variable, else the default.
+def resolve_log_level(level=None, default=DEFAULT_LOG_LEVEL):
+    level = str(level or os.environ.get(LOG_LEVEL_ENV) or default).upper()
+    if level not in LOG_LEVELS:
+        print(f"Unknown log level {level!r}, using {DEFAULT_LOG_LEVEL}.", flush=True)
+        level = DEFAULT_LOG_LEVEL
+    return level
+
+# Send the package's log records through a bounded queue to a background thread that
+# writes them to a size-rotated JSONL file in the log directory (and to the console).
+def setup_logging(level=None, default_level=DEFAULT_LOG_LEVEL, log_dir=None, console=True, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, queue_size=LOG_QUEUE_SIZE):
+    global QUEUE_HANDLER, LISTENER
+    if log_dir is None:
+        from .health_checks import LOG_DIR as log_dir
+    stop_logging()
+    handlers = []
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, LOG_FILE_NAME), maxBytes=max_bytes, backupCount=backup_count, delay=True
+    )
+    file_handler.setFormatter(JsonLineFormatter())
+    handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("%(message)s"))
+        handlers.append(console_handler)
+    QUEUE_HANDLER = DroppingQueueHandler(queue.Queue(queue_size))
+    LISTENER = logging.handlers.QueueListener(QUEUE_HANDLER.queue, *handlers, respect_handler_level=True)
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(resolve_log_level(level, default_level))
+    logger.addHandler(QUEUE_HANDLER)
+    logger.propagate = False
+    LISTENER.start()
+    return logger
+
+# Flush the queued records and stop the background thread.
+def stop_logging():
+    global QUEUE_HANDLER, LISTENER
+    if LISTENER is not None:
+        LISTENER.stop()
+        for handler in LISTENER.handlers:
+            handler.close()
+        LISTENER = None
+    if QUEUE_HANDLER is not None:
+        logging.getLogger(LOGGER_NAME).removeHandler(QUEUE_HANDLER)
+        QUEUE_HANDLER = None
+
+# Change the level at runtime (e.g., to debug a running app).
+def set_log_level(level):
+    logging.getLogger(LOGGER_NAME).setLevel(resolve_log_level(level))
+
+# Number of records dropped because the queue was full.
+def dropped_records():
+    return 0 if QUEUE_HANDLER is None else QUEUE_HANDLER.dropped
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,180 @@
+# Python libraries
+import time
+
+# Local libraries
+from .constants import LOW_POWER_MIN_TIMER_MS
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+# Injected at document start (after the bridge). `window.__grokPower.suspend()` throttles
+# page timers to at least __MIN_DELAY_MS__ (re-registering existing intervals), holds
+# animation frame callbacks, pauses playing media (not live streams, e.g. voice mode),
+# and tells page observers (such as the background color observer) through a
+# "grok-power" event. `resume()` undoes all of it and emits "power-stats" with the time
+# spent in timer/frame callbacks while active and while suspended.
+POWER_SCRIPT = """
+    (function(){
+    if(window.__grokPower) return;
+    const MIN_DELAY=__MIN_DELAY_MS__;
+    const _setTimeout=window.setTimeout.bind(window), _setInterval=window.setInterval.bind(window);
+    const _clearTimeout=window.clearTimeout.bind(window), _clearInterval=window.clearInterval.bind(window), _raf=window.requestAnimationFrame&&window.requestAnimationFrame.bind(window);
+    let suspended=false, suspendedAt=0, activeSince=performance.now(), activeMs=0;
+    let activeBusy=0, suspendedBusy=0, throttled=0, framesHeld=0;
+    const intervals=new Map(); let nextInterval=1; let heldFrames=[]; let pausedMedia=[];
+    function timed(fn){return function(){const t=performance.now();try{return fn.apply(this,arguments);}finally{const d=performance.now()-t;if(suspended){suspendedBusy+=d;}else{activeBusy+=d;}}};}
+    window.setTimeout=function(fn,delay){
+        if(typeof fn!=='function') return _setTimeout.apply(null,arguments);
+        const args=Array.prototype.slice.call(arguments,2);
+        if(suspended&&((delay||0)<MIN_DELAY)){throttled++;delay=MIN_DELAY;}
+        return _setTimeout(timed(fn),delay,...args);
+    };
+    function startInterval(entry){entry.real=_setInterval(entry.fn,suspended?Math.max(entry.delay,MIN_DELAY):entry.delay,...entry.args);}
+    window.setInterval=function(fn,delay){
+        if(typeof fn!=='function') return _setInterval.apply(null,arguments);
+        const id=-(nextInterval++);
+        const entry={fn:timed(fn),delay:delay||0,args:Array.prototype.slice.call(arguments,2),real:null};
+        if(suspended&&(entry.delay<MIN_DELAY)) throttled++;
+        intervals.set(id,entry); startInterval(entry); return id;
+    };
+    window.clearInterval=function(id){
+        const entry=intervals.get(id);
+        if(entry){intervals.delete(id);_clearInterval(entry.real);}else{_clearInterval(id);}
+    };
+    window.clearTimeout=function(id){if(intervals.has(id)){window.clearInterval(id);}else{_clearTimeout(id);}};
+    if(_raf){
+        window.requestAnimationFrame=function(fn){
+            if(suspended){framesHeld++;heldFrames.push(fn);return 0;}
+            return _raf(timed(fn));
+        };
+    }
+    function notify(){window.dispatchEvent(new CustomEvent('grok-power',{detail:{suspended:suspended}}));}
+    window.__grokPower={
+        suspend:function(){
+            if(suspended) return;
+            activeMs+=performance.now()-activeSince;
+            suspended=true; suspendedAt=performance.now();
+            intervals.forEach(function(entry){if(entry.delay<MIN_DELAY){throttled++;_clearInterval(entry.real);startInterval(entry);}});
+            pausedMedia=Array.prototype.filter.call(document.querySelectorAll('video,audio'),function(m){return !m.paused&&!(m.srcObject instanceof MediaStream);});
+            pausedMedia.forEach(function(m){m.pause();});
+            notify();
+        },
+        resume:function(){
+            if(!suspended) return;
+            suspended=false;
+            const suspendedMs=performance.now()-suspendedAt;
+            activeSince=performance.now();
+            intervals.forEach(function(entry){if(entry.delay<MIN_DELAY){_clearInterval(entry.real);startInterval(entry);}});
+            pausedMedia.forEach(function(m){try{const p=m.play();if(p&&p.catch){p.catch(function(){});}}catch(e){}});
+            const frames=heldFrames; heldFrames=[];
+            if(_raf){frames.forEach(function(fn){_raf(timed(fn));});}
+            notify();
+            if(window.__grokBridge){
+                window.__grokBridge.emit('power-stats',{suspended_ms:suspendedMs,active_ms:activeMs,active_busy_ms:activeBusy,suspended_busy_ms:suspendedBusy,timers_throttled:throttled,frames_held:framesHeld,media_paused:pausedMedia.length});
+            }
+            pausedMedia=[]; suspendedBusy=0; throttled=0; framesHeld=0;
+        }
+    };
+    })();
+""".replace("__MIN_DELAY_MS__", str(LOW_POWER_MIN_TIMER_MS))
+
+
+# Puts the page in a low-power state while the overlay is hidden. Suspending waits for
+# a grace period (so quick hide/show cycles do not thrash), showing resumes right away.
+# `run_script(source)` evaluates JavaScript in the page and `call_later(delay, func)`
+# runs `func` on the main thread later (both can be replaced by fakes).
+class LowPowerController:
+    def __init__(self, run_script, call_later, grace=5.0, clock=time.monotonic):
+        self.run_script = run_script
+        self.call_later = call_later
+        self.grace = grace
+        self.clock = clock
+        self.generation = 0
+        self.hidden = False
+        self.suspended = False
+        self.suspended_at = None
+        self.suspensions = 0
+        self.suspended_sec = 0.0
+        self.cpu_saved_ms = 0.0
+        self.timers_throttled = 0
+        self.frames_held = 0
+        self.media_paused = 0
+
+    # The overlay was hidden, suspend the page once the grace period has passed.
+    def hide(self):
+        self.hidden = True
+        self.generation += 1
+        generation = self.generation
+        def suspend_if_still_hidden():
+            if (self.generation == generation) and self.hidden:
+                self.suspend()
+        if self.grace <= 0:
+            suspend_if_still_hidden()
+        else:
+            self.call_later(self.grace, suspend_if_still_hidden)
+
+    # The overlay is being shown, resume the page if it was suspended.
+    def show(self):
+        self.hidden = False
+        self.generation += 1
+        if self.suspended:
+            self.resume()
+
+    def suspend(self):
+        if self.suspended:
+            return
+        self.suspended = True
+        self.suspended_at = self.clock()
+        self.suspensions += 1
+        self.run_script("window.__grokPower&&window.__grokPower.suspend();")
+
+    def resume(self):
+        if not self.suspended:
+            return
+        self.suspended = False
+        self.suspended_sec += self.clock() - self.suspended_at
+        self.suspended_at = None
+        self.run_script("window.__grokPower&&window.__grokPower.resume();")
+
+    # The page was reloaded or replaced, it starts out active.
+    def page_reset(self):
+        if self.suspended:
+            self.suspended = False
+            self.suspended_sec += self.clock() - self.suspended_at
+            self.suspended_at = None
+        if self.hidden:
+            self.hide()
+
+    # Bridge handler for the "power-stats" event sent by the page when it resumes. The CPU
+    # time saved is estimated from the page's callback time per second while active.
+    def handle_page_stats(self, data):
+        if not isinstance(data, dict):
+            return False
+        try:
+            active_ms = float(data.get("active_ms", 0.0))
+            suspended_ms = float(data.get("suspended_ms", 0.0))
+            active_rate = float(data.get("active_busy_ms", 0.0)) / active_ms if active_ms > 0 else 0.0
+            saved = active_rate * suspended_ms - float(data.get("suspended_busy_ms", 0.0))
+            self.timers_throttled += int(data.get("timers_throttled", 0))
+            self.frames_held += int(data.get("frames_held", 0))
+            self.media_paused += int(data.get("media_paused", 0))
+        except (TypeError, ValueError):
+            return False
+        self.cpu_saved_ms += max(0.0, saved)
+        LOGGER.debug(f"Page resumed after {suspended_ms / 1000:.1f} s in low-power mode, about {max(0.0, saved):.0f} ms of CPU time saved.")
+        return True
+
+    def stats(self):
+        suspended_sec = self.suspended_sec
+        if self.suspended_at is not None:
+            suspended_sec += self.clock() - self.suspended_at
+        return {
+            "suspended": self.suspended,
+            "suspensions": self.suspensions,
+            "suspended_sec": round(suspended_sec, 1),
+            "estimated_cpu_saved_ms": round(self.cpu_saved_ms, 1),
+            "timers_throttled": self.timers_throttled,
+            "frames_held": self.frames_held,
+            "media_paused": self.media_paused,
+        }
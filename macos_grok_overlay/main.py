@@ -1,33 +1,59 @@
 # Python libraries
 import argparse
+import os
 import sys
 
-# Local libraries.
+# Local libraries (the tracer first, so that the imports below can be traced).
+from .tracing import TRACER
 from .constants import (
     APP_TITLE,
     LAUNCHER_TRIGGER,
     LAUNCHER_TRIGGER_MASK,
     PERMISSION_CHECK_EXIT,
+    TAP_THREAD_ENV,
 )
-from .app import (
-    AppDelegate,
-    NSApplication
+from .instance import (
+    InstanceLock,
+    hand_off,
 )
 from .launcher import (
     check_permissions,
     ensure_accessibility_permissions,
     install_startup,
+    started_by_launch_agent,
     uninstall_startup
 )
 from .health_checks import (
+    dump_journal,
     health_check_decorator
 )
+from .hotkeys import (
+    HOTKEY_BACKENDS,
+)
+from .logs import (
+    LOG_LEVELS,
+    setup_logging,
+)
+from .settings import (
+    load_settings,
+)
 
 
-# Main executable for running the application from the command line.
-@health_check_decorator
+# Main executable for running the application from the command line. `grok ctl ...`
+# talks to the running overlay instead (without health checks or GUI imports).
 def main():
-    parser = argparse.ArgumentParser(description=f"macOS {APP_TITLE} Overlay App - Dedicated window that can be summoned and dismissed with the keyboard command Option+Space.")
+    if sys.argv[1:2] == ["ctl"]:
+        from .control import ctl_main
+        sys.exit(ctl_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["stats"]:
+        from .telemetry import stats_main
+        sys.exit(stats_main(sys.argv[2:]))
+    return run_app()
+
+# Parse the command line options and run the application (or a setup command).
+@health_check_decorator
+def run_app():
+    parser = argparse.ArgumentParser(description=f"macOS {APP_TITLE} Overlay App - Dedicated window that can be summoned and dismissed with the keyboard command Option+Space.", epilog="To control the running overlay (show, hide, home, stats, ...), use: grok ctl <command>. For page load percentiles, use: grok stats")
     parser.add_argument(
         "--install-startup",
         action="store_true",
@@ -43,7 +69,43 @@ def main():
         action="store_true",
         help="Check Accessibility permissions only"
     )
+    parser.add_argument(
+        "--dump-journal",
+        action="store_true",
+        help="Print the health journal (recent starts, crashes, and clean exits)"
+    )
+    parser.add_argument(
+        "--tap-thread",
+        action="store_true",
+        default=bool(os.environ.get(TAP_THREAD_ENV)),
+        help=f"Run the keyboard event tap on a dedicated thread (or set {TAP_THREAD_ENV}=1)"
+    )
+    parser.add_argument(
+        "--hotkey-backend",
+        choices=sorted(HOTKEY_BACKENDS),
+        default=None,
+        help="How to listen for the keyboard trigger (overrides the \"hotkey_backend\" setting)"
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=LOG_LEVELS,
+        type=str.upper,
+        default=None,
+        help="Minimum level of log messages (overrides the \"log_level\" setting)"
+    )
+    parser.add_argument(
+        "--trace-startup",
+        action="store_true",
+        help="Save a startup timeline (Chrome trace JSON) in the log directory"
+    )
+    parser.add_argument(
+        "--benchmark-startup",
+        action="store_true",
+        help="Start up, load the website, print the startup timings as JSON, and quit"
+    )
     args = parser.parse_args()
+    if args.trace_startup or args.benchmark_startup:
+        TRACER.enable()
 
     if args.install_startup:
         install_startup()
@@ -53,13 +115,32 @@ def main():
         uninstall_startup()
         return
 
+    if args.dump_journal:
+        dump_journal()
+        return
+
     if args.check_permissions:
         is_trusted = check_permissions(ask=False)
         print("Permissions granted:", is_trusted)
         sys.exit(0 if is_trusted else PERMISSION_CHECK_EXIT)
 
+    # Only one overlay runs at a time. Launching another one shows the running overlay and
+    # exits, except for the Launch Agent, which waits for the running overlay to exit (so
+    # that KeepAlive does not keep respawning it).
+    instance_lock = InstanceLock()
+    with TRACER.span("instance_lock"):
+        acquired = instance_lock.acquire(wait=started_by_launch_agent())
+    if not acquired:
+        response = hand_off("show", holder_alive=instance_lock.holder_alive)
+        if response is None:
+            print(f"{APP_TITLE} is already running (PID {instance_lock.owner_pid()}) but did not respond.", flush=True)
+            sys.exit(1)
+        print(f"{APP_TITLE} is already running (PID {instance_lock.owner_pid()}), showing it.", flush=True)
+        return
+
     # Check permissions (make request to user) when launching, but proceed regardless.
-    check_permissions()
+    with TRACER.span("check_permissions"):
+        check_permissions()
     # # Ensure permissions before proceeding
     # ensure_accessibility_permissions()
 
@@ -70,8 +151,24 @@ def main():
     print(f"To run at login, use:      grok --install-startup")
     print(f"To remove from login, use: grok --uninstall-startup")
     print()
+    settings = load_settings()
+    if args.tap_thread:
+        settings["tap_thread"] = True
+    if args.hotkey_backend:
+        settings["hotkey_backend"] = args.hotkey_backend
+    # Log through a background writer thread (the console and a rotated file in LOG_DIR).
+    setup_logging(args.log_level, default_level=settings["log_level"])
+    # Import the GUI frameworks only when running the app (not for the commands above).
+    with TRACER.span("import app", "import"):
+        from .app import (
+            AppDelegate,
+            NSApplication
+        )
     app = NSApplication.sharedApplication()
     delegate = AppDelegate.alloc().init()
+    delegate.settings = settings
+    delegate.instance_lock = instance_lock
+    delegate.benchmark_startup = args.benchmark_startup
     app.setDelegate_(delegate)
     app.run()
 
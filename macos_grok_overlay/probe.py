@@ -0,0 +1,133 @@
+# Python libraries
+import random
+import subprocess
+import sys
+import time
+
+# Local libraries (kept free of Apple framework imports, so the probe stays small)
+from .constants import (
+    PERMISSION_CHECK_EXIT,
+    PERMISSION_PROBE_INITIAL_DELAY,
+    PERMISSION_PROBE_JITTER,
+    PERMISSION_PROBE_MAX_DELAY,
+)
+
+
+# Command line flag that runs only the permission probe (handled before the full app
+# is imported, see `__main__.py` and `run.py`).
+PROBE_FLAG = "--probe-permissions"
+# Distributed notification posted by macOS when an Accessibility permission changes.
+ACCESSIBILITY_NOTIFICATION = "com.apple.accessibility.api"
+
+
+# Check (without prompting) whether this process is trusted for Accessibility.
+def is_process_trusted():
+    from ApplicationServices import AXIsProcessTrusted
+    return bool(AXIsProcessTrusted())
+
+# Minimal probe entry point, exit code 0 when trusted (no crash counter or log file I/O).
+def probe_main():
+    return 0 if is_process_trusted() else PERMISSION_CHECK_EXIT
+
+# Trust oracle that runs the probe in a fresh process (the trust status is cached per
+# process, so the current process cannot observe a permission being granted).
+def subprocess_trust_oracle(program_args):
+    def oracle():
+        result = subprocess.run(program_args + [PROBE_FLAG], capture_output=True)
+        return result.returncode == 0
+    return oracle
+
+
+# Exponential backoff delays with +/- `jitter` (fraction) random spread.
+class Backoff:
+    def __init__(self, initial=PERMISSION_PROBE_INITIAL_DELAY, maximum=PERMISSION_PROBE_MAX_DELAY, factor=2.0, jitter=PERMISSION_PROBE_JITTER, random=random.random):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.random = random
+        self.attempt = 0
+
+    def reset(self):
+        self.attempt = 0
+
+    def next_delay(self):
+        delay = min(self.maximum, self.initial * self.factor ** self.attempt)
+        self.attempt += 1
+        return delay * (1.0 + self.jitter * (2.0 * self.random() - 1.0))
+
+
+# Waits by sleeping (used when notifications are not available).
+class SleepWaiter:
+    def __init__(self, sleep=time.sleep):
+        self.sleep = sleep
+
+    # Wait up to `timeout` seconds, returns True if woken early by a change.
+    def wait(self, timeout):
+        self.sleep(timeout)
+        return False
+
+    def close(self):
+        pass
+
+
+# Waits on the current thread's run loop, waking early when the Accessibility
+# permissions change (distributed notification).
+class NotificationWaiter:
+    def __init__(self, name=ACCESSIBILITY_NOTIFICATION, slice_sec=0.25):
+        from Foundation import NSDistributedNotificationCenter
+        self.slice_sec = slice_sec
+        self.changed = False
+        self.center = NSDistributedNotificationCenter.defaultCenter()
+        self.token = self.center.addObserverForName_object_queue_usingBlock_(name, None, None, self.notified)
+
+    def notified(self, notification):
+        self.changed = True
+
+    def wait(self, timeout):
+        from Foundation import NSDate, NSDefaultRunLoopMode, NSRunLoop
+        deadline = time.monotonic() + timeout
+        self.changed = False
+        while not self.changed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            step = min(remaining, self.slice_sec)
+            # Returns False right away when the run loop has no input sources.
+            if not NSRunLoop.currentRunLoop().runMode_beforeDate_(NSDefaultRunLoopMode, NSDate.dateWithTimeIntervalSinceNow_(step)):
+                time.sleep(step)
+        return self.changed
+
+    def close(self):
+        self.center.removeObserver_(self.token)
+
+# Notification waiter if Foundation is available, otherwise a sleep waiter.
+def make_waiter():
+    try:
+        return NotificationWaiter()
+    except Exception as e:
+        print(f"Accessibility change notifications unavailable ({e!r}), polling instead.", flush=True)
+        return SleepWaiter()
+
+
+# Poll `oracle` (returns True once trusted) with backoff until it succeeds or
+# `max_wait_sec` has passed. A change notification restarts the backoff.
+def wait_for_trust(oracle, max_wait_sec=60, backoff=None, waiter=None, clock=time.monotonic):
+    backoff = Backoff() if backoff is None else backoff
+    waiter = make_waiter() if waiter is None else waiter
+    deadline = clock() + max_wait_sec
+    try:
+        while True:
+            if oracle():
+                return True
+            remaining = deadline - clock()
+            if remaining <= 0:
+                return False
+            if waiter.wait(min(backoff.next_delay(), remaining)):
+                backoff.reset()
+    finally:
+        waiter.close()
+
+
+if __name__ == "__main__":
+    sys.exit(probe_main())
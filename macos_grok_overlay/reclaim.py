@@ -0,0 +1,184 @@
+# Python libraries
+import ctypes
+import ctypes.util
+import json
+import time
+
+# Local libraries
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+# System memory pressure levels (kern.memorystatus_vm_pressure_level).
+PRESSURE_NORMAL = 1
+PRESSURE_WARNING = 2
+PRESSURE_CRITICAL = 4
+RUSAGE_INFO_V2 = 2
+
+# Evaluated in the page before it is torn down, returns its interaction state (JSON).
+SAVE_STATE_SCRIPT = """
+    JSON.stringify({scrollX:window.scrollX,scrollY:window.scrollY,draft:(document.querySelector('textarea')||{}).value||''})
+"""
+
+
+# Script restoring a saved interaction state (scroll position and unsent draft) in the
+# recreated page. The draft is set through the native setter so that the page sees it.
+def restore_state_script(state):
+    return """
+        (function(s){
+        window.scrollTo(s.scrollX||0,s.scrollY||0);
+        const t=document.querySelector('textarea');
+        if(t&&s.draft&&!t.value){
+            Object.getOwnPropertyDescriptor(HTMLTextAreaElement.prototype,'value').set.call(t,s.draft);
+            t.dispatchEvent(new Event('input',{bubbles:true}));
+        }
+        })(__STATE__);
+    """.replace("__STATE__", json.dumps(state))
+
+
+class RUsageInfoV2(ctypes.Structure):
+    _fields_ = [("ri_uuid", ctypes.c_uint8 * 16)] + [(name, ctypes.c_uint64) for name in (
+        "ri_user_time", "ri_system_time", "ri_pkg_idle_wkups", "ri_interrupt_wkups",
+        "ri_pageins", "ri_wired_size", "ri_resident_size", "ri_phys_footprint",
+        "ri_proc_start_abstime", "ri_proc_exit_abstime", "ri_child_user_time",
+        "ri_child_system_time", "ri_child_pkg_idle_wkups", "ri_child_interrupt_wkups",
+        "ri_child_pageins", "ri_child_elapsed_abstime", "ri_diskio_bytesread",
+        "ri_diskio_byteswritten",
+    )]
+
+
+# Reads the system memory pressure level and the memory footprint of a process (the
+# WebContent process) through libc (libSystem on macOS, which includes proc_pid_rusage),
+# or a separate libproc where there is one. Methods return None when unavailable.
+class MemoryMonitor:
+    def __init__(self):
+        self.libc = self.libproc = None
+        try:
+            self.libc = ctypes.CDLL(ctypes.util.find_library("c"))
+        except OSError as e:
+            LOGGER.debug(f"No libc for memory statistics: {e}")
+        if (self.libc is not None) and hasattr(self.libc, "proc_pid_rusage"):
+            self.libproc = self.libc
+        elif ctypes.util.find_library("proc"):
+            try:
+                self.libproc = ctypes.CDLL(ctypes.util.find_library("proc"))
+            except OSError as e:
+                LOGGER.debug(f"No libproc for memory statistics: {e}")
+
+    def pressure_level(self):
+        if (self.libc is None) or (not hasattr(self.libc, "sysctlbyname")):
+            return None
+        level = ctypes.c_int(0)
+        size = ctypes.c_size_t(ctypes.sizeof(level))
+        if self.libc.sysctlbyname(b"kern.memorystatus_vm_pressure_level", ctypes.byref(level), ctypes.byref(size), None, 0) != 0:
+            return None
+        return level.value
+
+    def process_footprint(self, pid):
+        if (not pid) or (self.libproc is None) or (not hasattr(self.libproc, "proc_pid_rusage")):
+            return None
+        info = RUsageInfoV2()
+        if self.libproc.proc_pid_rusage(int(pid), RUSAGE_INFO_V2, ctypes.byref(info)) != 0:
+            return None
+        return info.ri_phys_footprint
+
+
+# Policy for freeing the WebContent process of an unused overlay. While the overlay is
+# hidden, `check()` (called periodically) reclaims the page once it has been hidden for
+# `hidden_after` seconds, or earlier when the memory pressure reaches `pressure_level`.
+# The `page` (the application delegate, or a fake) provides webContentProcessIdentifier()
+# and reclaimWebView(done). The latter snapshots the view, saves the URL and interaction
+# state, tears the webview down, and then calls `done(torn_down)` (torn_down is False if
+# it gave up, e.g. because the overlay was shown meanwhile). The next summon shows the
+# snapshot right away, and the page calls `restored()` once the new page has loaded.
+class WebContentReclaimer:
+    def __init__(self, page, monitor, hidden_after=1800.0, pressure_level=PRESSURE_WARNING, clock=time.monotonic):
+        self.page = page
+        self.monitor = monitor
+        self.hidden_after = hidden_after
+        self.pressure_level = pressure_level
+        self.clock = clock
+        self.hidden_at = None
+        self.pending = None
+        self.reclaimed = False
+        self.restore_started = None
+        self.reclaims = {}
+        self.bytes_reclaimed = 0
+        self.restore_latencies_ms = []
+
+    def hidden(self):
+        self.hidden_at = self.clock()
+
+    # The overlay is being shown, returns True if the page was reclaimed (and is restoring).
+    def shown(self):
+        self.hidden_at = None
+        if self.reclaimed and (self.restore_started is None):
+            self.restore_started = self.clock()
+        return self.reclaimed
+
+    # True while the overlay is hidden (a teardown in progress is abandoned otherwise).
+    def still_hidden(self):
+        return self.hidden_at is not None
+
+    # The reason to reclaim the page now ("idle" or "memory-pressure"), or None.
+    def reason(self):
+        if (self.hidden_at is None) or self.reclaimed or (self.pending is not None):
+            return None
+        if (self.hidden_after is not None) and (self.hidden_after > 0) and (self.clock() - self.hidden_at >= self.hidden_after):
+            return "idle"
+        if self.pressure_level is not None:
+            level = self.monitor.pressure_level()
+            if (level is not None) and (level >= self.pressure_level):
+                return "memory-pressure"
+        return None
+
+    def check(self):
+        reason = self.reason()
+        if reason is not None:
+            self.reclaim(reason)
+        return reason
+
+    def reclaim(self, reason):
+        if (self.pending is not None) or self.reclaimed:
+            return False
+        footprint = self.monitor.process_footprint(self.page.webContentProcessIdentifier())
+        self.pending = reason
+        def done(torn_down):
+            self.pending = None
+            if not torn_down:
+                return
+            self.reclaimed = True
+            self.reclaims[reason] = self.reclaims.get(reason, 0) + 1
+            if footprint:
+                self.bytes_reclaimed += footprint
+            LOGGER.info(
+                f"Reclaimed the hidden page ({reason}), freeing {'an unknown amount' if footprint is None else f'{footprint / 2**20:.1f} MB'}.",
+                extra={"reason": reason, "bytes_reclaimed": footprint},
+            )
+            # Shown while the page was being torn down.
+            if self.hidden_at is None:
+                self.restore_started = self.clock()
+        self.page.reclaimWebView(done)
+        return True
+
+    # The recreated page finished loading.
+    def restored(self):
+        if not self.reclaimed:
+            return None
+        self.reclaimed = False
+        latency = None
+        if self.restore_started is not None:
+            latency = round(1000 * (self.clock() - self.restore_started), 1)
+            self.restore_latencies_ms.append(latency)
+            LOGGER.info(f"Restored the reclaimed page in {latency} ms.", extra={"restore_latency_ms": latency})
+        self.restore_started = None
+        return latency
+
+    def stats(self):
+        return {
+            "reclaimed": self.reclaimed,
+            "pending": self.pending,
+            "reclaims": dict(self.reclaims),
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "restore_latencies_ms": list(self.restore_latencies_ms[-10:]),
+        }
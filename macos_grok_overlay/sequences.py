@@ -0,0 +1,117 @@
+# Local libraries
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+# Keycode used for a modifier-only step (a "flags changed" press such as tapping Option).
+# It sits in the low 16 bits, so a step packs into one integer like a regular trigger.
+MODIFIER_KEY = 0xFFFF
+
+
+# Table-driven matcher for sequence triggers (chords like "Control+K, Control+G" or a
+# double-tap of Option). Sequences are compiled into a trie of transition tables with
+# failure links (as in Aho-Corasick), so a partial match that breaks off continues
+# from its longest suffix that is still a prefix of some sequence (e.g., "A, A, A, B"
+# completes "A, A, B"). The recent (timestamp, flags, keycode) entries are kept in a
+# fixed-size ring buffer, so feeding an event is amortized O(1) and creates no new
+# containers. The compiled tables are published together in one assignment, so a
+# recompile never mixes old and new tables in a running `feed`.
+class SequenceMatcher:
+    def __init__(self, window=0.4, history=8):
+        self.window = window
+        self.size = history
+        self.times = [0.0] * history
+        self.flags = [0] * history
+        self.keys = [0] * history
+        self.head = 0
+        # (transitions, failure links, depths, accepting states -> action), indexed by state.
+        self.tables = ([{}], [0], [0], {})
+        self.state = 0
+        self.matches = 0
+
+    # True if any sequence is compiled (otherwise there is no need to feed events).
+    @property
+    def active(self):
+        return bool(self.tables[0][0])
+
+    # Compile (steps, action) pairs, where steps is a list of (flags, keycode) and a
+    # keycode of MODIFIER_KEY (or None) means a modifier-only press.
+    def compile(self, sequences, window=None):
+        if window is not None:
+            self.window = window
+        transitions = [{}]
+        depths = [0]
+        accept = {}
+        for steps, action in sequences:
+            if (not steps) or (len(steps) > self.size):
+                LOGGER.warning(f"Ignoring sequence trigger with {len(steps)} steps (supported: 1 to {self.size}).")
+                continue
+            state = 0
+            for flags, keycode in steps:
+                step = flags | (MODIFIER_KEY if keycode is None else keycode)
+                next_state = transitions[state].get(step)
+                if next_state is None:
+                    transitions.append({})
+                    depths.append(depths[state] + 1)
+                    next_state = len(transitions) - 1
+                    transitions[state][step] = next_state
+                state = next_state
+            accept[state] = action
+        # Failure links in breadth-first order (a state's link is always shallower). A
+        # state whose suffix completes a sequence also completes it.
+        fail = [0] * len(transitions)
+        queue = list(transitions[0].values())
+        for state in queue:
+            for step, next_state in transitions[state].items():
+                link = fail[state]
+                while link and (step not in transitions[link]):
+                    link = fail[link]
+                fail[next_state] = transitions[link].get(step, 0)
+                if (next_state not in accept) and (fail[next_state] in accept):
+                    accept[next_state] = accept[fail[next_state]]
+                queue.append(next_state)
+        self.tables = (transitions, fail, depths, accept)
+        self.reset()
+
+    def reset(self):
+        self.state = 0
+
+    # Record an event and advance the state machine. Returns the action of a sequence
+    # completed by this event, or None.
+    def feed(self, timestamp, flags, keycode):
+        transitions, fail, depths, accept = self.tables
+        head = self.head
+        self.times[head] = timestamp
+        self.flags[head] = flags
+        self.keys[head] = keycode
+        self.head = (head + 1) % self.size
+        step = flags | keycode
+        state = self.state
+        if state >= len(transitions):
+            state = 0  # Recompiled since the last event.
+        # Drop the oldest steps of a partial match while its first step is older than the window.
+        while state and (timestamp - self.times[(head - depths[state]) % self.size] > self.window):
+            state = fail[state]
+        next_state = transitions[state].get(step)
+        while (next_state is None) and state:
+            state = fail[state]
+            next_state = transitions[state].get(step)
+        if next_state is None:
+            self.state = 0
+            return None
+        action = accept.get(next_state)
+        if action is not None:
+            self.matches += 1
+            self.state = 0
+            return action
+        self.state = next_state
+        return None
+
+    # The most recent entries in the ring buffer (oldest first), for debugging.
+    def history(self):
+        entries = []
+        for offset in range(self.size):
+            i = (self.head + offset) % self.size
+            if self.times[i]:
+                entries.append((self.times[i], self.flags[i], self.keys[i]))
+        return entries
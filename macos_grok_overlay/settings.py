@@ -0,0 +1,96 @@
+# Python libraries
+import json
+
+# Local libraries
+from .constants import DEFAULT_SETTINGS, RECLAIM_AFTER_HIDDEN_MAX_MIN, WARMTH_POLICIES
+from .health_checks import LOG_DIR
+from .logs import LOG_LEVELS, get_logger
+
+LOGGER = get_logger(__name__)
+
+# File for storing user settings (any key missing from the file takes its default).
+SETTINGS_FILE = LOG_DIR / "settings.json"
+
+
+# Validators, each returns the value to use or raises ValueError.
+def boolean(value):
+    if not isinstance(value, bool):
+        raise ValueError("expected true or false")
+    return value
+
+def string(value):
+    if not isinstance(value, str):
+        raise ValueError("expected a string")
+    return value
+
+def choice(*options):
+    def validate(value):
+        if value not in options:
+            raise ValueError(f"expected one of: {', '.join(options)}")
+        return value
+    return validate
+
+# A number, clamped to [minimum, maximum].
+def number(minimum, maximum):
+    def validate(value):
+        if isinstance(value, bool) or (not isinstance(value, (int, float))) or (value != value):
+            raise ValueError("expected a number")
+        return min(max(value, minimum), maximum)
+    return validate
+
+# A log level name, in any case.
+def log_level(value):
+    if string(value).upper() not in LOG_LEVELS:
+        raise ValueError(f"expected one of: {', '.join(LOG_LEVELS)}")
+    return value
+
+def string_list(value):
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError("expected a list of strings")
+    return value
+
+SETTING_VALIDATORS = {
+    "hotkey_backend": string,
+    "tap_thread": boolean,
+    "log_level": log_level,
+    "warmth": choice(*WARMTH_POLICIES),
+    "low_power": boolean,
+    "reclaim_after_hidden_min": number(0, RECLAIM_AFTER_HIDDEN_MAX_MIN),
+    "reclaim_on_memory_pressure": boolean,
+    "internal_link_patterns": string_list,
+    "external_link_patterns": string_list,
+    "download_folder": string,
+    "content_blocking": boolean,
+}
+
+
+# Load the settings from the JSON file if it exists, ignoring unknown keys. A value of
+# the wrong type (or not one of the allowed choices) is replaced by its default, and a
+# number out of range is clamped.
+def load_settings(path=SETTINGS_FILE):
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        settings.update({key: value for key, value in data.items() if key in DEFAULT_SETTINGS})
+    except FileNotFoundError:
+        pass
+    except (json.JSONDecodeError, AttributeError, OSError) as e:
+        LOGGER.warning(f"Ignoring unreadable settings file {path}: {e}")
+    for key, validate in SETTING_VALIDATORS.items():
+        value = settings[key]
+        try:
+            settings[key] = validate(value)
+        except ValueError as e:
+            LOGGER.warning(f"Ignoring setting {key}={value!r} in {path} ({e}), using {DEFAULT_SETTINGS[key]!r}.")
+            settings[key] = DEFAULT_SETTINGS[key]
+            continue
+        if settings[key] != value:
+            LOGGER.warning(f"Setting {key}={value!r} in {path} is out of range, using {settings[key]!r}.")
+    return settings
+
+# Save the given settings (only the known keys) to the JSON file.
+def save_settings(settings, path=SETTINGS_FILE):
+    data = {key: settings[key] for key in DEFAULT_SETTINGS if key in settings}
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
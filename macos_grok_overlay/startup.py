@@ -0,0 +1,136 @@
+# Python libraries
+import contextlib
+import heapq
+import itertools
+import time
+import traceback
+
+# Local libraries
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+# Task priorities (lower runs first). Idle tasks are also spaced out by `idle_delay`
+# so that window drawing and user input get run loop turns in between.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_IDLE = 2
+
+
+# Run loop adapter for the running NSApplication (calls back on the main thread).
+class AppKitRunLoop:
+    def call_later(self, delay, func):
+        from PyObjCTools import AppHelper
+        AppHelper.callLater(delay, func)
+
+
+class StartupTask:
+    def __init__(self, name, func, priority=PRIORITY_NORMAL, after=()):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.after = set(after)
+        self.started_at = None
+        self.duration = None
+        self.error = None
+
+
+# Runs named startup tasks once their dependencies have finished, one task per run loop
+# turn in priority order, recording when each one started and how long it took.
+class StartupScheduler:
+    def __init__(self, run_loop, clock=time.perf_counter, idle_delay=0.05, on_complete=None, tracer=None):
+        self.run_loop = run_loop
+        self.tracer = tracer
+        self.clock = clock
+        self.idle_delay = idle_delay
+        self.on_complete = on_complete
+        self.origin = clock()
+        self.tasks = {}
+        self.done = set()
+        self.ready = []
+        self.order = itertools.count()
+        self.started = False
+        self.pump_scheduled = False
+
+    # Declare a task to run (on a later run loop turn) after the named tasks are done.
+    def add(self, name, func, priority=PRIORITY_NORMAL, after=()):
+        if name in self.tasks:
+            raise ValueError(f"Startup task {name!r} was already added.")
+        task = self.tasks[name] = StartupTask(name, func, priority, after)
+        if task.after <= self.done:
+            self._make_ready(task)
+        return task
+
+    # Run a task right away (for work that must happen before the first paint).
+    def run_now(self, name, func):
+        if name in self.tasks:
+            raise ValueError(f"Startup task {name!r} was already added.")
+        task = self.tasks[name] = StartupTask(name, func, PRIORITY_HIGH)
+        self._run(task)
+        return task
+
+    # Record a milestone with no work of its own (e.g., "first-paint").
+    def mark(self, name):
+        self.run_now(name, None)
+
+    # Start running tasks that are ready.
+    def start(self):
+        self.started = True
+        self._schedule_pump()
+        if (self.on_complete is not None) and (not self.pending()):
+            self.on_complete(self)
+
+    # Names of the tasks still waiting for dependencies (or to run).
+    def pending(self):
+        return sorted(name for name in self.tasks if name not in self.done)
+
+    # Start time and duration (seconds, from scheduler creation) of each finished task.
+    def timings(self):
+        return {
+            name: {"start": task.started_at, "duration": task.duration, "error": task.error}
+            for name, task in self.tasks.items() if task.duration is not None
+        }
+
+    # One line summary of the phases, in the order they ran.
+    def report(self):
+        phases = sorted(self.timings().items(), key=lambda item: item[1]["start"])
+        return ", ".join(f"{name} {1000 * timing['duration']:.1f} ms" for name, timing in phases)
+
+    def _make_ready(self, task):
+        task.order = next(self.order)
+        heapq.heappush(self.ready, (task.priority, task.order, task.name))
+        if self.started:
+            self._schedule_pump()
+
+    def _schedule_pump(self):
+        if self.pump_scheduled or (not self.ready):
+            return
+        self.pump_scheduled = True
+        delay = self.idle_delay if self.ready[0][0] >= PRIORITY_IDLE else 0.0
+        self.run_loop.call_later(delay, self._pump)
+
+    def _pump(self):
+        self.pump_scheduled = False
+        if self.ready:
+            _, _, name = heapq.heappop(self.ready)
+            self._run(self.tasks[name])
+        self._schedule_pump()
+
+    def _run(self, task):
+        task.started_at = self.clock() - self.origin
+        span = self.tracer.span(task.name, "startup-task") if self.tracer is not None else contextlib.nullcontext()
+        try:
+            with span:
+                if task.func is not None:
+                    task.func()
+        except Exception:
+            task.error = traceback.format_exc()
+            LOGGER.error(f"Startup task {task.name!r} failed:\n{task.error}")
+        task.duration = self.clock() - self.origin - task.started_at
+        self.done.add(task.name)
+        for other in self.tasks.values():
+            if (other.name not in self.done) and (other.duration is None) and (task.name in other.after) and (other.after <= self.done):
+                self._make_ready(other)
+        if (self.on_complete is not None) and (len(self.done) == len(self.tasks)) and self.started:
+            self.on_complete(self)
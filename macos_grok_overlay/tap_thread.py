@@ -0,0 +1,105 @@
+# Python libraries
+import collections
+import threading
+import time
+
+
+# Hands matched triggers from the event tap thread to the main thread. Producers only
+# append to a deque (atomic, no lock taken) and request a wake-up when one is not
+# already pending; the main thread drains everything queued in a single pass.
+class TriggerHandoff:
+    def __init__(self, wake, clock=time.perf_counter):
+        self.wake = wake
+        self.clock = clock
+        self.queue = collections.deque()
+        self.wake_pending = False
+        self.posted = 0
+        self.dispatched = 0
+        self.wakes = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    # Queue `func(*args)` to be run on the main thread (called from the tap thread).
+    def post(self, func, *args):
+        self.queue.append((func, args, self.clock()))
+        self.posted += 1
+        if not self.wake_pending:
+            self.wake_pending = True
+            self.wakes += 1
+            self.wake()
+
+    # Run everything queued so far (called on the main thread). The pending flag is
+    # cleared before draining, so a post racing with the drain is never lost.
+    def drain(self):
+        self.wake_pending = False
+        queue = self.queue
+        while queue:
+            func, args, posted_at = queue.popleft()
+            latency = self.clock() - posted_at
+            self.dispatched += 1
+            self.total_latency += latency
+            if latency > self.max_latency:
+                self.max_latency = latency
+            func(*args)
+
+    # Summary of the enqueue-to-dispatch latency and counters.
+    def stats(self):
+        return {
+            "posted": self.posted,
+            "dispatched": self.dispatched,
+            "wakes": self.wakes,
+            "mean_latency_sec": (self.total_latency / self.dispatched) if self.dispatched else 0.0,
+            "max_latency_sec": self.max_latency,
+        }
+
+
+# A background thread hosting its own run loop. `attach()` runs on the new thread and
+# returns a handle for that thread's run loop, `run(handle)` blocks while running it,
+# and `stop(handle)` (called from any other thread) makes `run` return.
+class RunLoopThread:
+    def __init__(self, attach, run, stop, name="grok-event-tap"):
+        self.attach = attach
+        self.run = run
+        self.stop_loop = stop
+        self.handle = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._main, name=name, daemon=True)
+
+    def _main(self):
+        try:
+            self.handle = self.attach()
+        finally:
+            self.ready.set()
+        self.run(self.handle)
+
+    # Start the thread, waiting until its run loop is attached.
+    def start(self, timeout=5.0):
+        self.thread.start()
+        return self.ready.wait(timeout)
+
+    # Stop the run loop and wait for the thread to exit.
+    def stop(self, timeout=5.0):
+        if self.handle is not None:
+            self.stop_loop(self.handle)
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+
+# Create a thread that adds the given CFRunLoopSource (e.g., for an event tap) to its
+# own CFRunLoop and runs that loop until stopped.
+def cf_run_loop_thread(source, name="grok-event-tap"):
+    from Quartz import (
+        CFRunLoopAddSource,
+        CFRunLoopGetCurrent,
+        CFRunLoopRun,
+        CFRunLoopStop,
+        kCFRunLoopCommonModes,
+    )
+    def attach():
+        run_loop = CFRunLoopGetCurrent()
+        CFRunLoopAddSource(run_loop, source, kCFRunLoopCommonModes)
+        return run_loop
+    return RunLoopThread(attach, lambda run_loop: CFRunLoopRun(), CFRunLoopStop, name=name)
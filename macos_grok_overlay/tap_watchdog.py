@@ -0,0 +1,102 @@
+# Python libraries
+import time
+
+
+# Event types delivered to the tap callback when macOS disables the tap. These are
+# the values of kCGEventTapDisabledByTimeout and kCGEventTapDisabledByUserInput.
+TAP_DISABLED_BY_TIMEOUT = 0xFFFFFFFE
+TAP_DISABLED_BY_USER_INPUT = 0xFFFFFFFF
+TAP_DISABLED_EVENTS = (TAP_DISABLED_BY_TIMEOUT, TAP_DISABLED_BY_USER_INPUT)
+
+
+# Wrapper around a Quartz event tap (mach port) that the watchdog can drive.
+# Any object with the same `enable()` and `is_enabled()` methods can stand in for it.
+class QuartzEventTap:
+    def __init__(self, tap=None):
+        self.tap = tap
+
+    def enable(self):
+        from Quartz import CGEventTapEnable
+        if self.tap is not None:
+            CGEventTapEnable(self.tap, True)
+
+    def is_enabled(self):
+        from Quartz import CGEventTapIsEnabled
+        return bool(self.tap is not None and CGEventTapIsEnabled(self.tap))
+
+
+# Watches an event tap for being disabled by macOS (main thread stalled past the tap
+# timeout, or secure input) and re-enables it, keeping counters of what happened.
+class EventTapWatchdog:
+    def __init__(self, tap, clock=time.monotonic):
+        self.tap = tap
+        self.clock = clock
+        self.disabled_by_timeout = 0
+        self.disabled_by_user_input = 0
+        self.disabled_detected_by_check = 0
+        self.reenables = 0
+        self.failed_reenables = 0
+        self.time_disabled = 0.0
+        self.disabled_since = None
+
+    # Handle an event type received by the tap callback. Returns True if it was a
+    # "tap disabled" notification (which should be passed through untouched).
+    def handle_event(self, event_type):
+        if event_type == TAP_DISABLED_BY_TIMEOUT:
+            self.disabled_by_timeout += 1
+        elif event_type == TAP_DISABLED_BY_USER_INPUT:
+            self.disabled_by_user_input += 1
+        else:
+            return False
+        self._mark_disabled()
+        self._reenable()
+        return True
+
+    # Periodic check (for when no disable notification arrives), re-enabling if needed.
+    # Returns True if the tap is enabled after the check.
+    def check(self):
+        if self.tap.is_enabled():
+            if self.disabled_since is not None:
+                self._mark_enabled()
+            return True
+        if self.disabled_since is None:
+            self.disabled_detected_by_check += 1
+        self._mark_disabled()
+        return self._reenable()
+
+    # Total number of times the tap was found disabled.
+    @property
+    def disable_events(self):
+        return self.disabled_by_timeout + self.disabled_by_user_input + self.disabled_detected_by_check
+
+    # Summary of the counters, including any time spent in a currently disabled state.
+    def stats(self):
+        time_disabled = self.time_disabled
+        if self.disabled_since is not None:
+            time_disabled += self.clock() - self.disabled_since
+        return {
+            "disable_events": self.disable_events,
+            "disabled_by_timeout": self.disabled_by_timeout,
+            "disabled_by_user_input": self.disabled_by_user_input,
+            "disabled_detected_by_check": self.disabled_detected_by_check,
+            "reenables": self.reenables,
+            "failed_reenables": self.failed_reenables,
+            "time_disabled_sec": time_disabled,
+        }
+
+    def _mark_disabled(self):
+        if self.disabled_since is None:
+            self.disabled_since = self.clock()
+
+    def _mark_enabled(self):
+        self.time_disabled += self.clock() - self.disabled_since
+        self.disabled_since = None
+
+    def _reenable(self):
+        self.tap.enable()
+        if self.tap.is_enabled():
+            self.reenables += 1
+            self._mark_enabled()
+            return True
+        self.failed_reenables += 1
+        return False
@@ -0,0 +1,346 @@
+# Python libraries
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+# Local libraries (no Apple frameworks, so `grok stats` starts in milliseconds)
+from .constants import PAGE_TIMING_MERGE_TIMEOUT, PAGE_TIMING_ROLLING_LIMIT, PAGE_TIMING_TEXTAREA_TIMEOUT_MS
+from .health_checks import LOG_DIR
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+# Rolling page load timings (one quantile sketch per phase), printed by `grok stats`.
+PAGE_TIMINGS_PATH = LOG_DIR / "page_timings.json"
+PAGE_TIMINGS_VERSION = 1
+
+# Phases of a page load, in milliseconds. The "native-" phases are measured by the
+# navigation delegate, the others by PAGE_TIMING_SCRIPT in the page (Navigation Timing
+# durations, and times since the navigation started for the rest).
+PAGE_TIMING_PHASES = (
+    "native-provisional",  # Navigation started -> committed (request, redirects, first response).
+    "native-commit-to-finish",  # Committed -> finished loading.
+    "native-total",  # Navigation started -> finished loading.
+    "redirect",
+    "dns",
+    "connect",
+    "request",  # Request sent -> first response byte.
+    "response",  # First -> last response byte.
+    "first-contentful-paint",
+    "dom-content-loaded",
+    "load",
+    "textarea",  # The chat input appeared (the page is usable).
+)
+
+# Injected at document start (after the bridge), emits "page-timing" with the phases of
+# the load once the page has loaded and the chat input exists (or after a timeout).
+PAGE_TIMING_SCRIPT = """
+    (function(){
+    if(window.__grokTiming) return;
+    window.__grokTiming=true;
+    let textareaAt=null, loaded=false, sent=false;
+    function send(){
+        if(sent) return;
+        sent=true; observer.disconnect();
+        const t={};
+        const nav=performance.getEntriesByType&&performance.getEntriesByType('navigation')[0];
+        if(nav){
+            t['redirect']=nav.redirectEnd-nav.redirectStart; t['dns']=nav.domainLookupEnd-nav.domainLookupStart;
+            t['connect']=nav.connectEnd-nav.connectStart; t['request']=nav.responseStart-nav.requestStart;
+            t['response']=nav.responseEnd-nav.responseStart; t['dom-content-loaded']=nav.domContentLoadedEventEnd;
+            if(nav.loadEventEnd>0) t['load']=nav.loadEventEnd;
+        }
+        const paint=performance.getEntriesByType&&performance.getEntriesByType('paint').find(function(e){return e.name==='first-contentful-paint';});
+        if(paint) t['first-contentful-paint']=paint.startTime;
+        if(textareaAt!==null) t['textarea']=textareaAt;
+        window.__grokBridge&&window.__grokBridge.emit('page-timing',t);
+    }
+    function checkTextarea(){
+        if((textareaAt===null)&&document.querySelector('textarea')){textareaAt=performance.now();if(loaded) send();}
+    }
+    const observer=new MutationObserver(checkTextarea);
+    if(document.documentElement) observer.observe(document.documentElement,{childList:true,subtree:true});
+    window.addEventListener('load',function(){setTimeout(function(){loaded=true;checkTextarea();if(textareaAt!==null) send();},0);});
+    setTimeout(send,__TIMEOUT_MS__);
+    })();
+""".replace("__TIMEOUT_MS__", str(PAGE_TIMING_TEXTAREA_TIMEOUT_MS))
+
+
+# Streaming quantile sketch with logarithmic buckets (quantiles are within
+# `relative_accuracy` of the true value). Values are clamped to [min_value, max_value],
+# which bounds the number of buckets, and so the memory used, whatever the input.
+class QuantileSketch:
+    def __init__(self, relative_accuracy=0.01, min_value=0.1, max_value=1e7):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.max_index = self.index(max_value)
+        self.bins = {}
+        self.zero = 0.0  # Values at or below min_value.
+        self.count = 0.0
+        self.min = None
+        self.max = None
+
+    def index(self, value):
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def value(self, index):
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value, weight=1.0):
+        if not math.isfinite(value):
+            return
+        if value <= self.min_value:
+            self.zero += weight
+        else:
+            index = min(self.index(value), self.max_index)
+            self.bins[index] = self.bins.get(index, 0.0) + weight
+        self.count += weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    # Value at quantile q (0 to 1), None if empty.
+    def quantile(self, q):
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if seen > rank:
+            return max(self.min, 0.0) if self.min is not None else 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return min(max(self.value(index), self.min), self.max)
+        return self.max
+
+    # Scale every count (e.g., by 0.5 to let older values fade out). The minimum and
+    # maximum are narrowed to the buckets left, so that faded out extremes no longer
+    # bound the quantiles.
+    def decay(self, factor):
+        self.bins = {index: count * factor for index, count in self.bins.items() if count * factor >= 0.01}
+        self.zero *= factor
+        if self.zero < 0.01:
+            self.zero = 0.0
+        self.count = self.zero + sum(self.bins.values())
+        if self.count <= 0:
+            self.min = self.max = None
+            return
+        if self.bins:
+            lowest, highest = min(self.bins), max(self.bins)
+            if not self.zero:
+                self.min = max(self.min, self.gamma ** (lowest - 1))
+            if highest < self.max_index:
+                self.max = min(self.max, self.gamma ** highest)
+        else:
+            self.max = min(self.max, self.min_value)
+
+    def to_dict(self):
+        return {
+            "count": round(self.count, 2), "zero": round(self.zero, 2), "min": self.min, "max": self.max,
+            "bins": {str(index): round(count, 2) for index, count in sorted(self.bins.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data, relative_accuracy=0.01):
+        sketch = cls(relative_accuracy)
+        sketch.bins = {int(index): float(count) for index, count in data.get("bins", {}).items()}
+        sketch.zero = float(data.get("zero", 0.0))
+        sketch.count = sketch.zero + sum(sketch.bins.values())
+        sketch.min, sketch.max = data.get("min"), data.get("max")
+        return sketch
+
+
+# The known phases of `timings` (phase -> milliseconds) with valid values, as floats.
+def valid_timings(timings):
+    if not isinstance(timings, dict):
+        return {}
+    valid = {}
+    for phase, value in timings.items():
+        if (phase not in PAGE_TIMING_PHASES) or isinstance(value, bool) or (not isinstance(value, (int, float))):
+            continue
+        if math.isfinite(value) and (value >= 0):
+            valid[phase] = float(value)
+    return valid
+
+
+# Rolling page load timings saved in a small JSON file. Once a phase has more than
+# `limit` samples, its counts are halved, so recent loads weigh the most.
+class PageTimingStore:
+    def __init__(self, path=PAGE_TIMINGS_PATH, limit=PAGE_TIMING_ROLLING_LIMIT, relative_accuracy=0.01):
+        self.path = str(path)
+        self.limit = limit
+        self.relative_accuracy = relative_accuracy
+        self.sketches = {}
+        self.loads = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != PAGE_TIMINGS_VERSION:
+                return
+            self.loads = int(data.get("loads", 0))
+            self.sketches = {phase: QuantileSketch.from_dict(sketch, self.relative_accuracy) for phase, sketch in data.get("phases", {}).items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            LOGGER.warning(f"Ignoring unreadable page timings file {self.path}: {e}")
+
+    # Add the timings of one page load (phase -> milliseconds, unknown phases and invalid
+    # values are ignored). Returns the phases recorded.
+    def record(self, timings, save=True):
+        recorded = []
+        for phase, value in valid_timings(timings).items():
+            sketch = self.sketches.setdefault(phase, QuantileSketch(self.relative_accuracy))
+            sketch.add(value)
+            if sketch.count > self.limit:
+                sketch.decay(0.5)
+            recorded.append(phase)
+        if recorded:
+            self.loads += 1
+            if save:
+                self.save()
+        return recorded
+
+    # Write the file atomically (a crash never leaves a partial file).
+    def save(self):
+        data = {
+            "version": PAGE_TIMINGS_VERSION,
+            "loads": self.loads,
+            "updated": time.time(),
+            "phases": {phase: sketch.to_dict() for phase, sketch in self.sketches.items()},
+        }
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            LOGGER.warning(f"Could not save page timings to {self.path}: {e}")
+
+    # Percentiles per phase (in the PAGE_TIMING_PHASES order).
+    def summary(self, quantiles=(0.5, 0.95, 0.99)):
+        return {
+            phase: dict({"count": round(self.sketches[phase].count)}, **{f"p{round(q * 100)}": self.sketches[phase].quantile(q) for q in quantiles})
+            for phase in PAGE_TIMING_PHASES if phase in self.sketches
+        }
+
+    def stats(self):
+        return {"loads": self.loads, "phases": self.summary()}
+
+
+# Times the navigation delegate callbacks of the current navigation.
+class NavigationTimer:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = None
+        self.committed = None
+
+    def start(self):
+        self.started = self.clock()
+        self.committed = None
+
+    def commit(self):
+        if self.started is not None:
+            self.committed = self.clock()
+
+    # The navigation finished, returns its native phases (empty if it was not seen starting).
+    def finish(self):
+        if self.started is None:
+            return {}
+        now = self.clock()
+        timings = {"native-total": 1000 * (now - self.started)}
+        if self.committed is not None:
+            timings["native-provisional"] = 1000 * (self.committed - self.started)
+            timings["native-commit-to-finish"] = 1000 * (now - self.committed)
+        self.started = self.committed = None
+        return timings
+
+    def fail(self):
+        self.started = self.committed = None
+
+
+# Records each page load once, with both its native phases (from NavigationTimer, when
+# the navigation finishes) and the phases the page reports ("page-timing", once the chat
+# input exists). Whichever arrives first waits up to `timeout` seconds for the other,
+# and is recorded alone if the other never comes (or a newer load's arrives first).
+# `call_later(delay, func)` runs `func` on the main thread later.
+class PageLoadRecorder:
+    def __init__(self, store, call_later, timeout=PAGE_TIMING_MERGE_TIMEOUT):
+        self.store = store
+        self.call_later = call_later
+        self.timeout = timeout
+        self.pending = None
+        self.pending_native = False
+        self.generation = 0
+        self.merged = 0
+        self.unmerged = 0
+
+    # The native phases of a finished navigation.
+    def navigation_finished(self, native):
+        return self._add(valid_timings(native), native=True)
+
+    # Bridge handler for the "page-timing" event, False if it has no valid phases.
+    def page_timing(self, timings):
+        timings = valid_timings(timings)
+        if not timings:
+            return False
+        self._add(timings, native=False)
+        return True
+
+    def _add(self, timings, native):
+        if not timings:
+            return []
+        if (self.pending is not None) and (self.pending_native != native):
+            merged = dict(self.pending, **timings)
+            self.pending = None
+            self.generation += 1
+            self.merged += 1
+            return self.store.record(merged)
+        self.flush()
+        self.pending, self.pending_native = timings, native
+        self.generation += 1
+        generation = self.generation
+        self.call_later(self.timeout, lambda: self._timed_out(generation))
+        return []
+
+    def _timed_out(self, generation):
+        if generation == self.generation:
+            self.flush()
+
+    # Record the waiting phases on their own.
+    def flush(self):
+        if self.pending is None:
+            return []
+        pending, self.pending = self.pending, None
+        self.generation += 1
+        self.unmerged += 1
+        return self.store.record(pending)
+
+    def stats(self):
+        return dict(self.store.stats(), merged=self.merged, unmerged=self.unmerged)
+
+
+# Command line report: `grok stats [--json]`.
+def stats_main(argv=None):
+    parser = argparse.ArgumentParser(prog="grok stats", description="Show page load percentiles recorded by the overlay.")
+    parser.add_argument("--json", action="store_true", help="Print the percentiles as JSON")
+    args = parser.parse_args(argv)
+    store = PageTimingStore()
+    summary = store.summary()
+    if args.json:
+        print(json.dumps({"loads": store.loads, "phases": summary}, indent=2))
+        return 0
+    if not summary:
+        print(f"No page loads recorded yet ({store.path}).", file=sys.stderr)
+        return 1
+    print(f"Page load timings over the last ~{store.loads} loads (ms)")
+    print(f"{'phase':<26}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for phase, row in summary.items():
+        print(f"{phase:<26}{row['count']:>7}" + "".join(f"{row[p]:>10.1f}" for p in ("p50", "p95", "p99")))
+    return 0
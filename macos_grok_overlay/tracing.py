@@ -0,0 +1,114 @@
+# Python libraries
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+
+# Opt-in startup tracing, enabled by setting the environment variable or passing one of
+# the command line flags. This is decided at import time (before argparse runs) so that
+# the module imports themselves can be traced.
+TRACE_STARTUP_ENV = "GROK_TRACE_STARTUP"
+TRACE_STARTUP_FLAGS = ("--trace-startup", "--benchmark-startup")
+
+
+# Records named spans and writes them in the Chrome trace event format (which can be
+# opened in chrome://tracing or https://ui.perfetto.dev).
+class Tracer:
+    def __init__(self, enabled=False, clock=time.perf_counter_ns):
+        self.enabled = enabled
+        self.clock = clock
+        self.origin = clock()
+        self.pid = os.getpid()
+        self.events = []
+        self.open_spans = {}
+
+    def enable(self):
+        self.enabled = True
+
+    # Context manager recording the time spent in its body.
+    @contextlib.contextmanager
+    def span(self, name, category="startup", **args):
+        if not self.enabled:
+            yield
+            return
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self._complete(name, category, start, self.clock(), args)
+
+    # Decorator recording a span for every call of the function.
+    def traced(self, name=None, category="startup"):
+        def decorator(func):
+            span_name = name or func.__qualname__
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(span_name, category):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # Start a span that ends in a different place (e.g., a navigation finishing later).
+    def begin(self, name, category="startup"):
+        if self.enabled:
+            self.open_spans[name] = (category, self.clock())
+
+    # End a span started with `begin`, returns its duration in milliseconds (or None).
+    def end(self, name, **args):
+        if (not self.enabled) or (name not in self.open_spans):
+            return None
+        category, start = self.open_spans.pop(name)
+        end = self.clock()
+        self._complete(name, category, start, end, args)
+        return (end - start) / 1e6
+
+    # Record a point in time (e.g., a milestone).
+    def instant(self, name, category="startup", **args):
+        if self.enabled:
+            self.events.append({
+                "name": name, "cat": category, "ph": "i", "s": "p",
+                "ts": (self.clock() - self.origin) / 1e3,
+                "pid": self.pid, "tid": threading.get_ident(), "args": args,
+            })
+
+    # Record an already measured span, with start and duration in seconds from the origin.
+    def add_span(self, name, start, duration, category="startup", **args):
+        if self.enabled:
+            start_ns = self.origin + int(start * 1e9)
+            self._complete(name, category, start_ns, start_ns + int(duration * 1e9), args)
+
+    def _complete(self, name, category, start, end, args):
+        self.events.append({
+            "name": name, "cat": category, "ph": "X",
+            "ts": (start - self.origin) / 1e3, "dur": (end - start) / 1e3,
+            "pid": self.pid, "tid": threading.get_ident(), "args": args,
+        })
+
+    # Duration in milliseconds of every completed span (summed for repeated names).
+    def summary(self):
+        durations = {}
+        for event in self.events:
+            if event["ph"] == "X":
+                durations[event["name"]] = durations.get(event["name"], 0.0) + event["dur"] / 1e3
+        return durations
+
+    def to_chrome_trace(self):
+        return {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+    # Write the trace as JSON (by default to a timestamped file in the log directory).
+    def write(self, path=None):
+        if path is None:
+            from .health_checks import LOG_DIR
+            path = LOG_DIR / time.strftime("startup_trace_%Y%m%d_%H%M%S.json")
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+        return path
+
+
+TRACER = Tracer(enabled=bool(os.environ.get(TRACE_STARTUP_ENV)) or any(flag in sys.argv for flag in TRACE_STARTUP_FLAGS))
@@ -0,0 +1,120 @@
+# Python libraries
+import resource
+import sys
+import time
+
+# Local libraries
+from .constants import WARMTH_POLICIES
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+# How much of the web page is kept ready while the overlay is not in use (WARMTH_POLICIES):
+#   "lazy": the webview is created (and the page loaded) on the first summon, with a
+#           native placeholder shown while it loads.
+#   "warm": the webview is created and the page loaded at launch.
+#   "hot":  like "warm", and the page input is kept focused while hidden, so showing
+#           the overlay needs no page work at all.
+DEFAULT_WARMTH_POLICY = "warm"
+
+# Webview states.
+STATE_COLD = "cold"  # No webview.
+STATE_CREATED = "created"  # Webview created, page not requested yet.
+STATE_LOADING = "loading"  # Page requested.
+STATE_READY = "ready"  # Page finished loading.
+
+
+# Peak resident memory of this process in bytes (ru_maxrss is bytes on macOS, KB on Linux).
+def peak_resident_memory():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# State machine deciding when the webview is created, loaded, and focused. The `page`
+# (the application delegate, or a fake in tests) provides: createWebView(),
+# loadWebsite_(sender), showPlaceholder(), hidePlaceholder(), and focusInput().
+class WarmthController:
+    def __init__(self, policy, page, clock=time.perf_counter, memory=peak_resident_memory):
+        if policy not in WARMTH_POLICIES:
+            LOGGER.warning(f"Unknown warmth policy {policy!r}, using {DEFAULT_WARMTH_POLICY!r}.")
+            policy = DEFAULT_WARMTH_POLICY
+        self.policy = policy
+        self.page = page
+        self.clock = clock
+        self.memory = memory
+        self.state = STATE_COLD
+        self.placeholder = False
+        self.visible = False
+        self.origin = clock()
+        self.requested_at = None
+        self.metrics = {"policy": policy}
+
+    # At launch, create the webview unless lazy.
+    def launch(self):
+        self.metrics["launch_memory_bytes"] = self.memory()
+        if self.policy != "lazy":
+            self._create()
+
+    # At launch (after `launch`), start loading the page unless lazy.
+    def preload(self):
+        if (self.policy != "lazy") and (self.state == STATE_CREATED):
+            self._load()
+
+    # The overlay is about to be shown. Returns True if the page input should be focused
+    # now (False while the page loads, it is focused when ready, and in "hot" mode, where
+    # it already has focus).
+    def summon(self):
+        self.visible = True
+        if self.state == STATE_COLD:
+            self._create()
+        if self.state == STATE_CREATED:
+            self._load()
+        if self.state != STATE_READY:
+            if (self.policy == "lazy") and (not self.placeholder):
+                self.placeholder = True
+                self.page.showPlaceholder()
+            return False
+        return self.policy != "hot"
+
+    # The overlay was hidden.
+    def dismiss(self):
+        self.visible = False
+        if (self.policy == "hot") and (self.state == STATE_READY):
+            self.page.focusInput()
+
+    # The page finished loading (every navigation, only the first one changes state).
+    def navigation_finished(self):
+        if self.state != STATE_LOADING:
+            return
+        self.state = STATE_READY
+        self.metrics["time_to_interactive_ms"] = round(1000 * (self.clock() - self.requested_at), 1)
+        self.metrics["since_launch_ms"] = round(1000 * (self.clock() - self.origin), 1)
+        self.metrics["interactive_memory_bytes"] = self.memory()
+        if self.placeholder:
+            self.placeholder = False
+            self.page.hidePlaceholder()
+        if self.visible or (self.policy == "hot"):
+            self.page.focusInput()
+        LOGGER.info(
+            f"Page interactive ({self.policy} policy) {self.metrics['time_to_interactive_ms']} ms after it was requested, "
+            f"peak memory {self.metrics['interactive_memory_bytes'] / 2**20:.1f} MB "
+            f"(at launch {self.metrics.get('launch_memory_bytes', 0) / 2**20:.1f} MB).",
+            extra={"warmth": dict(self.metrics)},
+        )
+
+    # The webview was torn down (e.g., to free memory), the next summon recreates it.
+    def reset(self):
+        self.state = STATE_COLD
+
+    def stats(self):
+        return dict(self.metrics, state=self.state)
+
+    def _create(self):
+        self.page.createWebView()
+        self.state = STATE_CREATED
+
+    def _load(self):
+        self.requested_at = self.clock()
+        self.page.loadWebsite_(None)
+        self.state = STATE_LOADING
@@ -0,0 +1,168 @@
+# Python libraries
+import os
+import threading
+import time
+
+# Local libraries
+from .logs import get_logger
+
+LOGGER = get_logger(__name__)
+
+# Web data categories that can be cleared, with the WKWebsiteDataStore types in each (the
+# values of the WebKit WKWebsiteDataType* constants are their own names).
+WEB_DATA_CATEGORIES = {
+    "disk-cache": ("WKWebsiteDataTypeDiskCache", "WKWebsiteDataTypeFetchCache", "WKWebsiteDataTypeOfflineWebApplicationCache"),
+    "memory-cache": ("WKWebsiteDataTypeMemoryCache",),
+    "service-workers": ("WKWebsiteDataTypeServiceWorkerRegistrations",),
+    "cookies": ("WKWebsiteDataTypeCookies",),
+    "storage": (
+        "WKWebsiteDataTypeLocalStorage", "WKWebsiteDataTypeSessionStorage",
+        "WKWebsiteDataTypeIndexedDBDatabases", "WKWebsiteDataTypeWebSQLDatabases",
+    ),
+}
+# Named selections (categories, and the maximum age in seconds of the data removed, None
+# for any age) used by the menu and the control socket. Only "cookies" and "all" sign out.
+WEB_DATA_PRESETS = {
+    "cache": (("disk-cache", "memory-cache"), None),
+    "recent-cache": (("disk-cache", "memory-cache"), 3600.0),
+    "service-workers": (("service-workers",), None),
+    "cookies": (("cookies",), None),
+    "all": (tuple(WEB_DATA_CATEGORIES), None),
+}
+
+
+# WebKit data types for the given categories (raises ValueError for unknown ones).
+def resolve_data_types(categories):
+    if isinstance(categories, str):
+        categories = [categories]
+    unknown = [category for category in categories if category not in WEB_DATA_CATEGORIES]
+    if unknown or (not categories):
+        raise ValueError(f"Unknown web data categories {unknown or categories!r} (expected some of: {', '.join(WEB_DATA_CATEGORIES)}).")
+    types = []
+    for category in categories:
+        types.extend(data_type for data_type in WEB_DATA_CATEGORIES[category] if data_type not in types)
+    return types
+
+
+# Earliest modification time (UNIX timestamp) of the data removed, 0 for any age.
+def modified_since(max_age, now):
+    if max_age is None:
+        return 0.0
+    if max_age < 0:
+        raise ValueError(f"The maximum age must not be negative (got {max_age}).")
+    return now - max_age
+
+
+# Directories where WebKit keeps the data of an application (used to estimate the bytes removed).
+def web_data_directories(bundle_id, home=None):
+    library = os.path.join(home or os.path.expanduser("~"), "Library")
+    return [
+        os.path.join(library, "Caches", bundle_id, "WebKit"),
+        os.path.join(library, "Caches", bundle_id, "fsCachedData"),
+        os.path.join(library, "WebKit", bundle_id),
+    ]
+
+
+# Total size in bytes of the files under the given directories.
+def directory_size(paths):
+    total = 0
+    for path in paths:
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+    return total
+
+
+# Run `func` on a new (daemon) thread.
+def run_in_thread(func):
+    threading.Thread(target=func, name="web-data-size", daemon=True).start()
+
+
+# Adapts a WKWebsiteDataStore to the data store interface used by WebDataClearer.
+class WebKitDataStore:
+    def __init__(self, store):
+        self.store = store
+
+    # Call `callback(records)` with the data records (one per site) holding any of the types.
+    def fetch_records(self, types, callback):
+        from Foundation import NSSet
+        self.store.fetchDataRecordsOfTypes_completionHandler_(NSSet.setWithArray_(types), lambda records: callback(list(records or [])))
+
+    # Remove the data of the types modified since the timestamp, then call `callback()`.
+    def remove(self, types, since, callback):
+        from Foundation import NSDate, NSSet
+        date = NSDate.distantPast() if since <= 0 else NSDate.dateWithTimeIntervalSince1970_(since)
+        self.store.removeDataOfTypes_modifiedSince_completionHandler_(NSSet.setWithArray_(types), date, callback)
+
+
+# Clears selected categories of web data (optionally only data modified recently) and
+# reports how many site records and (approximately, from the data directories) bytes were
+# removed. The `store` provides fetch_records(types, callback) and remove(types, since,
+# callback), both asynchronous (see WebKitDataStore). The data directories are measured
+# through `background(func)` (a new thread by default), and the results handed back
+# through `post(func)` (e.g., to the main thread, called directly if None).
+class WebDataClearer:
+    def __init__(self, store, data_dirs=(), clock=time.time, size=directory_size, background=run_in_thread, post=None):
+        self.store = store
+        self.data_dirs = list(data_dirs)
+        self.clock = clock
+        self.size = size
+        self.background = background
+        self.post = post
+        self.history = []
+
+    # Measure the data directories (walking a large cache takes a while, so not on the
+    # calling thread), then call `callback(size)` through `post`.
+    def measure(self, callback):
+        if not self.data_dirs:
+            callback(0)
+            return
+        def run():
+            size = self.size(self.data_dirs)
+            if self.post is None:
+                callback(size)
+            else:
+                self.post(lambda: callback(size))
+        self.background(run)
+
+    # Start clearing, `done(report)` is called once the data is gone. Returns the types cleared.
+    def clear(self, categories, max_age=None, done=None):
+        types = resolve_data_types(categories)
+        since = modified_since(max_age, self.clock())
+        started = self.clock()
+        report = {"categories": list(categories) if not isinstance(categories, str) else [categories], "max_age": max_age}
+        def measured_before(bytes_before):
+            def removed(records_before):
+                def counted(records_after):
+                    report["records_removed"] = max(0, len(records_before) - len(records_after))
+                    report["records_remaining"] = len(records_after)
+                    self.measure(lambda bytes_after: measured_after(bytes_before - bytes_after))
+                self.store.remove(types, since, lambda: self.store.fetch_records(types, counted))
+            self.store.fetch_records(types, removed)
+        def measured_after(bytes_removed):
+            report["bytes_removed"] = max(0, bytes_removed)
+            report["duration_ms"] = round(1000 * (self.clock() - started), 1)
+            self.history.append(report)
+            LOGGER.info(
+                f"Cleared web data ({', '.join(report['categories'])}"
+                f"{'' if max_age is None else f', last {max_age:g} s'}): {report['records_removed']} site records, "
+                f"{report['bytes_removed'] / 2**20:.1f} MB.",
+                extra={"web_data": report},
+            )
+            if done is not None:
+                done(report)
+        self.measure(measured_before)
+        return types
+
+    # Start clearing a named selection (see WEB_DATA_PRESETS).
+    def clear_preset(self, preset, done=None):
+        if preset not in WEB_DATA_PRESETS:
+            raise ValueError(f"Unknown web data preset {preset!r} (expected one of: {', '.join(WEB_DATA_PRESETS)}).")
+        categories, max_age = WEB_DATA_PRESETS[preset]
+        return self.clear(categories, max_age, done)
+
+    def stats(self):
+        return {"clears": len(self.history), "last": self.history[-1] if self.history else None}
@@ -1,3 +1,10 @@
+import sys
+
+# Answer a permission probe without importing (or health checking) the full app.
+if __name__ == '__main__' and ('--probe-permissions' in sys.argv[1:]):
+    from macos_grok_overlay.probe import probe_main
+    sys.exit(probe_main())
+
 from macos_grok_overlay.main import main
 
 if __name__ == '__main__':
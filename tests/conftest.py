@@ -0,0 +1,8 @@
+# Python libraries
+import os
+import tempfile
+
+# The package keeps its logs, settings, and state under ~/Library/Logs (created when it is
+# imported), so point HOME at a scratch directory before any test imports it.
+TEST_HOME = tempfile.mkdtemp(prefix="grok-overlay-tests-")
+os.environ["HOME"] = TEST_HOME
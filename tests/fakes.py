@@ -0,0 +1,114 @@
+# Local libraries
+from macos_grok_overlay.constants import LAUNCHER_TRIGGER_MASK
+from macos_grok_overlay.hotkeys import DISPATCH, SEQUENCE_MATCHER, HotkeyBackend
+from macos_grok_overlay.sequences import MODIFIER_KEY
+
+
+# Clock that only moves when told to (a callable, like time.monotonic).
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+        return self.now
+
+
+# Run loop stand-in: `call_later` queues callbacks, `turn` runs the next one (in the order
+# they are due) and advances the clock to its due time.
+class FakeRunLoop:
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = []
+        self.delays = []
+
+    def call_later(self, delay, func):
+        self.delays.append(delay)
+        self.calls.append((self.clock() + delay, len(self.delays), func))
+        self.calls.sort(key=lambda call: call[:2])
+
+    def turn(self):
+        due, _, func = self.calls.pop(0)
+        self.clock.now = max(self.clock.now, due)
+        func()
+
+    def run(self, limit=100):
+        turns = 0
+        while self.calls and (turns < limit):
+            self.turn()
+            turns += 1
+        return turns
+
+
+# Application delegate stand-in recording the trigger actions it receives.
+class FakeApp:
+    trigger_handoff = None
+
+    def __init__(self):
+        self.calls = []
+
+    def toggleWindow_(self, sender):
+        self.calls.append("toggle")
+
+    def goToWebsite_(self, sender):
+        self.calls.append("home")
+
+    def reloadWebsite_(self, sender):
+        self.calls.append("reload")
+
+
+# Stand-in backend that never touches the OS. Key presses are simulated with `press`,
+# which matches them against the compiled dispatch table like the event tap does.
+class FakeHotkeyBackend(HotkeyBackend):
+    name = "fake"
+
+    def __init__(self, app, settings=None, available=True):
+        super().__init__(app, settings)
+        self.available = available
+        self.started = False
+        self.rebinds = 0
+
+    def start(self):
+        if not self.available:
+            return False
+        self.started = True
+        self.rebind()
+        return True
+
+    def stop(self):
+        self.started = False
+
+    def rebind(self):
+        self.rebinds += 1
+        super().rebind()
+
+    # Simulate a key press, returns True if it was consumed (captured or matched).
+    def press(self, flags, keycode, timestamp=0.0, event=None):
+        from macos_grok_overlay import listener
+        flags &= LAUNCHER_TRIGGER_MASK
+        if self.capturing:
+            listener.dispatch_new_trigger(event, flags, keycode)
+            return True
+        if not self.started:
+            return False
+        action = DISPATCH.table.get(flags | keycode)
+        if (action is None) and SEQUENCE_MATCHER.active:
+            action = SEQUENCE_MATCHER.feed(timestamp, flags, keycode)
+        if action is not None:
+            action(None)
+            return True
+        return False
+
+    # Simulate a modifier-only press (e.g., tapping Option), returns True if it completed a sequence.
+    def press_modifier(self, flags, timestamp=0.0):
+        flags &= LAUNCHER_TRIGGER_MASK
+        if (not self.started) or self.capturing or (not flags):
+            return False
+        action = SEQUENCE_MATCHER.feed(timestamp, flags, MODIFIER_KEY)
+        if action is not None:
+            action(None)
+            return True
+        return False
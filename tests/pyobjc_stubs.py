@@ -0,0 +1,86 @@
+# Python libraries
+import importlib.abc
+import importlib.util
+import sys
+import types
+
+# Stand-ins for the PyObjC framework modules, so that modules importing AppKit, Quartz,
+# ... at the top can be imported (and their pure parts tested) without macOS. A real
+# framework is always preferred when it is installed.
+FRAMEWORKS = ("objc", "AppKit", "Foundation", "WebKit", "Quartz", "AVFoundation", "ApplicationServices", "CoreFoundation")
+
+# Values the code under test compares against (any other name is a Stub).
+FRAMEWORK_VALUES = {
+    "objc": {
+        "python_method": lambda function: function,
+        "error": type("error", (Exception,), {}),
+    },
+    "AppKit": {
+        "NSEventModifierFlagShift": 1 << 17,
+        "NSEventModifierFlagControl": 1 << 18,
+        "NSEventModifierFlagOption": 1 << 19,
+        "NSEventModifierFlagCommand": 1 << 20,
+    },
+    "Quartz": {
+        "kCGKeyboardEventKeycode": 9,
+        "kCGEventKeyDown": 10,
+        "kCGEventFlagsChanged": 12,
+        "kCGEventTapDisabledByTimeout": 0xFFFFFFFE,
+        "kCGEventTapDisabledByUserInput": 0xFFFFFFFF,
+    },
+}
+
+
+# Any class, function, or constant of a stubbed framework: attributes and calls give more stubs.
+class StubMeta(type):
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return stub(f"{cls.__name__}.{name}")
+
+    def __call__(cls, *args, **kwargs):
+        return stub(f"{cls.__name__}()")
+
+
+def stub(name):
+    return StubMeta(name, (), {})
+
+
+class StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = stub(f"{self.__name__}.{name}")
+        setattr(self, name, value)
+        return value
+
+
+# Import hook serving a stub for each framework that is not installed (it comes after the
+# regular finders, so installed frameworks win).
+class StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def __init__(self, names=FRAMEWORKS):
+        self.names = set(names)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname in self.names:
+            return importlib.util.spec_from_loader(fullname, self)
+        return None
+
+    def create_module(self, spec):
+        module = StubModule(spec.name)
+        for key, value in FRAMEWORK_VALUES.get(spec.name, {}).items():
+            setattr(module, key, value)
+        return module
+
+    def exec_module(self, module):
+        pass
+
+
+FINDER = StubFinder()
+
+
+# Let the frameworks that are not installed be imported as stubs.
+def install():
+    if FINDER not in sys.meta_path:
+        sys.meta_path.append(FINDER)
+    return FINDER
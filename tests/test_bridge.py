@@ -0,0 +1,127 @@
+# Python libraries
+import json
+import logging
+import shutil
+import subprocess
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.bridge import (
+    BRIDGE_HANDLER_NAME,
+    BRIDGE_SCRIPT,
+    BRIDGE_VERSION,
+    BridgeSchemaError,
+    MessageRouter,
+    log_page_error,
+    parse_batch,
+)
+
+
+def batch(*events, version=BRIDGE_VERSION):
+    return json.dumps({"v": version, "events": [{"type": event_type, "data": data, "t": 0} for event_type, data in events]})
+
+
+def test_parse_batch():
+    assert parse_batch(batch(("a", 1), ("b", {"x": [1, 2]}), ("a", None))) == [("a", 1), ("b", {"x": [1, 2]}), ("a", None)]
+    assert parse_batch(json.dumps({"v": BRIDGE_VERSION, "events": [{"type": "a"}]})) == [("a", None)]
+    assert parse_batch(batch()) == []
+
+
+@pytest.mark.parametrize("body", [
+    None,
+    "",
+    "{",
+    "[]",
+    json.dumps({"events": []}),
+    batch(("a", 1), version=BRIDGE_VERSION + 1),
+    json.dumps({"v": BRIDGE_VERSION, "events": {}}),
+    json.dumps({"v": BRIDGE_VERSION, "events": ["a"]}),
+    json.dumps({"v": BRIDGE_VERSION, "events": [{"data": 1}]}),
+    json.dumps({"v": BRIDGE_VERSION, "events": [{"type": 1}]}),
+])
+def test_parse_batch_rejects(body):
+    with pytest.raises(BridgeSchemaError):
+        parse_batch(body)
+
+
+def test_handle_batch_dispatches_by_type():
+    router = MessageRouter()
+    received = []
+    router.register("color", lambda data: received.append(("color", data)))
+    router.register("timing", lambda data: received.append(("timing", data)))
+    body = batch(("color", "rgb(0, 0, 0)"), ("timing", {"load": 12}), ("color", "rgb(1, 1, 1)"))
+    assert router.handle_batch(body) == 3
+    assert received == [("color", "rgb(0, 0, 0)"), ("timing", {"load": 12}), ("color", "rgb(1, 1, 1)")]
+    stats = router.stats()
+    assert stats["batches"] == 1
+    assert stats["batch_bytes"] == len(body)
+    assert stats["types"]["color"]["events"] == 2
+    assert stats["types"]["color"]["bytes"] == 2 * len('"rgb(0, 0, 0)"')
+    assert stats["types"]["timing"]["bytes"] == len('{"load":12}')
+
+
+def test_handle_batch_counts_dropped_unhandled_and_failed():
+    router = MessageRouter()
+    router.register("dup", lambda data: False)
+    router.register("boom", lambda data: 1 / 0)
+    router.register("ok", lambda data: None)
+    assert router.handle_batch(batch(("dup", 1), ("nobody", 2), ("boom", 3), ("ok", 4))) == 1
+    stats = router.stats()
+    assert stats["types"]["dup"]["dropped"] == 1
+    assert stats["types"]["nobody"]["unhandled"] == 1
+    assert stats["handler_errors"] == 1
+    assert stats["types"]["ok"] == {"events": 1, "bytes": 1, "dropped": 0, "unhandled": 0}
+
+
+def test_invalid_batches_are_counted_not_raised():
+    router = MessageRouter()
+    assert router.handle_batch("not json") == 0
+    assert router.handle_batch(batch(("a", 1), version=99)) == 0
+    assert router.stats()["invalid_batches"] == 2
+    assert router.stats()["batches"] == 2
+
+
+def test_unregister():
+    router = MessageRouter()
+    router.register("a", lambda data: None)
+    router.unregister("a")
+    router.unregister("missing")
+    assert router.handle_batch(batch(("a", 1))) == 0
+
+
+def test_page_errors_are_logged(caplog):
+    router = MessageRouter()
+    router.register("error", log_page_error)
+    with caplog.at_level(logging.WARNING, logger="macos_grok_overlay"):
+        router.handle_batch(batch(("error", {"message": "x is undefined", "source": "https://grok.com/app.js", "line": 7})))
+        router.handle_batch(batch(("error", "not an object")))
+    assert [record.getMessage() for record in caplog.records] == ["Page error: x is undefined (https://grok.com/app.js:7)"]
+    assert caplog.records[0].page_error["line"] == 7
+    assert router.stats()["types"]["error"]["dropped"] == 1
+
+
+# Run BRIDGE_SCRIPT in node with a minimal window, emit a few events, and check that they
+# arrive as one batch the router accepts.
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_bridge_script_posts_one_batch_per_frame():
+    harness = """
+        const posted=[]; const frames=[];
+        global.window={
+            webkit:{messageHandlers:{__HANDLER__:{postMessage:function(body){posted.push(body);}}}},
+            requestAnimationFrame:function(callback){frames.push(callback);},
+            addEventListener:function(){},
+        };
+        global.document={hidden:false};
+        eval(__SCRIPT__);
+        window.__grokBridge.emit('a',1); window.__grokBridge.emit('b',{x:2}); window.__grokBridge.emit('a');
+        if(frames.length!==1) throw new Error('expected one scheduled frame, got '+frames.length);
+        frames[0]();
+        window.__grokBridge.flush();
+        console.log(JSON.stringify(posted));
+    """.replace("__HANDLER__", BRIDGE_HANDLER_NAME).replace("__SCRIPT__", json.dumps(BRIDGE_SCRIPT))
+    result = subprocess.run(["node", "-e", harness], capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+    posted = json.loads(result.stdout)
+    assert len(posted) == 1
+    assert parse_batch(posted[0]) == [("a", 1), ("b", {"x": 2}), ("a", None)]
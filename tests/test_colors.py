@@ -0,0 +1,128 @@
+# Python libraries
+import time
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.colors import parse_css_color
+
+# Every syntax the parser supports, with the expected (r, g, b, a) in sRGB. The values
+# of the wide-gamut and perceptual spaces are the published sRGB equivalents (within
+# TOLERANCE), clamped to [0, 1].
+TOLERANCE = 2e-3
+CORPUS = [
+    # Keywords.
+    ("transparent", (0.0, 0.0, 0.0, 0.0)),
+    ("black", (0.0, 0.0, 0.0, 1.0)),
+    ("white", (1.0, 1.0, 1.0, 1.0)),
+    # Hex, 3, 4, 6, and 8 digits.
+    ("#fff", (1.0, 1.0, 1.0, 1.0)),
+    ("#0f08", (0.0, 1.0, 0.0, 0x88 / 255)),
+    ("#336699", (0x33 / 255, 0x66 / 255, 0x99 / 255, 1.0)),
+    ("#ff000080", (1.0, 0.0, 0.0, 0x80 / 255)),
+    # rgb() and rgba(), legacy comma and modern space syntax.
+    ("rgb(255, 0, 0)", (1.0, 0.0, 0.0, 1.0)),
+    ("rgba(0, 0, 0, 0.5)", (0.0, 0.0, 0.0, 0.5)),
+    ("rgba(17, 17, 17, 0)", (17 / 255, 17 / 255, 17 / 255, 0.0)),
+    ("rgb(0 0 0 / 50%)", (0.0, 0.0, 0.0, 0.5)),
+    ("rgb(100% 50% 0%)", (1.0, 0.5, 0.0, 1.0)),
+    ("rgb(none 255 0)", (0.0, 1.0, 0.0, 1.0)),
+    ("rgb(300, -20, 0)", (1.0, 0.0, 0.0, 1.0)),
+    ("  RGB(0, 0, 255)  ", (0.0, 0.0, 1.0, 1.0)),
+    # hsl() and hsla(), with hue units.
+    ("hsl(120, 100%, 50%)", (0.0, 1.0, 0.0, 1.0)),
+    ("hsl(0deg 100% 25%)", (0.5, 0.0, 0.0, 1.0)),
+    ("hsl(0.5turn 100% 50%)", (0.0, 1.0, 1.0, 1.0)),
+    ("hsl(200grad 100% 50%)", (0.0, 1.0, 1.0, 1.0)),
+    ("hsl(3.14159rad 100% 50%)", (0.0, 1.0, 1.0, 1.0)),
+    ("hsla(240, 100%, 50%, 0.25)", (0.0, 0.0, 1.0, 0.25)),
+    ("hsl(480 100% 50% / 0.5)", (0.0, 1.0, 0.0, 0.5)),
+    # hwb().
+    ("hwb(0 0% 0%)", (1.0, 0.0, 0.0, 1.0)),
+    ("hwb(120 0% 50%)", (0.0, 0.5, 0.0, 1.0)),
+    ("hwb(0 60% 60%)", (0.5, 0.5, 0.5, 1.0)),
+    # color() in the supported spaces.
+    ("color(srgb 1 0.5 0 / 0.5)", (1.0, 0.5, 0.0, 0.5)),
+    ("color(srgb-linear 0.214041 0.214041 0.214041)", (0.5, 0.5, 0.5, 1.0)),
+    ("color(display-p3 0.5 0.5 0.5)", (0.5, 0.5, 0.5, 1.0)),
+    ("color(display-p3 1 0 0)", (1.0, 0.0, 0.0, 1.0)),
+    # lab() and lch() (D50).
+    ("lab(0 0 0)", (0.0, 0.0, 0.0, 1.0)),
+    ("lab(100 0 0)", (1.0, 1.0, 1.0, 1.0)),
+    ("lab(50% 0 0)", (119 / 255, 119 / 255, 119 / 255, 1.0)),
+    ("lab(54.29 80.8 69.89)", (1.0, 0.0, 0.0, 1.0)),
+    ("lch(50 0 0)", (119 / 255, 119 / 255, 119 / 255, 1.0)),
+    ("lch(54.29 106.84 40.85 / 0.5)", (1.0, 0.0, 0.0, 0.5)),
+    # oklab() and oklch().
+    ("oklab(0 0 0)", (0.0, 0.0, 0.0, 1.0)),
+    ("oklab(1 0 0)", (1.0, 1.0, 1.0, 1.0)),
+    ("oklab(0.5 0 0)", (99 / 255, 99 / 255, 99 / 255, 1.0)),
+    ("oklch(0.628 0.2577 29.23)", (1.0, 0.0, 0.0, 1.0)),
+    ("oklch(62.8% 0.2577 29.23deg / 25%)", (1.0, 0.0, 0.0, 0.25)),
+]
+# Inputs that must be rejected (None), never raise.
+INVALID = [
+    None,
+    42,
+    "",
+    "red",
+    "#",
+    "#12",
+    "#12345",
+    "#ggg",
+    "rgb(",
+    "rgb()",
+    "rgb(1, 2)",
+    "rgb(1 2 3 4)",
+    "rgb(1, 2, 3, 4, 5)",
+    "rgb(1 2 3 / )",
+    "rgb(a b c)",
+    "hsl(red, 1%, 2%)",
+    "hsl(10furlong 100% 50%)",
+    "color(rec2020 1 0 0)",
+    "color(srgb 1 0)",
+    "lab(50 0)",
+    "foo(1 2 3)",
+    "rgb 1 2 3",
+]
+
+
+@pytest.mark.parametrize("text, expected", CORPUS)
+def test_corpus(text, expected):
+    rgba = parse_css_color(text)
+    assert rgba is not None, text
+    assert len(rgba) == 4
+    for value, expected_value in zip(rgba, expected):
+        assert abs(value - expected_value) <= TOLERANCE, (text, rgba, expected)
+
+
+@pytest.mark.parametrize("text", INVALID)
+def test_invalid(text):
+    assert parse_css_color(text) is None
+
+
+def test_results_are_clamped():
+    for text, _ in CORPUS:
+        assert all(0.0 <= value <= 1.0 for value in parse_css_color(text)), text
+
+
+# Benchmark: a cache hit (the usual case, as the page reports the same few colors) must
+# be much cheaper than parsing.
+def test_cached_and_uncached_timing():
+    texts = [text for text, _ in CORPUS]
+    parse = parse_css_color.__wrapped__
+    def per_call_us(function, rounds=50):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for text in texts:
+                function(text)
+        return 1e6 * (time.perf_counter() - start) / (rounds * len(texts))
+    parse_css_color.cache_clear()
+    for text in texts:
+        parse_css_color(text)
+    cached = per_call_us(parse_css_color)
+    uncached = per_call_us(parse)
+    info = parse_css_color.cache_info()
+    print(f"parse_css_color: {cached:.2f} us cached, {uncached:.2f} us uncached")
+    assert info.misses == len(texts)
+    assert cached < uncached
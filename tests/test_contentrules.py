@@ -0,0 +1,204 @@
+# Python libraries
+import json
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.contentrules import (
+    BUILTIN_CONTENT_RULES,
+    CONTENT_RULES_PREFIX,
+    ContentRuleListLoader,
+    encode_rules,
+    load_content_rules,
+    rules_identifier,
+    validate_rule,
+)
+
+from .fakes import FakeClock
+
+
+def block(url_filter, **trigger):
+    return {"trigger": dict(trigger, **{"url-filter": url_filter}), "action": {"type": "block"}}
+
+
+def test_builtin_rules_are_valid():
+    for rule in BUILTIN_CONTENT_RULES:
+        assert validate_rule(rule) == []
+
+
+@pytest.mark.parametrize("rule", [
+    block(r"^https?://tracker\.example/"),
+    block(".*", **{"if-domain": ["example.com"], "resource-type": ["script", "image"]}),
+    block("ads", **{"unless-domain": ["*example.com"], "load-type": ["third-party"]}),
+    block("[a-z]+[0-9]*\\.js$"),
+    {"trigger": {"url-filter": ".*"}, "action": {"type": "css-display-none", "selector": ".banner"}},
+])
+def test_valid_rules(rule):
+    assert validate_rule(rule) == []
+
+
+@pytest.mark.parametrize("url_filter", [
+    "(?:ads)",
+    "(?i)ads",
+    "(ads)\\1",
+    "a{2}",
+    "a{1,3}",
+    "a{,3}",
+    "a{}",
+    "ads|tracker",
+    "\\|",
+])
+def test_unsupported_syntax_is_rejected(url_filter):
+    [problem] = validate_rule(block(url_filter))
+    assert "unsupported syntax" in problem
+
+
+@pytest.mark.parametrize("rule, problem", [
+    ([], "rule must be an object"),
+    ({"action": {"type": "block"}}, "missing trigger object"),
+    ({"trigger": {"url-filter": "ads"}}, "missing action object"),
+    (block(""), "trigger needs a non-empty url-filter"),
+    (block("café"), "url-filter must be ASCII"),
+    (block("[ads"), "is not a valid pattern"),
+    (block("ads", **{"if-domain": []}), "if-domain must be a non-empty list of domains"),
+    (block("ads", **{"unless-domain": "example.com"}), "unless-domain must be a non-empty list of domains"),
+    (block("ads", **{"resource-type": ["video"]}), "resource-type must be a list of"),
+    (block("ads", **{"load-type": "third-party"}), "load-type must be a list of"),
+    ({"trigger": {"url-filter": "ads"}, "action": {"type": "redirect"}}, "action type must be one of"),
+    ({"trigger": {"url-filter": "ads"}, "action": {"type": "css-display-none"}}, "css-display-none needs a selector"),
+])
+def test_invalid_rules(rule, problem):
+    problems = validate_rule(rule)
+    assert any(problem in found for found in problems), problems
+
+
+def test_if_domain_and_unless_domain_are_exclusive():
+    rule = block("ads", **{"if-domain": ["a.com"], "unless-domain": ["b.com"]})
+    assert validate_rule(rule) == ["trigger cannot have both if-domain and unless-domain"]
+
+
+def test_user_rules_are_added_after_the_builtin_ones(tmp_path):
+    path = tmp_path / "content_rules.json"
+    good = block("ads\\.example")
+    path.write_text(json.dumps([good, block("a|b"), "not a rule"]))
+    assert load_content_rules(path) == BUILTIN_CONTENT_RULES + [good]
+    path.write_text(json.dumps({"rules": [good]}))
+    assert load_content_rules(path) == BUILTIN_CONTENT_RULES
+    path.write_text("[")
+    assert load_content_rules(path) == BUILTIN_CONTENT_RULES
+    assert load_content_rules(tmp_path / "missing.json") == BUILTIN_CONTENT_RULES
+
+
+# The same rules written with their keys in another order compile to the same list.
+def test_identifier_is_stable_under_key_reordering():
+    rule = {"trigger": {"url-filter": "ads", "load-type": ["third-party"]}, "action": {"type": "block"}}
+    reordered = json.loads('{"action": {"type": "block"}, "trigger": {"load-type": ["third-party"], "url-filter": "ads"}}')
+    assert list(reordered) != list(rule)
+    assert encode_rules([rule]) == encode_rules([reordered])
+    assert rules_identifier(encode_rules([rule])) == rules_identifier(encode_rules([reordered]))
+    assert rules_identifier(encode_rules([rule])).startswith(CONTENT_RULES_PREFIX)
+    # Different rules (or another order of rules) give another identifier.
+    other = block("tracker")
+    assert rules_identifier(encode_rules([rule, other])) != rules_identifier(encode_rules([other, rule]))
+
+
+# Rule list store stand-in: compiled lists by identifier. Completion handlers are queued
+# and only run by `run_pending`, as WebKit calls them later.
+class FakeRuleListStore:
+    def __init__(self, lists=None, fail=None):
+        self.lists = dict(lists or {})
+        self.fail = fail
+        self.pending = []
+        self.compiled = []
+        self.removed = []
+
+    def lookup(self, identifier, callback):
+        self.pending.append(lambda: callback(self.lists.get(identifier)))
+
+    def compile(self, identifier, source, callback):
+        self.compiled.append(identifier)
+        def run():
+            if self.fail is not None:
+                callback(None, self.fail)
+                return
+            self.lists[identifier] = ("compiled", json.loads(source))
+            callback(self.lists[identifier], None)
+        self.pending.append(run)
+
+    def identifiers(self, callback):
+        self.pending.append(lambda: callback(list(self.lists)))
+
+    def remove(self, identifier):
+        self.removed.append(identifier)
+        del self.lists[identifier]
+
+    def run_pending(self):
+        while self.pending:
+            self.pending.pop(0)()
+
+
+RULES = [block("ads")]
+IDENTIFIER = rules_identifier(encode_rules(RULES))
+
+
+def test_cached_rule_list_is_not_compiled():
+    store = FakeRuleListStore({IDENTIFIER: "cached list", CONTENT_RULES_PREFIX + "0000": "old list"})
+    clock = FakeClock(0.0)
+    loader = ContentRuleListLoader(store, RULES, clock=clock)
+    received = []
+    loader.start()
+    loader.when_ready(received.append)
+    assert received == []
+    clock.advance(0.002)
+    store.run_pending()
+    assert received == ["cached list"]
+    assert store.compiled == []
+    # Stale lists are only cleaned up after compiling.
+    assert store.removed == []
+    assert loader.stats() == {"identifier": IDENTIFIER, "rules": 1, "ready": True, "attached": True, "cached": True, "duration_ms": 2.0}
+
+
+def test_compiles_and_removes_stale_lists():
+    stale = rules_identifier(encode_rules([block("old")]))
+    store = FakeRuleListStore({stale: "old list", "another-app-rules": "theirs"})
+    loader = ContentRuleListLoader(store, RULES)
+    received = []
+    loader.when_ready(received.append)
+    loader.start()
+    store.run_pending()
+    assert store.compiled == [IDENTIFIER]
+    assert received == [("compiled", RULES)]
+    assert store.removed == [stale]
+    assert sorted(store.lists) == sorted([IDENTIFIER, "another-app-rules"])
+    assert loader.stats()["cached"] is False
+    # The next launch finds the compiled list.
+    next_store = FakeRuleListStore(store.lists)
+    next_loader = ContentRuleListLoader(next_store, RULES)
+    next_loader.start()
+    next_store.run_pending()
+    assert next_loader.cached is True
+    assert next_store.compiled == []
+
+
+def test_when_ready_after_ready_calls_back_right_away():
+    store = FakeRuleListStore({IDENTIFIER: "cached list"})
+    loader = ContentRuleListLoader(store, RULES)
+    loader.start()
+    store.run_pending()
+    received = []
+    loader.when_ready(received.append)
+    assert received == ["cached list"]
+    assert loader.waiting == []
+
+
+def test_failed_compile_is_ready_without_a_list():
+    store = FakeRuleListStore({CONTENT_RULES_PREFIX + "0000": "old list"}, fail="bad rule 3")
+    loader = ContentRuleListLoader(store, RULES)
+    received = []
+    loader.when_ready(received.append)
+    loader.start()
+    store.run_pending()
+    assert received == [None]
+    assert store.removed == []
+    stats = loader.stats()
+    assert (stats["ready"], stats["attached"]) == (True, False)
@@ -0,0 +1,168 @@
+# Python libraries
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay import control
+from macos_grok_overlay.control import ControlServer, call_on_main_thread, ctl_main, handle_request, is_socket_alive, send_command
+
+
+# Application delegate stand-in for the control commands.
+class FakeDelegate:
+    def __init__(self):
+        self.calls = []
+
+    def showWindow_(self, sender):
+        self.calls.append("show")
+
+    def hideWindow_(self, sender):
+        self.calls.append("hide")
+
+    def setTrigger_(self, sender):
+        self.calls.append("capture-trigger")
+
+    def setLauncherTrigger(self, flags, key):
+        self.calls.append(("set-trigger", flags, key))
+        return {"flags": flags, "key": key}
+
+    def controlStats(self):
+        raise RuntimeError("stats are not ready")
+
+
+# Socket paths are limited to about 100 bytes, so use a short temporary directory.
+@pytest.fixture
+def socket_path():
+    directory = tempfile.mkdtemp(prefix="grok-ctl-")
+    yield os.path.join(directory, "control.sock")
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def delegate():
+    return FakeDelegate()
+
+
+@pytest.fixture
+def server(delegate, socket_path):
+    server = ControlServer(delegate, path=socket_path)
+    assert server.start()
+    yield server
+    server.stop()
+
+
+# Send raw lines on one connection and read one response per line.
+def exchange(path, *lines):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5.0)
+        sock.connect(path)
+        sock.sendall(b"".join(line + b"\n" for line in lines))
+        with sock.makefile("rb") as f:
+            return [json.loads(f.readline()) for _ in lines]
+
+
+def test_commands_run_on_the_delegate(server, delegate, socket_path):
+    assert send_command("show", path=socket_path) == {"id": 1, "ok": True, "result": None}
+    response = send_command("set-trigger", {"flags": 524288, "key": 49}, path=socket_path)
+    assert response["result"] == {"flags": 524288, "key": 49}
+    send_command("set-trigger", path=socket_path)
+    assert delegate.calls == ["show", ("set-trigger", 524288, 49), "capture-trigger"]
+    assert send_command("ping", path=socket_path)["result"] == {"pid": os.getpid()}
+    assert server.stats()["requests"] == 4
+
+
+def test_unknown_command(server, socket_path):
+    response = send_command("dance", path=socket_path)
+    assert response["ok"] is False
+    assert response["error"].startswith("Unknown command 'dance'")
+
+
+def test_command_errors_are_returned(server, delegate, socket_path):
+    assert send_command("stats", path=socket_path) == {"id": 1, "ok": False, "error": "stats are not ready"}
+    response = send_command("set-trigger", {"flags": 524288}, path=socket_path)
+    assert response == {"id": 1, "ok": False, "error": "flags and key must be given together."}
+    assert delegate.calls == []
+
+
+# A malformed line gets an error response, and the connection keeps serving the next one.
+def test_malformed_json(server, socket_path):
+    responses = exchange(socket_path, b"{not json", b"[1, 2]", b'{"id": 7, "cmd": "hide"}')
+    assert responses[0]["ok"] is False
+    assert responses[0]["error"].startswith("Invalid JSON")
+    assert responses[1] == {"id": None, "ok": False, "error": "Request must be a JSON object."}
+    assert responses[2] == {"id": 7, "ok": True, "result": None}
+
+
+def test_second_server_does_not_take_over_a_live_socket(server, delegate, socket_path):
+    assert is_socket_alive(socket_path)
+    assert not ControlServer(delegate, path=socket_path).start()
+    assert send_command("ping", path=socket_path)["ok"]
+
+
+def test_stale_socket_is_replaced(delegate, socket_path):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    assert not is_socket_alive(socket_path)
+    server = ControlServer(delegate, path=socket_path)
+    assert server.start()
+    try:
+        assert send_command("ping", path=socket_path)["ok"]
+        # Only the current user may connect.
+        assert not (os.stat(socket_path).st_mode & 0o077)
+    finally:
+        server.stop()
+    assert not os.path.exists(socket_path)
+
+
+def test_no_server(socket_path):
+    with pytest.raises(FileNotFoundError):
+        send_command("ping", path=socket_path)
+
+
+# Commands run through `post` (on the main thread), and a main thread that never runs
+# them times out instead of hanging the client.
+def test_commands_are_posted_to_the_main_thread(delegate):
+    threads = []
+    def post(func):
+        thread = threading.Thread(target=lambda: (threads.append(threading.current_thread().name), func()), name="main")
+        thread.start()
+    assert handle_request(delegate, {"id": 2, "cmd": "show"}, post=post) == {"id": 2, "ok": True, "result": None}
+    assert threads == ["main"]
+    with pytest.raises(TimeoutError):
+        call_on_main_thread(lambda func: None, delegate.controlStats, timeout=0.05)
+
+
+def test_ctl_main_requires_flags_and_key_together(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        ctl_main(["set-trigger", "--flags", "524288"])
+    assert exit_info.value.code == 2
+    assert "--flags and --key must be given together" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        ctl_main(["set-trigger", "--key", "49"])
+
+
+def test_ctl_main_sends_the_arguments(monkeypatch, capsys):
+    sent = []
+    def fake_send_command(cmd, args, timeout):
+        sent.append((cmd, args))
+        return {"id": 1, "ok": True, "result": {"done": True}}
+    monkeypatch.setattr(control, "send_command", fake_send_command)
+    assert ctl_main(["set-trigger", "--flags", "524288", "--key", "49"]) == 0
+    assert json.loads(capsys.readouterr().out) == {"done": True}
+    assert ctl_main(["clear-data", "--categories", "cookies, storage,", "--max-age", "60"]) == 0
+    assert sent == [
+        ("set-trigger", {"flags": 524288, "key": 49}),
+        ("clear-data", {"categories": ["cookies", "storage"], "max_age": 60.0}),
+    ]
+
+
+def test_ctl_main_without_an_overlay(monkeypatch, capsys, socket_path):
+    monkeypatch.setattr(control, "send_command", lambda cmd, args, timeout: send_command(cmd, args, path=socket_path))
+    assert ctl_main(["show"]) == control.CONTROL_NOT_RUNNING_EXIT
+    assert "Could not reach the running overlay" in capsys.readouterr().err
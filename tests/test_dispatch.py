@@ -0,0 +1,120 @@
+# Python libraries
+import random
+import time
+
+import pytest
+
+# Local libraries
+from . import pyobjc_stubs
+
+pyobjc_stubs.install()
+
+from macos_grok_overlay import hotkeys, listener
+from macos_grok_overlay.constants import LAUNCHER_TRIGGER, LAUNCHER_TRIGGER_MASK, kCGEventFlagMaskAlternate
+
+from .fakes import FakeApp
+
+# Synthetic events are (flags, keycode) tuples, read by stand-ins for the Quartz accessors.
+KEY_DOWN = listener.kCGEventKeyDown
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(listener, "CGEventGetIntegerValueField", lambda event, field: event[1])
+    monkeypatch.setattr(listener, "CGEventGetFlags", lambda event: event[0])
+    monkeypatch.setattr(listener, "CGEventGetTimestamp", lambda event: 0)
+    monkeypatch.setitem(LAUNCHER_TRIGGER, "flags", kCGEventFlagMaskAlternate)
+    monkeypatch.setitem(LAUNCHER_TRIGGER, "key", 49)
+    monkeypatch.setattr(listener, "handle_new_trigger", None)
+    hotkeys.SEQUENCE_MATCHER.compile([])
+    return FakeApp()
+
+
+# A dispatch table with `count` bindings (all to the same no-op action).
+def binding_table(count, action):
+    flags = (0, 1 << 17, 1 << 18, 1 << 19, 1 << 20, (1 << 18) | (1 << 20))
+    return {hotkeys.pack_trigger(flags[i % len(flags)], 100 + i // len(flags)): action for i in range(count)}
+
+
+# Typing: mostly plain keys (that miss every binding) with the occasional modifier combination.
+def key_stream(length, seed=0):
+    rng = random.Random(seed)
+    modifiers = (0, 0, 0, 0, 0, 0, 1 << 17, 1 << 20)
+    return [(rng.choice(modifiers) | (1 << 8), rng.randrange(0, 400)) for _ in range(length)]
+
+
+def test_launcher_trigger_is_consumed(app):
+    callback = listener.global_show_hide_listener(app)
+    assert callback(None, KEY_DOWN, (kCGEventFlagMaskAlternate, 49), None) is None
+    assert app.calls == ["toggle"]
+
+
+def test_unbound_keys_pass_through(app):
+    callback = listener.global_show_hide_listener(app)
+    event = (kCGEventFlagMaskAlternate, 50)
+    assert callback(None, KEY_DOWN, event, None) is event
+    assert app.calls == []
+
+
+def test_unrelated_flags_are_masked(app):
+    callback = listener.global_show_hide_listener(app)
+    caps_lock = 1 << 16
+    assert callback(None, KEY_DOWN, (kCGEventFlagMaskAlternate | caps_lock, 49), None) is None
+    assert app.calls == ["toggle"]
+
+
+def test_compile_publishes_a_new_table(app, monkeypatch):
+    old_table = hotkeys.compile_dispatch_table(app)
+    assert hotkeys.DISPATCH.table is old_table
+    monkeypatch.setitem(hotkeys.TRIGGER_BINDINGS, "home", {"flags": 1 << 20, "key": 4})
+    new_table = hotkeys.compile_dispatch_table(app)
+    assert hotkeys.DISPATCH.table is new_table
+    assert new_table is not old_table
+    # The old table is left as it was, for a listener still looking at it.
+    assert hotkeys.pack_trigger(1 << 20, 4) not in old_table
+    assert hotkeys.pack_trigger(1 << 20, 4) in new_table
+
+
+def test_running_listener_sees_rebinding(app, monkeypatch):
+    callback = listener.global_show_hide_listener(app)
+    event = (1 << 20, 15)
+    assert callback(None, KEY_DOWN, event, None) is event
+    monkeypatch.setitem(hotkeys.TRIGGER_BINDINGS, "reload", {"flags": 1 << 20, "key": 15})
+    hotkeys.compile_dispatch_table(app)
+    assert callback(None, KEY_DOWN, event, None) is None
+    assert app.calls == ["reload"]
+
+
+def test_launcher_trigger_wins_over_conflicting_binding(app, monkeypatch):
+    monkeypatch.setitem(hotkeys.TRIGGER_BINDINGS, "home", {"flags": kCGEventFlagMaskAlternate, "key": 49})
+    table = hotkeys.compile_dispatch_table(app)
+    table[hotkeys.pack_trigger(kCGEventFlagMaskAlternate, 49)](None)
+    assert app.calls == ["toggle"]
+
+
+def test_pack_unpack_round_trip():
+    for flags in (0, 1 << 17, LAUNCHER_TRIGGER_MASK):
+        for keycode in (0, 49, 0xFFFF):
+            assert hotkeys.unpack_trigger(hotkeys.pack_trigger(flags, keycode)) == (flags, keycode)
+
+
+# Microbenchmark: the per-keystroke cost of the callback stays flat as bindings are added.
+def test_per_keystroke_cost_is_flat_in_binding_count(app):
+    callback = listener.global_show_hide_listener(app)
+    events = key_stream(20_000)
+    hits = []
+    def action(sender):
+        hits.append(sender)
+    def per_key_ns(count):
+        hotkeys.DISPATCH.table = binding_table(count, action)
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            for event in events:
+                callback(None, KEY_DOWN, event, None)
+            best = min(best, time.perf_counter() - start)
+        return 1e9 * best / len(events)
+    costs = {count: per_key_ns(count) for count in (1, 10, 100, 1000)}
+    print("ns per keystroke by binding count:", {count: round(cost) for count, cost in costs.items()})
+    assert hits, "the stream should hit some of the bindings"
+    assert max(costs.values()) < 3 * min(costs.values()), costs
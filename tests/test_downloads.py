@@ -0,0 +1,330 @@
+# Python libraries
+import functools
+import http.server
+import os
+import re
+import threading
+import time
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.downloads import (
+    PARTIAL_SUFFIX,
+    DownloadCancelled,
+    DownloadManager,
+    StreamingDownload,
+    candidate_paths,
+    commit_file,
+    cookie_header,
+    safe_filename,
+    stream_download,
+    temporary_path,
+)
+
+from .fakes import FakeClock
+
+PAYLOAD = bytes(range(256)) * 1000
+CHUNK_SIZE = 16 * 1024
+HALF = 8 * CHUNK_SIZE  # Whole chunks, so that reading them does not wait for the rest.
+
+
+# Local stand-in for the server of a download: "/file.bin" supports range requests,
+# "/no-ranges.bin" always sends the whole file, "/short.bin" ends before its
+# Content-Length, and "/slow.bin" sends half of the file and the rest only once
+# `server.gate` is set. The request headers received are kept in `server.requests`.
+class PayloadHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range") or "")
+        if (self.path == "/file.bin") and (match is not None):
+            offset = int(match.group(1))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {offset}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+            self.send_header("Content-Length", str(len(PAYLOAD) - offset))
+            self.end_headers()
+            self.wfile.write(PAYLOAD[offset:])
+        elif self.path in ("/file.bin", "/no-ranges.bin", "/slow.bin"):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(PAYLOAD)))
+            self.end_headers()
+            if self.path == "/slow.bin":
+                self.wfile.write(PAYLOAD[:HALF])
+                self.wfile.flush()
+                self.server.gate.wait(10)
+                self.wfile.write(PAYLOAD[HALF:])
+            else:
+                self.wfile.write(PAYLOAD)
+        elif self.path == "/short.bin":
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(PAYLOAD) + 1000))
+            self.end_headers()
+            self.wfile.write(PAYLOAD)
+            self.close_connection = True
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), PayloadHandler)
+    server.requests = []
+    server.gate = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.gate.set()
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def ranges(server):
+    return [headers.get("Range") for headers in server.requests]
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_stream_writes_in_chunks(server, tmp_path):
+    temp_path = str(tmp_path / "file.part")
+    progress = []
+    size = stream_download(url(server, "/file.bin"), temp_path, headers={"Cookie": "session=1"},
+                           progress=lambda written, total: progress.append((written, total)), chunk_size=CHUNK_SIZE)
+    assert size == len(PAYLOAD)
+    assert read(temp_path) == PAYLOAD
+    assert len(progress) >= len(PAYLOAD) // CHUNK_SIZE
+    assert all(written <= CHUNK_SIZE * (i + 1) for i, (written, _) in enumerate(progress))
+    assert progress[-1] == (len(PAYLOAD), len(PAYLOAD))
+    assert server.requests[0]["Cookie"] == "session=1"
+
+
+def test_stream_cancel_keeps_the_partial_file(server, tmp_path):
+    temp_path = str(tmp_path / "file.part")
+    progress = []
+    with pytest.raises(DownloadCancelled) as cancelled:
+        stream_download(url(server, "/file.bin"), temp_path, progress=lambda written, total: progress.append(written),
+                        cancelled=lambda: bool(progress) and (progress[-1] >= 3 * CHUNK_SIZE), chunk_size=CHUNK_SIZE)
+    assert cancelled.value.bytes_written == 3 * CHUNK_SIZE
+    assert read(temp_path) == PAYLOAD[:3 * CHUNK_SIZE]
+
+
+# Resuming asks for the rest of the file only, and appends it to the partial file.
+def test_stream_resumes_with_a_range_request(server, tmp_path):
+    temp_path = tmp_path / "file.part"
+    temp_path.write_bytes(PAYLOAD[:1000] + b"garbage after the offset")
+    progress = []
+    size = stream_download(url(server, "/file.bin"), str(temp_path), offset=1000,
+                           progress=lambda written, total: progress.append((written, total)), chunk_size=CHUNK_SIZE)
+    assert size == len(PAYLOAD)
+    assert ranges(server) == ["bytes=1000-"]
+    assert progress[0] == (1000 + CHUNK_SIZE, len(PAYLOAD))
+    assert read(temp_path) == PAYLOAD
+
+
+# A server without range support (200 instead of 206) sends the whole file, which
+# replaces the partial one.
+def test_stream_resume_without_range_support_starts_over(server, tmp_path):
+    temp_path = tmp_path / "file.part"
+    temp_path.write_bytes(b"x" * 5000)
+    assert stream_download(url(server, "/no-ranges.bin"), str(temp_path), offset=5000, chunk_size=CHUNK_SIZE) == len(PAYLOAD)
+    assert ranges(server) == ["bytes=5000-"]
+    assert read(temp_path) == PAYLOAD
+
+
+def test_stream_short_body_is_an_error(server, tmp_path):
+    with pytest.raises(IOError, match=f"ended after {len(PAYLOAD)} of {len(PAYLOAD) + 1000} bytes|cut short"):
+        stream_download(url(server, "/short.bin"), str(tmp_path / "file.part"), chunk_size=CHUNK_SIZE)
+
+
+def test_cookie_header():
+    cookies = [
+        ("session", "abc", ".grok.com", "/", True),
+        ("host-only", "1", "grok.com", "/", False),
+        ("scoped", "2", ".grok.com", "/files", False),
+        ("other", "3", ".x.com", "/", False),
+        ("lookalike", "4", ".ok.com", "/", False),
+    ]
+    assert cookie_header(cookies, "https://grok.com/files/image.png") == "session=abc; host-only=1; scoped=2"
+    assert cookie_header(cookies, "https://assets.grok.com/filesystem/image.png") == "session=abc"
+    assert cookie_header(cookies, "http://grok.com/") == "host-only=1"
+    assert cookie_header(cookies, "https://example.com/") == ""
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(0.0)
+
+
+@pytest.fixture
+def manager(tmp_path, clock):
+    return DownloadManager(tmp_path / "Downloads", clock=clock)
+
+
+def streaming(manager, url, filename, **kwargs):
+    return StreamingDownload(manager, url, filename, stream=functools.partial(stream_download, chunk_size=CHUNK_SIZE), **kwargs)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while (not condition()) and (time.monotonic() < deadline):
+        time.sleep(0.005)
+    assert condition()
+
+
+# The payload is written to a hidden temporary file in the download folder, which only
+# gets its final name once complete. The outcome is handed back through `post`.
+def test_streaming_download_is_renamed_when_finished(server, manager, clock):
+    posted = []
+    download = streaming(manager, url(server, "/file.bin"), "image.png", headers={"Cookie": "session=1"}, post=posted.append)
+    temp_path = download.entry["temp_path"]
+    assert os.path.basename(temp_path).startswith(".image.png.") and temp_path.endswith(PARTIAL_SUFFIX)
+    assert os.path.dirname(temp_path) == manager.folder
+    clock.advance(1.5)
+    download.start()
+    download.thread.join(10)
+    assert manager.stats()["downloads"][0]["bytes"] == len(PAYLOAD)
+    assert manager.active(download.entry["id"]) is not None
+    [finish] = posted
+    entry = finish()
+    assert entry["state"] == "finished"
+    assert entry["path"] == os.path.join(manager.folder, "image.png")
+    assert read(entry["path"]) == PAYLOAD
+    assert (entry["bytes"], entry["duration_sec"]) == (len(PAYLOAD), 1.5)
+    assert os.listdir(manager.folder) == ["image.png"]
+    assert server.requests[0]["Cookie"] == "session=1"
+
+
+# A cancelled download keeps its partial file and resume data, and resuming it asks the
+# server for the rest only.
+def test_streaming_cancel_and_resume(server, manager):
+    download = streaming(manager, url(server, "/slow.bin"), "archive.zip")
+    download.start()
+    wait_for(lambda: download.written >= HALF)
+    assert download.cancel()
+    server.gate.set()
+    download.thread.join(10)
+    entry = manager.downloads[download.entry["id"]]
+    assert (entry["state"], entry["error"]) == ("cancelled", None)
+    resume_bytes = entry["resume_data"]["bytes"]
+    assert HALF <= resume_bytes < len(PAYLOAD)
+    assert read(entry["temp_path"]) == PAYLOAD[:resume_bytes]
+    assert manager.stats()["downloads"][0]["resumable"] is True
+    assert download.cancel() is False
+    # The slow path has no range support, so use the same file from a server that has.
+    download.url = url(server, "/file.bin")
+    assert download.resume()
+    download.thread.join(10)
+    assert ranges(server) == [None, f"bytes={resume_bytes}-"]
+    assert entry["state"] == "finished"
+    assert read(entry["path"]) == PAYLOAD
+    assert download.resume() is False
+
+
+def test_streaming_resume_without_range_support_starts_over(server, manager):
+    download = streaming(manager, url(server, "/slow.bin"), "archive.zip")
+    download.start()
+    wait_for(lambda: download.written >= HALF)
+    download.cancel()
+    server.gate.set()
+    download.thread.join(10)
+    assert download.resume()
+    download.thread.join(10)
+    assert ranges(server)[1].startswith("bytes=")
+    entry = manager.downloads[download.entry["id"]]
+    assert entry["state"] == "finished"
+    assert read(entry["path"]) == PAYLOAD
+
+
+# A response shorter than its Content-Length fails, and leaves no partial file behind.
+def test_streaming_short_body_fails_without_leaving_a_file(server, manager):
+    download = streaming(manager, url(server, "/short.bin"), "video.mp4")
+    download.start()
+    download.thread.join(10)
+    entry = manager.downloads[download.entry["id"]]
+    assert entry["state"] == "failed"
+    assert str(len(PAYLOAD)) in entry["error"]
+    assert entry["path"] is None
+    assert os.listdir(manager.folder) == []
+    assert manager.stats()["downloads"][0]["resumable"] is False
+
+
+def test_streaming_http_errors_fail(server, manager):
+    download = streaming(manager, url(server, "/missing.bin"), "missing.bin")
+    download.start()
+    download.thread.join(10)
+    entry = manager.downloads[download.entry["id"]]
+    assert entry["state"] == "failed"
+    assert "404" in entry["error"]
+
+
+def test_downloads_of_the_same_name_are_numbered(server, manager):
+    paths = []
+    for _ in range(3):
+        download = streaming(manager, url(server, "/file.bin"), "report.pdf")
+        download.start()
+        download.thread.join(10)
+        paths.append(download.entry["path"])
+    assert [os.path.basename(path) for path in paths] == ["report.pdf", "report (1).pdf", "report (2).pdf"]
+    assert [entry["id"] for entry in manager.stats()["downloads"]] == [1, 2, 3]
+
+
+def test_commit_file_never_replaces_an_existing_file(tmp_path):
+    (tmp_path / "notes.txt").write_text("mine")
+    (tmp_path / "notes (1).txt").write_text("mine too")
+    temp_path = temporary_path(str(tmp_path), "notes.txt")
+    with open(temp_path, "w") as f:
+        f.write("downloaded")
+    path = commit_file(temp_path, "notes.txt")
+    assert path == str(tmp_path / "notes (2).txt")
+    assert (tmp_path / "notes.txt").read_text() == "mine"
+    assert (tmp_path / "notes (2).txt").read_text() == "downloaded"
+    assert not os.path.exists(temp_path)
+
+
+# Volumes without hard links fall back to a rename.
+def test_commit_file_without_hard_links(tmp_path, monkeypatch):
+    (tmp_path / "README").write_text("mine")
+    temp_path = temporary_path(str(tmp_path), "README")
+    with open(temp_path, "w") as f:
+        f.write("downloaded")
+    def no_links(source, destination):
+        raise PermissionError("hard links are not supported")
+    monkeypatch.setattr(os, "link", no_links)
+    assert commit_file(temp_path, "README") == str(tmp_path / "README (1)")
+    assert (tmp_path / "README (1)").read_text() == "downloaded"
+
+
+def test_candidate_paths():
+    paths = candidate_paths("/folder", "archive.tar.gz")
+    assert [next(paths) for _ in range(3)] == ["/folder/archive.tar.gz", "/folder/archive.tar (1).gz", "/folder/archive.tar (2).gz"]
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("photo.jpg", "photo.jpg"),
+    ("../../etc/passwd", "passwd"),
+    ("C:\\Users\\me\\file.txt", "file.txt"),
+    (".hidden", "hidden"),
+    ("a:b\x00c.txt", "abc.txt"),
+    ("", "download"),
+    (None, "download"),
+    ("..", "download"),
+])
+def test_safe_filename(name, expected):
+    assert safe_filename(name) == expected
+
+
+def test_failed_start_leaves_nothing(manager):
+    entry = manager.begin("file.bin")
+    assert manager.failed(entry["id"], "no space left")["state"] == "failed"
+    assert not os.path.exists(entry["temp_path"])
+    assert manager.failed(entry["id"], "again")["error"] == "again"
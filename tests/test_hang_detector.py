@@ -0,0 +1,173 @@
+# Python libraries
+import json
+import queue
+import sys
+import threading
+import time
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.hang_detector import HangDetector
+
+from .fakes import FakeClock
+
+MAIN_THREAD_ID = 1
+
+
+# Main loop stand-in: `post` queues a callback, `run_pending` runs the queued ones (as the
+# main run loop would once it is free again).
+class FakeMainLoop:
+    def __init__(self):
+        self.posted = []
+
+    def post(self, func):
+        self.posted.append(func)
+
+    def run_pending(self):
+        posted, self.posted = self.posted, []
+        for func in posted:
+            func()
+
+
+# A frame with a recognizable function name, standing in for the stalled main thread.
+def stalled_in_layout():
+    return sys._getframe()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(0.0)
+
+
+@pytest.fixture
+def main_loop():
+    return FakeMainLoop()
+
+
+def detector(main_loop, clock, **kwargs):
+    frames = lambda: {MAIN_THREAD_ID: stalled_in_layout()}
+    return HangDetector(main_loop.post, main_thread_id=MAIN_THREAD_ID, threshold=0.5, clock=clock, frames=frames, **kwargs)
+
+
+def test_responsive_main_loop_has_no_stalls(main_loop, clock):
+    hangs = detector(main_loop, clock)
+    for _ in range(5):
+        assert hangs.check() is None
+        assert len(main_loop.posted) == 1
+        clock.advance(0.1)
+        main_loop.run_pending()
+        clock.advance(0.15)
+    stats = hangs.stats()
+    assert (stats["pings"], stats["stalls"], stats["reports"]) == (5, 0, 0)
+
+
+def test_stall_is_reported_once_with_the_main_stack(main_loop, clock):
+    hangs = detector(main_loop, clock)
+    hangs.check()
+    clock.advance(0.3)
+    # Not late yet, and no second ping while one is outstanding.
+    assert hangs.check() is None
+    assert len(main_loop.posted) == 1
+    clock.advance(0.3)
+    report = hangs.check()
+    assert report["stalled_sec"] == 0.6
+    assert "stalled_in_layout" in "".join(report["stack"])
+    clock.advance(1.0)
+    assert hangs.check() is None
+    main_loop.run_pending()
+    stats = hangs.stats()
+    assert (stats["stalls"], stats["reports"], stats["longest_stall_sec"]) == (1, 1, 1.6)
+    assert stats["histogram"]["<=2s"] == 1
+    assert sum(stats["histogram"].values()) == 1
+
+
+def test_stall_histogram_buckets(main_loop, clock):
+    hangs = detector(main_loop, clock)
+    for stalled in (0.3, 0.7, 0.9, 3.0, 30.0):
+        hangs.check()
+        clock.advance(stalled)
+        main_loop.run_pending()
+    histogram = hangs.stats()["histogram"]
+    # 0.3 s is under the threshold, so it is not a stall.
+    assert histogram == {"<=0.25s": 0, "<=0.5s": 0, "<=1s": 2, "<=2s": 0, "<=5s": 1, "<=10s": 0, ">10s": 1}
+    assert hangs.stats()["longest_stall_sec"] == 30.0
+
+
+def test_reports_are_rate_limited(main_loop, clock):
+    hangs = detector(main_loop, clock, report_interval=60.0)
+    reports = []
+    for _ in range(4):
+        hangs.check()
+        clock.advance(1.0)
+        reports.append(hangs.check())
+        main_loop.run_pending()
+        clock.advance(10.0)
+    assert [report is not None for report in reports] == [True, False, False, False]
+    clock.advance(30.0)
+    hangs.check()
+    clock.advance(1.0)
+    report = hangs.check()
+    # The next report says how many stalls were not reported since the last one.
+    assert report["suppressed"] == 3
+    assert hangs.stats()["stalls"] == 4
+    assert hangs.stats()["reports"] == 2
+
+
+def test_reports_are_appended_to_the_report_file(main_loop, clock, tmp_path):
+    path = tmp_path / "hangs.jsonl"
+    hangs = detector(main_loop, clock, report_interval=0.0, report_path=str(path))
+    for _ in range(2):
+        hangs.check()
+        clock.advance(2.0)
+        hangs.check()
+        main_loop.run_pending()
+    reports = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [report["stalled_sec"] for report in reports] == [2.0, 2.0]
+    assert all("stalled_in_layout" in "".join(report["stack"]) for report in reports)
+
+
+def test_unwritable_report_file_is_not_an_error(main_loop, clock, tmp_path):
+    hangs = detector(main_loop, clock, report_path=str(tmp_path))
+    hangs.check()
+    clock.advance(1.0)
+    assert hangs.check()["stalled_sec"] == 1.0
+
+
+def test_missing_main_thread_gives_an_empty_stack(main_loop, clock):
+    hangs = HangDetector(main_loop.post, main_thread_id=MAIN_THREAD_ID, clock=clock, frames=dict)
+    hangs.check()
+    clock.advance(1.0)
+    assert hangs.check()["stack"] == []
+
+
+# A "main loop" thread running callbacks from a queue, blocked by a slow callback while the
+# detector runs on its own thread with the real clock and frames.
+def test_detects_a_stalled_queue_loop(tmp_path):
+    jobs = queue.Queue()
+    def main_loop():
+        while (job := jobs.get()) is not None:
+            job()
+    loop_thread = threading.Thread(target=main_loop, name="main-loop-stand-in")
+    loop_thread.start()
+    path = tmp_path / "hangs.jsonl"
+    hangs = HangDetector(jobs.put, main_thread_id=loop_thread.ident, threshold=0.1, interval=0.02, report_path=str(path))
+    hangs.start()
+    try:
+        time.sleep(0.1)
+        def render_slowly():
+            time.sleep(0.4)
+        jobs.put(render_slowly)
+        deadline = time.monotonic() + 5.0
+        while (hangs.stats()["stalls"] == 0) and (time.monotonic() < deadline):
+            time.sleep(0.02)
+    finally:
+        hangs.stop()
+        jobs.put(None)
+        loop_thread.join()
+    stats = hangs.stats()
+    assert stats["stalls"] == 1
+    assert stats["reports"] == 1
+    assert 0.1 <= stats["longest_stall_sec"] < 1.0
+    report = json.loads(path.read_text())
+    assert "render_slowly" in "".join(report["stack"])
@@ -0,0 +1,146 @@
+# Python libraries
+import pytest
+
+# Local libraries
+from . import pyobjc_stubs
+
+pyobjc_stubs.install()
+
+from macos_grok_overlay import hotkeys, listener
+from macos_grok_overlay.constants import LAUNCHER_TRIGGER, kCGEventFlagMaskAlternate, kCGEventFlagMaskCommand
+
+from .fakes import FakeApp, FakeHotkeyBackend
+
+OPTION, COMMAND = kCGEventFlagMaskAlternate, kCGEventFlagMaskCommand
+SPACE = 49
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setitem(LAUNCHER_TRIGGER, "flags", OPTION)
+    monkeypatch.setitem(LAUNCHER_TRIGGER, "key", SPACE)
+    monkeypatch.setattr(listener, "handle_new_trigger", None)
+    hotkeys.SEQUENCE_MATCHER.compile([])
+    return FakeApp()
+
+
+# Backend classes for start_hotkey_backend, recording the instances created.
+def fake_backends(available):
+    created = []
+    def factory(name, is_available):
+        def make(app, settings=None):
+            backend = FakeHotkeyBackend(app, settings, available=is_available)
+            backend.name = name
+            created.append(backend)
+            return backend
+        return make
+    return {name: factory(name, is_available) for name, is_available in available.items()}, created
+
+
+def test_backend_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        hotkeys.HotkeyBackend(FakeApp())
+
+
+def test_requested_backend_is_started(app):
+    backends, created = fake_backends({"tap": True, "registered": True})
+    backend = hotkeys.start_hotkey_backend(app, "registered", {}, backends, default="tap")
+    assert backend.name == "registered"
+    assert backend.started
+    assert [b.name for b in created] == ["registered"]
+
+
+def test_unknown_backend_uses_default(app):
+    backends, created = fake_backends({"tap": True})
+    backend = hotkeys.start_hotkey_backend(app, "nonsense", {}, backends, default="tap")
+    assert backend.name == "tap"
+    assert backend.started
+
+
+def test_failed_backend_falls_back_to_default(app):
+    backends, created = fake_backends({"tap": True, "registered": False})
+    backend = hotkeys.start_hotkey_backend(app, "registered", {}, backends, default="tap")
+    assert [b.name for b in created] == ["registered", "tap"]
+    assert backend is created[1]
+    assert backend.started
+    assert backend.press(OPTION, SPACE)
+    assert app.calls == ["toggle"]
+
+
+def test_failed_default_is_still_returned(app):
+    backends, created = fake_backends({"tap": False})
+    backend = hotkeys.start_hotkey_backend(app, "tap", {}, backends, default="tap")
+    assert backend.name == "tap"
+    assert not backend.started
+    assert len(created) == 1
+
+
+def test_settings_are_passed_to_the_backend(app):
+    backends, created = fake_backends({"tap": True})
+    backend = hotkeys.start_hotkey_backend(app, "tap", {"tap_thread": True}, backends, default="tap")
+    assert backend.settings == {"tap_thread": True}
+
+
+def test_rebind_applies_new_trigger(app, monkeypatch):
+    backend = FakeHotkeyBackend(app)
+    backend.start()
+    assert backend.press(OPTION, SPACE)
+    monkeypatch.setitem(LAUNCHER_TRIGGER, "flags", COMMAND)
+    monkeypatch.setitem(LAUNCHER_TRIGGER, "key", 40)
+    # Not applied until the backend is rebound.
+    assert backend.press(OPTION, SPACE)
+    backend.rebind()
+    assert not backend.press(OPTION, SPACE)
+    assert backend.press(COMMAND, 40)
+    assert app.calls == ["toggle", "toggle", "toggle"]
+
+
+def test_extra_bindings_dispatch_their_actions(app, monkeypatch):
+    monkeypatch.setitem(hotkeys.TRIGGER_BINDINGS, "home", {"flags": COMMAND, "key": 4})
+    monkeypatch.setitem(hotkeys.TRIGGER_BINDINGS, "reload", {"flags": COMMAND, "key": 15})
+    backend = FakeHotkeyBackend(app)
+    backend.start()
+    assert backend.press(COMMAND, 4)
+    assert backend.press(COMMAND, 15)
+    assert not backend.press(COMMAND, 16)
+    assert app.calls == ["home", "reload"]
+
+
+# The capture flow of `set_custom_launcher_trigger`, without its window.
+def test_capture_sets_a_new_trigger(app, monkeypatch):
+    backend = FakeHotkeyBackend(app)
+    backend.start()
+    monkeypatch.setitem(LAUNCHER_TRIGGER, "flags", None)
+    monkeypatch.setitem(LAUNCHER_TRIGGER, "key", None)
+    backend.begin_capture()
+    def handle_new_trigger(event, flags, keycode):
+        LAUNCHER_TRIGGER.update(flags=flags, key=keycode)
+        listener.handle_new_trigger = None
+        backend.end_capture()
+    listener.handle_new_trigger = handle_new_trigger
+    rebinds = backend.rebinds
+    # The captured press is consumed, not matched against the old trigger.
+    assert backend.press(OPTION | (1 << 8), SPACE)
+    assert app.calls == []
+    assert not backend.capturing
+    assert backend.rebinds == rebinds + 1
+    assert backend.press(COMMAND | OPTION, 7) is False
+    # Modifier bits outside the trigger mask are dropped from the captured trigger.
+    assert LAUNCHER_TRIGGER == {"flags": OPTION, "key": SPACE}
+    assert backend.press(OPTION, SPACE)
+    assert app.calls == ["toggle"]
+
+
+def test_stopped_backend_ignores_presses(app):
+    backend = FakeHotkeyBackend(app)
+    backend.start()
+    backend.stop()
+    assert not backend.press(OPTION, SPACE)
+    assert app.calls == []
+
+
+def test_carbon_modifiers():
+    assert hotkeys.carbon_modifiers(0) == 0
+    assert hotkeys.carbon_modifiers(OPTION) == 1 << 11
+    assert hotkeys.carbon_modifiers(COMMAND | (1 << 17)) == (1 << 8) | (1 << 9)
+    assert hotkeys.four_char_code("grok") == 0x67726F6B
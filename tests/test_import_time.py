@@ -0,0 +1,71 @@
+# Python libraries
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from .conftest import TEST_HOME
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What each command imports before doing its work, run in a fresh interpreter where
+# the Apple frameworks (stubs, if they are not installed) can be imported.
+COMMANDS = {
+    "import macos_grok_overlay": "import macos_grok_overlay",
+    # The `grok` entry point, then the `ctl` and `stats` subcommands it dispatches to.
+    "grok ctl": "import macos_grok_overlay; macos_grok_overlay.main; from macos_grok_overlay.control import ctl_main",
+    "grok stats": "import macos_grok_overlay; macos_grok_overlay.main; from macos_grok_overlay.telemetry import stats_main",
+}
+# Per-command budget: the most package modules it may load, and seconds it may take (the
+# time is generous, it only catches a command that starts loading something heavy).
+IMPORT_BUDGETS = {
+    "import macos_grok_overlay": (1, 0.5),
+    "grok ctl": (16, 1.0),
+    "grok stats": (16, 1.0),
+}
+MEASURE = """
+import json, sys, time
+sys.path.insert(0, {repo!r})
+from tests import pyobjc_stubs
+pyobjc_stubs.install()
+before = set(sys.modules)
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "frameworks": sorted(name for name in pyobjc_stubs.FRAMEWORKS if name in set(sys.modules) - before),
+    "modules": sorted(name for name in set(sys.modules) - before if name.startswith("macos_grok_overlay")),
+}}))
+"""
+
+
+def measure(statement):
+    env = dict(os.environ, HOME=TEST_HOME)
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE.format(repo=REPO_DIR, statement=statement)],
+        capture_output=True, text=True, env=env, cwd=REPO_DIR, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+@pytest.mark.parametrize("command", sorted(COMMANDS))
+def test_import_budget(command):
+    # Best of a few runs, to leave out a slow first start (cold disk cache).
+    runs = [measure(COMMANDS[command]) for _ in range(3)]
+    result = min(runs, key=lambda run: run["seconds"])
+    max_modules, max_seconds = IMPORT_BUDGETS[command]
+    print(f"{command}: {1000 * result['seconds']:.1f} ms, {len(result['modules'])} package modules")
+    assert result["frameworks"] == [], f"{command} imports Apple frameworks"
+    assert len(result["modules"]) <= max_modules, f"{command} imports {result['modules']}"
+    assert result["seconds"] <= max_seconds
+
+
+# Importing a GUI module does load the frameworks (so the budget test would notice).
+def test_gui_imports_are_detected():
+    result = measure("import macos_grok_overlay.listener")
+    assert "AppKit" in result["frameworks"]
+    assert "Quartz" in result["frameworks"]
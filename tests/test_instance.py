@@ -0,0 +1,179 @@
+# Python libraries
+import fcntl
+import functools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.control import ControlServer, send_command
+from macos_grok_overlay.instance import InstanceLock, hand_off, pid_alive
+
+# Fresh interpreters for the "other launch", as a second `grok` process would be.
+SPAWN = multiprocessing.get_context("spawn")
+
+
+# Delegate of the first instance, answering "show" with its PID.
+class FirstInstance:
+    def showWindow_(self, sender):
+        return os.getpid()
+
+
+# First launch: take the lock, spend `startup` seconds starting up, then serve the
+# control socket until told to exit.
+def first_instance(lock_path, socket_path, locked, exit_now, startup=0.0):
+    lock = InstanceLock(lock_path)
+    assert lock.acquire()
+    locked.set()
+    time.sleep(startup)
+    server = None
+    if socket_path is not None:
+        server = ControlServer(FirstInstance(), path=socket_path)
+        server.start()
+    exit_now.wait(30)
+    if server is not None:
+        server.stop()
+    lock.release()
+
+
+@pytest.fixture
+def paths():
+    # Socket paths are limited to about 100 bytes, so use a short temporary directory.
+    directory = tempfile.mkdtemp(prefix="grok-instance-")
+    yield os.path.join(directory, "instance.lock"), os.path.join(directory, "control.sock")
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def launch(paths):
+    processes = []
+    def launch(socket_path=None, startup=0.0):
+        locked, exit_now = SPAWN.Event(), SPAWN.Event()
+        process = SPAWN.Process(target=first_instance, args=(paths[0], socket_path, locked, exit_now, startup))
+        process.start()
+        processes.append((process, exit_now))
+        assert locked.wait(30)
+        return process, exit_now
+    yield launch
+    for process, exit_now in processes:
+        exit_now.set()
+        process.join(10)
+        if process.is_alive():
+            process.kill()
+
+
+def test_lock_is_exclusive_across_processes(paths, launch):
+    process, exit_now = launch()
+    second = InstanceLock(paths[0])
+    assert not second.acquire()
+    assert second.owner_pid() == process.pid
+    assert second.holder_alive()
+    exit_now.set()
+    process.join(10)
+    assert second.acquire()
+    assert second.owner_pid() == os.getpid()
+    second.release()
+
+
+def test_waiting_launch_takes_over_when_the_holder_exits(paths, launch):
+    process, exit_now = launch()
+    second = InstanceLock(paths[0])
+    start = time.monotonic()
+    threading.Timer(0.3, exit_now.set).start()
+    assert second.acquire(wait=True, poll_interval=0.05)
+    assert time.monotonic() - start >= 0.3
+    assert second.owner_pid() == os.getpid()
+    second.release()
+
+
+def test_stale_lock_file_is_replaced(paths):
+    # A lock file left by a process that is gone, still locked through a descriptor
+    # that a dead owner's orphaned child inherited.
+    dead = SPAWN.Process(target=time.sleep, args=(0,))
+    dead.start()
+    dead.join()
+    assert not pid_alive(dead.pid)
+    orphan = InstanceLock(paths[0], pid=dead.pid)
+    assert orphan.acquire()
+    lock = InstanceLock(paths[0])
+    assert lock.acquire()
+    assert lock.owner_pid() == os.getpid()
+    lock.release()
+    orphan.release()
+
+
+
+# A launch that has locked the file but not yet recorded its PID (here, held up by the
+# guard) must not lose the file to a stale recovery reading the previous, dead owner.
+def test_lock_being_taken_is_not_replaced_as_stale(paths):
+    dead = SPAWN.Process(target=time.sleep, args=(0,))
+    dead.start()
+    dead.join()
+    with open(paths[0], "w") as f:
+        f.write(f"{dead.pid}\n")
+    taking = InstanceLock(paths[0], pid=os.getppid())
+    recovering = InstanceLock(paths[0])
+    results = {}
+    with taking._guard():
+        threads = [threading.Thread(target=lambda: results.update(taking=taking.acquire()))]
+        threads[0].start()
+        # Wait for the first launch to lock the file (it then waits for the guard).
+        probe = os.open(paths[0], os.O_RDWR)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                fcntl.flock(probe, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(probe, fcntl.LOCK_UN)
+                time.sleep(0.01)
+            except BlockingIOError:
+                break
+        os.close(probe)
+        threads.append(threading.Thread(target=lambda: results.update(recovering=recovering.acquire())))
+        threads[1].start()
+        time.sleep(0.1)
+    for thread in threads:
+        thread.join(10)
+    # Whichever got the guard first, exactly one of them holds the lock on the current file.
+    assert sorted(results.values()) == [False, True]
+    holder = taking if results["taking"] else recovering
+    assert holder._is_current_file(holder.fd)
+    assert holder.owner_pid() == holder.pid
+    holder.release()
+
+# A second launch while the first one is still starting (no control socket for 1.5 s)
+# waits for it instead of giving up.
+def test_hand_off_to_an_instance_that_is_still_starting(paths, launch):
+    lock_path, socket_path = paths
+    process, exit_now = launch(socket_path, startup=1.5)
+    second = InstanceLock(lock_path)
+    assert not second.acquire()
+    send = functools.partial(send_command, path=socket_path)
+    response = hand_off("show", send=send, holder_alive=second.holder_alive)
+    assert response == {"id": 1, "ok": True, "result": process.pid}
+
+
+def test_hand_off_stops_when_the_holder_exits(paths, launch):
+    lock_path, socket_path = paths
+    process, exit_now = launch()
+    second = InstanceLock(lock_path)
+    assert not second.acquire()
+    exit_now.set()
+    process.join(10)
+    start = time.monotonic()
+    send = functools.partial(send_command, path=socket_path)
+    assert hand_off("show", send=send, holder_alive=second.holder_alive) is None
+    assert time.monotonic() - start < 1.0
+
+
+def test_hand_off_timeout():
+    attempts = []
+    def send(command):
+        attempts.append(command)
+        raise ConnectionRefusedError()
+    assert hand_off("show", timeout=0.2, retry_interval=0.05, send=send) is None
+    assert 3 <= len(attempts) <= 6
@@ -0,0 +1,211 @@
+# Python libraries
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.journal import (
+    HEADER,
+    RECORD,
+    RECORD_CLEAN_EXIT,
+    RECORD_CRASH,
+    RECORD_START,
+    HealthJournal,
+)
+
+from .fakes import FakeClock
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "journal.bin")
+
+
+def open_journal(path, clock, capacity=8, pid=100):
+    return HealthJournal(path, capacity=capacity, clock=clock, pid=pid, sync=False)
+
+
+def slot_of(journal, sequence):
+    for slot in range(journal.capacity):
+        record = journal._read(slot)
+        if (record is not None) and (record.sequence == sequence):
+            return slot
+    raise LookupError(sequence)
+
+
+# Overwrite part of a slot, as a write interrupted by a crash or power loss would leave it.
+def tear(path, slot, data=b"\xff" * 5, at=3):
+    with open(path, "r+b") as f:
+        f.seek(HEADER.size + slot * RECORD.size + at)
+        f.write(data)
+
+
+def test_append_and_read_back(path):
+    clock = FakeClock()
+    journal = open_journal(path, clock)
+    journal.record_start()
+    clock.advance(5)
+    journal.record_crash(3)
+    clock.advance(5)
+    journal.record_clean_exit()
+    records = journal.records()
+    assert [(r.sequence, r.timestamp, r.kind, r.code) for r in records] == [
+        (1, 1000.0, RECORD_START, 0), (2, 1005.0, RECORD_CRASH, 3), (3, 1010.0, RECORD_CLEAN_EXIT, 0),
+    ]
+    assert all(r.pid == 100 for r in records)
+    journal.close()
+    reopened = open_journal(path, clock)
+    assert (reopened.sequence, reopened.head) == (3, 3)
+    assert "crash" in reopened.dump()
+
+
+def test_torn_newest_slot_is_skipped_and_reused(path):
+    clock = FakeClock()
+    journal = open_journal(path, clock)
+    for _ in range(3):
+        journal.record_start()
+    journal.close()
+    tear(path, 2)
+    journal = open_journal(path, clock)
+    # The torn record fails its CRC, so the journal resumes after the last good one.
+    assert journal.invalid_slots == 1
+    assert [r.sequence for r in journal.records()] == [1, 2]
+    assert (journal.sequence, journal.head) == (2, 2)
+    record = journal.record_clean_exit()
+    assert (record.sequence, slot_of(journal, 3)) == (3, 2)
+    assert [r.sequence for r in journal.records()] == [1, 2, 3]
+
+
+def test_torn_checksum_only(path):
+    clock = FakeClock()
+    journal = open_journal(path, clock)
+    journal.record_start()
+    journal.record_start()
+    # The body made it to disk but the checksum did not.
+    tear(path, 1, data=b"\x00\x00\x00\x00", at=RECORD.size - 9)
+    assert [r.sequence for r in journal.records()] == [1]
+    assert journal.record_start().sequence == 2
+
+
+def test_wrap_around(path):
+    clock = FakeClock()
+    journal = open_journal(path, clock, capacity=4)
+    for _ in range(10):
+        journal.record_start()
+        clock.advance(1)
+    assert [r.sequence for r in journal.records()] == [7, 8, 9, 10]
+    assert journal.head == 10 % 4
+    journal.close()
+    journal = open_journal(path, clock, capacity=4)
+    assert (journal.sequence, journal.head) == (10, 2)
+    # Reading backwards from the head crosses the end of the ring.
+    assert [r.sequence for r in journal.recent(since=0)] == [10, 9, 8, 7]
+    assert [r.sequence for r in journal.recent(since=clock() - 2.5)] == [10, 9]
+
+
+def test_torn_slot_after_wrap_around(path):
+    clock = FakeClock()
+    journal = open_journal(path, clock, capacity=4)
+    for _ in range(6):
+        journal.record_start()
+    tear(path, slot_of(journal, 6))
+    # The oldest slot (sequence 3, not the torn one) must not be taken for the newest.
+    assert [r.sequence for r in journal.recent(since=0)] == [5, 4, 3]
+    assert journal.record_start().sequence == 6
+
+
+def test_failed_starts_in_window(path):
+    clock = FakeClock()
+    journal = open_journal(path, clock, pid=1)
+    journal.record_start()
+    journal.record_clean_exit()
+    clock.advance(100)
+    journal.pid = 2
+    journal.record_start()
+    journal.record_crash()
+    clock.advance(10)
+    journal.pid = 3
+    journal.record_start()
+    # pid 1 is outside the window, pid 2 crashed, pid 3 is still running.
+    assert journal.failed_starts(window=60) == 2
+    journal.record_clean_exit()
+    assert journal.failed_starts(window=60) == 1
+    assert journal.failed_starts(window=200) == 1
+
+
+def test_unrecognized_file_is_recreated(path):
+    with open(path, "wb") as f:
+        f.write(b"time,count\n1700000000,2\n")
+    journal = open_journal(path, FakeClock())
+    assert journal.records() == []
+    assert journal.record_start().sequence == 1
+
+
+# Two journals on the same file (as two processes would have) must not overwrite each
+# other's records, whichever appends next.
+def test_two_writers_interleaved(path):
+    clock = FakeClock()
+    first = open_journal(path, clock, pid=1)
+    second = open_journal(path, clock, pid=2)
+    first.record_start()
+    second.record_start()
+    second.record_crash()
+    first.record_clean_exit()
+    assert [(r.sequence, r.pid) for r in first.records()] == [(1, 1), (2, 2), (3, 2), (4, 1)]
+    assert [(r.sequence, r.pid) for r in second.recent(since=0)] == [(4, 1), (3, 2), (2, 2), (1, 1)]
+
+
+
+# Appending checks the slots around the cached head only, not the whole ring.
+def test_append_reads_a_constant_number_of_slots(path, monkeypatch):
+    journal = open_journal(path, FakeClock(), capacity=256)
+    for _ in range(300):
+        journal.record_start()
+    reads = []
+    read = journal._read
+    monkeypatch.setattr(journal, "_read", lambda slot: reads.append(slot) or read(slot))
+    journal.record_start()
+    assert len(reads) <= 2
+    # Records appended by another writer since are caught up with one by one.
+    other = open_journal(path, FakeClock(), capacity=256, pid=2)
+    for _ in range(3):
+        other.record_start()
+    reads.clear()
+    assert journal.record_clean_exit().sequence == 305
+    assert len(reads) <= 5
+
+
+# Another writer wrapping around the whole ring overwrites the cached head, which then
+# needs a full scan.
+def test_catch_up_after_another_writer_wrapped_around(path):
+    clock = FakeClock()
+    first = open_journal(path, clock, capacity=4, pid=1)
+    second = open_journal(path, clock, capacity=4, pid=2)
+    first.record_start()
+    for _ in range(4):
+        second.record_start()
+    assert (first.record_clean_exit().sequence, slot_of(first, 6)) == (6, 1)
+    assert [r.sequence for r in first.recent(since=0)] == [6, 5, 4, 3]
+
+WRITER = """
+import sys
+sys.path.insert(0, {repo!r})
+from macos_grok_overlay.journal import HealthJournal
+journal = HealthJournal({path!r}, capacity=512, sync=False)
+for _ in range({count}):
+    journal.record_start()
+"""
+
+
+def test_two_writer_processes(path):
+    count = 200
+    script = WRITER.format(repo=REPO_DIR, path=path, count=count)
+    writers = [subprocess.Popen([sys.executable, "-c", script]) for _ in range(2)]
+    assert [writer.wait(timeout=60) for writer in writers] == [0, 0]
+    records = HealthJournal(path, capacity=512, sync=False).records()
+    assert [r.sequence for r in records] == list(range(1, 2 * count + 1))
+    assert sorted({r.pid for r in records}) == sorted(writer.pid for writer in writers)
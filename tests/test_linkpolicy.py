@@ -0,0 +1,113 @@
+# Python libraries
+import logging
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.linkpolicy import (
+    DEFAULT_INTERNAL_LINK_PATTERNS,
+    POLICY_EXTERNAL,
+    POLICY_OVERLAY,
+    LinkPolicy,
+    compile_link_patterns,
+    pattern_regex,
+)
+
+
+def matches(patterns, target):
+    return compile_link_patterns(patterns).fullmatch(target) is not None
+
+
+# A leading "*." matches the bare domain and its subdomains, but no other domain that
+# merely contains it.
+@pytest.mark.parametrize("target, expected", [
+    ("x.com/", True),
+    ("api.x.com/", True),
+    ("a.b.x.com/home", True),
+    ("X.COM/", True),
+    ("evil-x.com/", False),
+    ("x.com.evil.com/", False),
+    ("evilx.com/", False),
+])
+def test_wildcard_subdomain_pattern(target, expected):
+    assert matches(["*.x.com"], target) is expected
+
+
+def test_host_and_path_patterns():
+    assert matches(["example.com"], "example.com/any/path")
+    assert not matches(["example.com"], "www.example.com/")
+    assert matches(["example.com/docs/*"], "example.com/docs/a/b")
+    assert not matches(["example.com/docs/*"], "example.com/blog/")
+    assert matches(["https://example.com"], "example.com/")
+    # Regular expression characters in patterns are literal.
+    assert not matches(["ex.mple.com"], "exampleXcom/")
+
+
+def test_no_patterns_compile_to_none():
+    assert compile_link_patterns([]) is None
+    with pytest.raises(ValueError):
+        pattern_regex("/path/only")
+
+
+@pytest.fixture
+def policy():
+    return LinkPolicy(["*.x.com", "accounts.google.com"], ["help.x.com/*"])
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://x.com/home", POLICY_OVERLAY),
+    ("https://api.x.com/", POLICY_OVERLAY),
+    ("https://accounts.google.com/signin", POLICY_OVERLAY),
+    ("https://evil-x.com/", POLICY_EXTERNAL),
+    ("https://x.com.evil.com/", POLICY_EXTERNAL),
+    ("https://example.org/article", POLICY_EXTERNAL),
+])
+def test_followed_links(policy, url, expected):
+    assert policy.decide(url) == expected
+
+
+# External patterns win over internal ones, whoever started the navigation.
+def test_external_patterns_take_precedence(policy):
+    assert policy.decide("https://help.x.com/articles/1") == POLICY_EXTERNAL
+    assert policy.decide("https://help.x.com/articles/1", user_initiated=False) == POLICY_EXTERNAL
+
+
+# Navigations the user did not start (e.g., redirects during sign-in) stay in the overlay.
+def test_redirects_stay_in_the_overlay(policy):
+    assert policy.decide("https://example.org/oauth/callback", user_initiated=False) == POLICY_OVERLAY
+    assert policy.decide("https://example.org/oauth/callback", user_initiated=True) == POLICY_EXTERNAL
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("mailto:someone@example.com", POLICY_EXTERNAL),
+    ("tel:+15555550100", POLICY_EXTERNAL),
+    ("itms-apps://apps.apple.com/app/id1", POLICY_EXTERNAL),
+    ("data:text/plain,hello", POLICY_OVERLAY),
+    ("about:blank", POLICY_OVERLAY),
+    ("blob:https://x.com/1234", POLICY_OVERLAY),
+    ("javascript:void(0)", POLICY_OVERLAY),
+    ("/relative/path", POLICY_OVERLAY),
+])
+def test_schemes(policy, url, expected):
+    assert policy.decide(url) == expected
+    # Non-web schemes are decided the same way for redirects.
+    assert policy.decide(url, user_initiated=False) == expected
+
+
+def test_from_settings_adds_to_the_defaults_and_skips_bad_patterns(caplog):
+    settings = {"internal_link_patterns": ["docs.example.com", "/nohost", 5], "external_link_patterns": ["*.x.com"]}
+    with caplog.at_level(logging.WARNING, logger="macos_grok_overlay"):
+        policy = LinkPolicy.from_settings(settings)
+    assert len(caplog.records) == 2
+    assert policy.decide("https://docs.example.com/page") == POLICY_OVERLAY
+    assert policy.decide("https://x.com/home") == POLICY_EXTERNAL
+    assert policy.decide("https://accounts.google.com/") == POLICY_OVERLAY
+    # Without settings, the defaults apply.
+    assert LinkPolicy.from_settings({}).internal.pattern == LinkPolicy(DEFAULT_INTERNAL_LINK_PATTERNS).internal.pattern
+
+
+def test_stats_count_decisions(policy):
+    policy.decide("https://x.com/")
+    policy.decide("https://example.org/")
+    policy.decide("mailto:someone@example.com")
+    assert policy.stats() == {POLICY_OVERLAY: 1, POLICY_EXTERNAL: 2}
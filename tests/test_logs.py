@@ -0,0 +1,173 @@
+# Python libraries
+import json
+import logging
+import os
+import queue
+import statistics
+import threading
+import time
+
+import pytest
+
+# Local libraries
+from . import pyobjc_stubs
+
+pyobjc_stubs.install()
+
+from macos_grok_overlay import listener, logs
+from macos_grok_overlay.logs import LOG_FILE_NAME, LOGGER_NAME, DroppingQueueHandler, JsonLineFormatter
+
+from .fakes import FakeApp
+
+KEY_DOWN = listener.kCGEventKeyDown
+
+
+# Leave the package logger as it was (setup_logging stops propagation and sets the level).
+@pytest.fixture(autouse=True)
+def package_logger():
+    logger = logging.getLogger(LOGGER_NAME)
+    level, propagate = logger.level, logger.propagate
+    yield logger
+    logs.stop_logging()
+    logger.setLevel(level)
+    logger.propagate = propagate
+
+
+def read_entries(log_dir):
+    with open(os.path.join(log_dir, LOG_FILE_NAME)) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_are_written_as_json_lines(tmp_path):
+    logs.setup_logging("DEBUG", log_dir=str(tmp_path), console=False)
+    logger = logs.get_logger("tests")
+    logger.info("Trigger %s", "set", extra={"trigger": {"flags": 1, "key": 49}})
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        logger.exception("Failed")
+    logs.stop_logging()
+    first, second = read_entries(tmp_path)
+    assert (first["level"], first["logger"], first["message"]) == ("INFO", "macos_grok_overlay.tests", "Trigger set")
+    assert first["trigger"] == {"flags": 1, "key": 49}
+    assert second["level"] == "ERROR"
+    assert "ValueError: bad" in second["exception"]
+
+
+def test_extra_values_that_are_not_json_are_repr(tmp_path):
+    record = logging.LogRecord(LOGGER_NAME, logging.INFO, "", 0, "x", (), None)
+    record.path = tmp_path
+    assert json.loads(JsonLineFormatter().format(record))["path"] == repr(tmp_path)
+
+
+def test_log_file_is_rotated_by_size(tmp_path):
+    logs.setup_logging("INFO", log_dir=str(tmp_path), console=False, max_bytes=2000, backup_count=2)
+    logger = logs.get_logger("tests")
+    for i in range(100):
+        logger.info("line %d %s", i, "x" * 50)
+    logs.stop_logging()
+    assert sorted(os.listdir(tmp_path)) == [LOG_FILE_NAME, LOG_FILE_NAME + ".1", LOG_FILE_NAME + ".2"]
+    assert all(os.path.getsize(tmp_path / name) <= 2000 for name in os.listdir(tmp_path))
+    assert read_entries(tmp_path)[-1]["message"].startswith("line 99 ")
+
+
+@pytest.mark.parametrize("level, env, expected", [
+    ("debug", None, "DEBUG"),
+    (None, "error", "ERROR"),
+    ("warning", "ERROR", "WARNING"),
+    (None, None, "INFO"),
+    ("verbose", None, "INFO"),
+])
+def test_resolve_log_level(monkeypatch, level, env, expected):
+    if env is None:
+        monkeypatch.delenv(logs.LOG_LEVEL_ENV, raising=False)
+    else:
+        monkeypatch.setenv(logs.LOG_LEVEL_ENV, env)
+    assert logs.resolve_log_level(level) == expected
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(2))
+    logger = logging.getLogger("grok-overlay-tests.dropping")
+    logger.propagate = False
+    logger.addHandler(handler)
+    for i in range(5):
+        logger.warning("record %d", i)
+    logger.removeHandler(handler)
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+# Writer that blocks until released, as a stalled pipe or disk would.
+class StalledHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.written = 0
+
+    def emit(self, record):
+        self.unblock.wait()
+        self.written += 1
+
+
+# A stalled writer fills the queue, and the logging caller still does not wait on it.
+def test_logging_does_not_wait_on_a_stalled_writer(tmp_path):
+    logs.setup_logging("DEBUG", log_dir=str(tmp_path), console=False, queue_size=10)
+    stalled = StalledHandler()
+    logs.LISTENER.handlers += (stalled,)
+    logger = logs.get_logger("tests")
+    start = time.perf_counter()
+    for i in range(100):
+        logger.debug("record %d", i)
+    elapsed = time.perf_counter() - start
+    dropped = logs.dropped_records()
+    assert elapsed < 0.5
+    # The queue holds 10 records and the writer has taken at most one more.
+    assert dropped >= 89
+    stalled.unblock.set()
+    deadline = time.monotonic() + 5.0
+    while (stalled.written < 100 - dropped) and (time.monotonic() < deadline):
+        time.sleep(0.01)
+    assert stalled.written == 100 - dropped
+
+
+# Tap callback in trigger capture mode, which logs a debug record for every key.
+@pytest.fixture
+def capture_callback(monkeypatch):
+    monkeypatch.setattr(listener, "CGEventGetIntegerValueField", lambda event, field: event[1])
+    monkeypatch.setattr(listener, "CGEventGetFlags", lambda event: event[0])
+    monkeypatch.setattr(listener, "handle_new_trigger", lambda event, flags, keycode: None)
+    return listener.global_show_hide_listener(FakeApp())
+
+
+# Median time of one callback, in microseconds.
+def callback_latency(callback, count=2000):
+    event = (0, 49)
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        callback(None, KEY_DOWN, event, None)
+        samples.append(time.perf_counter() - start)
+    return 1e6 * statistics.median(samples)
+
+
+# Benchmark: tap callback latency with logging off (level above DEBUG), on (queued to the
+# writer thread), and with a synchronous flushed file write, as the old print() was.
+def test_callback_latency_with_logging_on_and_off(tmp_path, package_logger, capture_callback):
+    logs.setup_logging("INFO", log_dir=str(tmp_path), console=False, queue_size=100_000)
+    off = callback_latency(capture_callback)
+    logs.set_log_level("DEBUG")
+    on = callback_latency(capture_callback)
+    logs.stop_logging()
+    blocking_handler = logging.FileHandler(tmp_path / "blocking.log")
+    blocking_handler.setFormatter(JsonLineFormatter())
+    package_logger.addHandler(blocking_handler)
+    try:
+        blocking = callback_latency(capture_callback)
+    finally:
+        package_logger.removeHandler(blocking_handler)
+        blocking_handler.close()
+    print(f"callback latency: off {off:.2f} us, queued {on:.2f} us, blocking {blocking:.2f} us")
+    assert off < on
+    assert on < 200
+    assert len(read_entries(tmp_path)) == 2000
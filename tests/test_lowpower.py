@@ -0,0 +1,167 @@
+# Python libraries
+import json
+import shutil
+import subprocess
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.constants import LOW_POWER_MIN_TIMER_MS
+from macos_grok_overlay.lowpower import POWER_SCRIPT, LowPowerController
+
+from .fakes import FakeClock, FakeRunLoop
+
+SUSPEND = "window.__grokPower&&window.__grokPower.suspend();"
+RESUME = "window.__grokPower&&window.__grokPower.resume();"
+
+
+# Page stand-in recording the scripts run in it.
+class FakePage:
+    def __init__(self):
+        self.scripts = []
+
+    def run_script(self, source):
+        self.scripts.append(source)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(0.0)
+
+
+@pytest.fixture
+def run_loop(clock):
+    return FakeRunLoop(clock)
+
+
+@pytest.fixture
+def page():
+    return FakePage()
+
+
+@pytest.fixture
+def low_power(page, run_loop, clock):
+    return LowPowerController(page.run_script, run_loop.call_later, grace=5.0, clock=clock)
+
+
+def test_suspends_after_the_grace_period(low_power, page, run_loop, clock):
+    low_power.hide()
+    assert page.scripts == []
+    assert run_loop.delays == [5.0]
+    run_loop.run()
+    assert clock() == 5.0
+    assert page.scripts == [SUSPEND]
+    clock.advance(60.0)
+    low_power.show()
+    assert page.scripts == [SUSPEND, RESUME]
+    stats = low_power.stats()
+    assert (stats["suspended"], stats["suspensions"], stats["suspended_sec"]) == (False, 1, 60.0)
+
+
+def test_quick_hide_and_show_does_not_suspend(low_power, page, run_loop, clock):
+    low_power.hide()
+    clock.advance(1.0)
+    low_power.show()
+    run_loop.run()
+    assert page.scripts == []
+
+
+# Only the grace period of the latest hide counts.
+def test_hide_show_hide_waits_for_the_latest_grace_period(low_power, page, run_loop, clock):
+    low_power.hide()
+    clock.advance(3.0)
+    low_power.show()
+    low_power.hide()
+    run_loop.turn()
+    assert clock() == 5.0
+    assert page.scripts == []
+    run_loop.turn()
+    assert clock() == 8.0
+    assert page.scripts == [SUSPEND]
+
+
+def test_no_grace_period_suspends_right_away(page, run_loop, clock):
+    low_power = LowPowerController(page.run_script, run_loop.call_later, grace=0, clock=clock)
+    low_power.hide()
+    low_power.hide()
+    assert page.scripts == [SUSPEND]
+    assert run_loop.calls == []
+
+
+def test_suspended_time_counts_while_still_suspended(low_power, run_loop, clock):
+    low_power.hide()
+    run_loop.run()
+    clock.advance(30.0)
+    assert low_power.stats()["suspended_sec"] == 30.0
+
+
+# A reloaded page starts out active, and is suspended again if the overlay is hidden.
+def test_page_reset_while_hidden(low_power, page, run_loop, clock):
+    low_power.hide()
+    run_loop.run()
+    clock.advance(10.0)
+    low_power.page_reset()
+    assert not low_power.suspended
+    assert low_power.stats()["suspended_sec"] == 10.0
+    run_loop.run()
+    assert page.scripts == [SUSPEND, SUSPEND]
+    low_power.show()
+    assert page.scripts == [SUSPEND, SUSPEND, RESUME]
+
+
+def test_page_stats_estimate_the_cpu_saved(low_power):
+    # 50 ms of callbacks per second while active, 30 s suspended with 100 ms of callbacks.
+    assert low_power.handle_page_stats({
+        "active_ms": 10000, "active_busy_ms": 500, "suspended_ms": 30000, "suspended_busy_ms": 100,
+        "timers_throttled": 4, "frames_held": 12, "media_paused": 1,
+    })
+    stats = low_power.stats()
+    assert stats["estimated_cpu_saved_ms"] == 1400.0
+    assert (stats["timers_throttled"], stats["frames_held"], stats["media_paused"]) == (4, 12, 1)
+    # Never negative, and an idle page saves nothing.
+    assert low_power.handle_page_stats({"active_ms": 0, "suspended_ms": 1000, "suspended_busy_ms": 5})
+    assert low_power.stats()["estimated_cpu_saved_ms"] == 1400.0
+
+
+@pytest.mark.parametrize("data", [None, "stats", {"active_ms": "soon"}, {"timers_throttled": [1]}])
+def test_bad_page_stats_are_dropped(low_power, data):
+    assert low_power.handle_page_stats(data) is False
+    assert low_power.stats()["estimated_cpu_saved_ms"] == 0.0
+
+
+# Run POWER_SCRIPT in node with a minimal window: while suspended, short timers are
+# stretched and animation frames held, and resuming reports the stats on the bridge.
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_power_script_throttles_and_reports():
+    harness = """
+        const delays=[]; const frames=[]; const emitted=[]; const events=[];
+        global.window={
+            setTimeout:function(fn,delay){delays.push(delay);return 1;},
+            setInterval:function(fn,delay){delays.push(delay);return 2;},
+            clearTimeout:function(){}, clearInterval:function(){},
+            requestAnimationFrame:function(fn){frames.push(fn);return 3;},
+            dispatchEvent:function(event){events.push(event.detail.suspended);},
+            __grokBridge:{emit:function(type,data){emitted.push([type,data]);}},
+        };
+        global.document={querySelectorAll:function(){return [];}};
+        eval(__SCRIPT__);
+        window.setTimeout(function(){},10);
+        window.setInterval(function(){},100);
+        window.__grokPower.suspend();
+        window.setTimeout(function(){},10);
+        window.setTimeout(function(){},60000);
+        window.requestAnimationFrame(function(){});
+        const framesWhileSuspended=frames.length;
+        window.__grokPower.resume();
+        console.log(JSON.stringify({delays:delays,framesWhileSuspended:framesWhileSuspended,frames:frames.length,events:events,emitted:emitted}));
+    """.replace("__SCRIPT__", json.dumps(POWER_SCRIPT))
+    result = subprocess.run(["node", "-e", harness], capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+    output = json.loads(result.stdout)
+    # The interval is re-registered at the minimum delay on suspend, and at its own on resume.
+    assert output["delays"] == [10, 100, LOW_POWER_MIN_TIMER_MS, LOW_POWER_MIN_TIMER_MS, 60000, 100]
+    assert (output["framesWhileSuspended"], output["frames"]) == (0, 1)
+    assert output["events"] == [True, False]
+    [(event_type, stats)] = output["emitted"]
+    assert event_type == "power-stats"
+    assert (stats["timers_throttled"], stats["frames_held"], stats["media_paused"]) == (2, 1, 0)
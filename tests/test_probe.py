@@ -0,0 +1,123 @@
+# Python libraries
+import sys
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.probe import PROBE_FLAG, Backoff, SleepWaiter, subprocess_trust_oracle, wait_for_trust
+
+from .fakes import FakeClock
+
+
+# Trust oracle that grants trust on its `trusted_on`-th call (never if None).
+class FakeOracle:
+    def __init__(self, trusted_on=None):
+        self.trusted_on = trusted_on
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return (self.trusted_on is not None) and (self.calls >= self.trusted_on)
+
+
+# Waiter that advances the fake clock, and wakes early at the given times (as an
+# Accessibility change notification would).
+class FakeWaiter:
+    def __init__(self, clock, notify_at=()):
+        self.clock = clock
+        self.notify_at = sorted(notify_at)
+        self.waits = []
+        self.closed = False
+
+    def wait(self, timeout):
+        self.waits.append(round(timeout, 6))
+        end = self.clock() + timeout
+        if self.notify_at and (self.notify_at[0] <= end):
+            self.clock.now = max(self.clock(), self.notify_at.pop(0))
+            return True
+        self.clock.now = end
+        return False
+
+    def close(self):
+        self.closed = True
+
+
+def no_jitter_backoff(**kwargs):
+    return Backoff(initial=0.5, maximum=8.0, jitter=0.2, random=lambda: 0.5, **kwargs)
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    backoff = no_jitter_backoff()
+    assert [backoff.next_delay() for _ in range(7)] == [0.5, 1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+    backoff.reset()
+    assert backoff.next_delay() == 0.5
+
+
+@pytest.mark.parametrize("random_value, expected", [(0.0, 0.4), (1.0, 0.6)])
+def test_backoff_jitter_bounds(random_value, expected):
+    backoff = Backoff(initial=0.5, jitter=0.2, random=lambda: random_value)
+    assert backoff.next_delay() == pytest.approx(expected)
+
+
+def test_trusted_right_away_does_not_wait():
+    clock = FakeClock(0.0)
+    waiter = FakeWaiter(clock)
+    assert wait_for_trust(FakeOracle(1), backoff=no_jitter_backoff(), waiter=waiter, clock=clock)
+    assert waiter.waits == []
+    assert waiter.closed
+
+
+def test_polls_with_backoff_until_trusted():
+    clock = FakeClock(0.0)
+    oracle = FakeOracle(4)
+    waiter = FakeWaiter(clock)
+    assert wait_for_trust(oracle, max_wait_sec=60, backoff=no_jitter_backoff(), waiter=waiter, clock=clock)
+    assert oracle.calls == 4
+    assert waiter.waits == [0.5, 1.0, 2.0]
+    assert clock() == 3.5
+
+
+def test_gives_up_at_the_deadline():
+    clock = FakeClock(0.0)
+    oracle = FakeOracle(None)
+    waiter = FakeWaiter(clock)
+    assert not wait_for_trust(oracle, max_wait_sec=10, backoff=no_jitter_backoff(), waiter=waiter, clock=clock)
+    # The last wait is cut short to end at the deadline, then the oracle is asked once more.
+    assert waiter.waits == [0.5, 1.0, 2.0, 4.0, 2.5]
+    assert clock() == 10.0
+    assert oracle.calls == 6
+    assert waiter.closed
+
+
+def test_notification_probes_early_and_restarts_backoff():
+    clock = FakeClock(0.0)
+    oracle = FakeOracle(None)
+    waiter = FakeWaiter(clock, notify_at=[1.2])
+    assert not wait_for_trust(oracle, max_wait_sec=4, backoff=no_jitter_backoff(), waiter=waiter, clock=clock)
+    # Woken at 1.2 s (during the 1.0 s wait), probes right away and starts over at 0.5 s.
+    assert waiter.waits == [0.5, 1.0, 0.5, 1.0, 1.3]
+    assert oracle.calls == 6
+
+
+def test_waiter_is_closed_when_the_oracle_fails():
+    clock = FakeClock(0.0)
+    waiter = FakeWaiter(clock)
+    def oracle():
+        raise OSError("no such executable")
+    with pytest.raises(OSError):
+        wait_for_trust(oracle, waiter=waiter, clock=clock)
+    assert waiter.closed
+
+
+def test_sleep_waiter():
+    slept = []
+    waiter = SleepWaiter(slept.append)
+    assert waiter.wait(1.5) is False
+    assert slept == [1.5]
+
+
+# The subprocess oracle runs the program with the probe flag and checks its exit code.
+def test_subprocess_trust_oracle():
+    program = [sys.executable, "-c", f"import sys; sys.exit(0 if {PROBE_FLAG!r} in sys.argv else 2)"]
+    assert subprocess_trust_oracle(program)() is True
+    assert subprocess_trust_oracle([sys.executable, "-c", "import sys; sys.exit(1)"])() is False
@@ -0,0 +1,276 @@
+# Python libraries
+import ctypes
+import ctypes.util
+import logging
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.reclaim import (
+    PRESSURE_CRITICAL,
+    PRESSURE_NORMAL,
+    PRESSURE_WARNING,
+    RUSAGE_INFO_V2,
+    MemoryMonitor,
+    WebContentReclaimer,
+)
+
+from .fakes import FakeClock
+
+MB = 2**20
+
+
+# Shared library stand-in, with only the given functions.
+class FakeLibrary:
+    def __init__(self, name, **functions):
+        self.name = name
+        self.__dict__.update(functions)
+
+
+# proc_pid_rusage stand-in filling in the footprint of the structure it is given.
+def fake_proc_pid_rusage(pid, flavor, info):
+    if (pid != 4242) or (flavor != RUSAGE_INFO_V2):
+        return -1
+    info._obj.ri_phys_footprint = 300 * MB
+    return 0
+
+
+# Load the given libraries (by name) instead of the system ones: a library missing from
+# `libraries` is not found, and one mapped to an exception fails to load.
+@pytest.fixture
+def libraries(monkeypatch):
+    libraries = {}
+    loaded = []
+    def find_library(name):
+        return f"lib{name}.dylib" if name in libraries else None
+    def load(path):
+        loaded.append(path)
+        library = libraries[path[3:-6]]
+        if isinstance(library, Exception):
+            raise library
+        return library
+    monkeypatch.setattr(ctypes.util, "find_library", find_library)
+    monkeypatch.setattr(ctypes, "CDLL", load)
+    libraries["loaded"] = loaded
+    return libraries
+
+
+# proc_pid_rusage is part of libSystem (found as libc) on macOS.
+def test_monitor_uses_libc_for_the_footprint(libraries):
+    libraries["c"] = FakeLibrary("c", proc_pid_rusage=fake_proc_pid_rusage)
+    monitor = MemoryMonitor()
+    assert monitor.libproc is monitor.libc
+    assert libraries["loaded"] == ["libc.dylib"]
+    assert monitor.process_footprint(4242) == 300 * MB
+    assert monitor.process_footprint(1) is None
+    assert monitor.process_footprint(None) is None
+
+
+def test_monitor_falls_back_to_a_separate_libproc(libraries):
+    libraries["c"] = FakeLibrary("c")
+    libraries["proc"] = FakeLibrary("proc", proc_pid_rusage=fake_proc_pid_rusage)
+    monitor = MemoryMonitor()
+    assert (monitor.libc.name, monitor.libproc.name) == ("c", "proc")
+    assert monitor.process_footprint(4242) == 300 * MB
+    # Without sysctlbyname, the pressure level is unknown.
+    assert monitor.pressure_level() is None
+
+
+# A libc that fails to load does not prevent finding libproc, and the reverse.
+def test_monitor_lookups_fail_separately(libraries):
+    libraries["c"] = OSError("no libc")
+    libraries["proc"] = FakeLibrary("proc", proc_pid_rusage=fake_proc_pid_rusage)
+    monitor = MemoryMonitor()
+    assert monitor.libc is None
+    assert monitor.pressure_level() is None
+    assert monitor.process_footprint(4242) == 300 * MB
+    libraries["c"] = FakeLibrary("c")
+    libraries["proc"] = OSError("no libproc")
+    monitor = MemoryMonitor()
+    assert (monitor.libc.name, monitor.libproc) == ("c", None)
+    assert monitor.process_footprint(4242) is None
+
+
+# Memory monitor stand-in with a settable pressure level and process footprint.
+class FakeMonitor:
+    def __init__(self, level=PRESSURE_NORMAL, footprint=300 * MB):
+        self.level = level
+        self.footprint = footprint
+        self.footprint_pids = []
+
+    def pressure_level(self):
+        return self.level
+
+    def process_footprint(self, pid):
+        self.footprint_pids.append(pid)
+        return self.footprint
+
+
+# Page stand-in: tearing the webview down completes only when `finish_teardown` is
+# called, as the real teardown waits for the snapshot and the saved state.
+class FakePage:
+    def __init__(self, pid=4242):
+        self.pid = pid
+        self.teardowns = []
+
+    def webContentProcessIdentifier(self):
+        return self.pid
+
+    def reclaimWebView(self, done):
+        self.teardowns.append(done)
+
+    def finish_teardown(self, torn_down=True):
+        self.teardowns.pop(0)(torn_down)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(0.0)
+
+
+@pytest.fixture
+def monitor():
+    return FakeMonitor()
+
+
+@pytest.fixture
+def page():
+    return FakePage()
+
+
+@pytest.fixture
+def reclaimer(page, monitor, clock):
+    return WebContentReclaimer(page, monitor, hidden_after=1800.0, clock=clock)
+
+
+def test_reclaims_after_being_hidden_long_enough(reclaimer, page, monitor, clock):
+    reclaimer.hidden()
+    clock.advance(1799.0)
+    assert reclaimer.check() is None
+    clock.advance(1.0)
+    assert reclaimer.check() == "idle"
+    assert monitor.footprint_pids == [4242]
+    page.finish_teardown()
+    stats = reclaimer.stats()
+    assert (stats["reclaimed"], stats["pending"], stats["reclaims"], stats["bytes_reclaimed"]) == (True, None, {"idle": 1}, 300 * MB)
+
+
+@pytest.mark.parametrize("level, expected", [
+    (PRESSURE_NORMAL, None),
+    (PRESSURE_WARNING, "memory-pressure"),
+    (PRESSURE_CRITICAL, "memory-pressure"),
+    (None, None),
+])
+def test_reclaims_under_memory_pressure(reclaimer, monitor, clock, level, expected):
+    monitor.level = level
+    reclaimer.hidden()
+    clock.advance(1.0)
+    assert reclaimer.check() == expected
+
+
+def test_pressure_and_idle_can_be_disabled(page, monitor, clock):
+    monitor.level = PRESSURE_CRITICAL
+    reclaimer = WebContentReclaimer(page, monitor, hidden_after=0, pressure_level=None, clock=clock)
+    reclaimer.hidden()
+    clock.advance(10**6)
+    assert reclaimer.check() is None
+    assert page.teardowns == []
+
+
+def test_no_reclaim_while_shown(reclaimer, page, monitor, clock):
+    monitor.level = PRESSURE_CRITICAL
+    clock.advance(10**6)
+    assert reclaimer.check() is None
+    reclaimer.hidden()
+    clock.advance(1800.0)
+    reclaimer.shown()
+    assert reclaimer.check() is None
+    assert page.teardowns == []
+
+
+def test_no_second_reclaim_while_pending_or_reclaimed(reclaimer, page, clock):
+    reclaimer.hidden()
+    clock.advance(1800.0)
+    assert reclaimer.check() == "idle"
+    assert reclaimer.stats()["pending"] == "idle"
+    assert reclaimer.check() is None
+    assert reclaimer.reclaim("memory-pressure") is False
+    page.finish_teardown()
+    clock.advance(1800.0)
+    assert reclaimer.check() is None
+    assert reclaimer.reclaim("idle") is False
+    assert len(page.teardowns) == 0
+    assert reclaimer.stats()["reclaims"] == {"idle": 1}
+
+
+# Shown while the page is being torn down: the teardown gives up and nothing is counted.
+def test_teardown_abandoned_when_shown(reclaimer, page, clock):
+    reclaimer.hidden()
+    clock.advance(1800.0)
+    reclaimer.check()
+    assert reclaimer.still_hidden()
+    assert reclaimer.shown() is False
+    assert not reclaimer.still_hidden()
+    page.finish_teardown(torn_down=False)
+    stats = reclaimer.stats()
+    assert (stats["reclaimed"], stats["pending"], stats["reclaims"], stats["bytes_reclaimed"]) == (False, None, {}, 0)
+    assert reclaimer.restored() is None
+    # The next hide starts over.
+    reclaimer.hidden()
+    clock.advance(1800.0)
+    assert reclaimer.check() == "idle"
+
+
+# Shown after the teardown got past the point of giving up: the restore starts then.
+def test_shown_while_the_teardown_completes(reclaimer, page, clock, caplog):
+    reclaimer.hidden()
+    clock.advance(1800.0)
+    reclaimer.check()
+    reclaimer.shown()
+    clock.advance(0.5)
+    page.finish_teardown()
+    assert reclaimer.reclaimed
+    clock.advance(0.25)
+    with caplog.at_level(logging.INFO, logger="macos_grok_overlay"):
+        assert reclaimer.restored() == 250.0
+
+
+def test_bytes_reclaimed_accumulate_and_unknown_footprints_count_nothing(reclaimer, page, monitor, clock, caplog):
+    with caplog.at_level(logging.INFO, logger="macos_grok_overlay"):
+        for footprint in (300 * MB, None, 0, 100 * MB):
+            monitor.footprint = footprint
+            reclaimer.hidden()
+            clock.advance(1800.0)
+            reclaimer.check()
+            page.finish_teardown()
+            reclaimer.shown()
+            reclaimer.restored()
+    assert reclaimer.stats()["bytes_reclaimed"] == 400 * MB
+    assert reclaimer.stats()["reclaims"] == {"idle": 4}
+    messages = [record.getMessage() for record in caplog.records if record.getMessage().startswith("Reclaimed")]
+    assert messages[0] == "Reclaimed the hidden page (idle), freeing 300.0 MB."
+    assert messages[1] == "Reclaimed the hidden page (idle), freeing an unknown amount."
+    assert [record.bytes_reclaimed for record in caplog.records if hasattr(record, "bytes_reclaimed")] == [300 * MB, None, 0, 100 * MB]
+
+
+# The restore latency runs from the summon to the recreated page having loaded.
+def test_restore_latency_is_logged(reclaimer, page, clock, caplog):
+    reclaimer.hidden()
+    clock.advance(1800.0)
+    reclaimer.check()
+    page.finish_teardown()
+    clock.advance(60.0)
+    assert reclaimer.shown() is True
+    # Showing again before the page has loaded keeps the first start.
+    clock.advance(0.4)
+    reclaimer.shown()
+    clock.advance(0.8)
+    with caplog.at_level(logging.INFO, logger="macos_grok_overlay"):
+        assert reclaimer.restored() == 1200.0
+    [record] = [record for record in caplog.records if hasattr(record, "restore_latency_ms")]
+    assert (record.getMessage(), record.restore_latency_ms) == ("Restored the reclaimed page in 1200.0 ms.", 1200.0)
+    stats = reclaimer.stats()
+    assert (stats["reclaimed"], stats["restore_latencies_ms"]) == (False, [1200.0])
+    # A page load that is not a restore is not timed.
+    assert reclaimer.restored() is None
+    assert reclaimer.shown() is False
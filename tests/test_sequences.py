@@ -0,0 +1,193 @@
+# Python libraries
+import json
+import random
+import time
+
+import pytest
+
+# Local libraries
+from . import pyobjc_stubs
+
+pyobjc_stubs.install()
+
+from macos_grok_overlay import listener
+from macos_grok_overlay.constants import LAUNCHER_TRIGGER, SEQUENCE_TRIGGERS, TRIGGER_BINDINGS
+from macos_grok_overlay.hotkeys import SEQUENCE_MATCHER
+from macos_grok_overlay.sequences import MODIFIER_KEY, SequenceMatcher
+
+OPTION, CONTROL = 1 << 19, 1 << 18
+K, G = 40, 5
+
+
+def feed_all(matcher, events):
+    return [matcher.feed(timestamp, flags, keycode) for timestamp, flags, keycode in events]
+
+
+def test_double_tap_within_window():
+    matcher = SequenceMatcher(window=0.4)
+    matcher.compile([([(OPTION, None), (OPTION, None)], "toggle")])
+    assert matcher.active
+    assert feed_all(matcher, [(1.0, OPTION, MODIFIER_KEY), (1.3, OPTION, MODIFIER_KEY)]) == [None, "toggle"]
+    assert matcher.matches == 1
+
+
+def test_window_expiry():
+    matcher = SequenceMatcher(window=0.4)
+    matcher.compile([([(OPTION, None), (OPTION, None)], "toggle")])
+    # Too slow: the second tap starts a new attempt, which the third tap completes.
+    assert feed_all(matcher, [
+        (1.0, OPTION, MODIFIER_KEY),
+        (1.5, OPTION, MODIFIER_KEY),
+        (1.8, OPTION, MODIFIER_KEY),
+    ]) == [None, None, "toggle"]
+
+
+def test_window_is_measured_from_the_first_step():
+    matcher = SequenceMatcher(window=0.5)
+    matcher.compile([([(CONTROL, K), (CONTROL, G), (CONTROL, K)], "home")])
+    # Each gap is within the window, but the whole sequence is not.
+    assert feed_all(matcher, [(0.0, CONTROL, K), (0.3, CONTROL, G), (0.6, CONTROL, K)]) == [None, None, None]
+    assert feed_all(matcher, [(0.8, CONTROL, G), (1.0, CONTROL, K)]) == [None, "home"]
+
+
+def test_expired_match_keeps_a_recent_suffix():
+    matcher = SequenceMatcher(window=0.5)
+    matcher.compile([([(CONTROL, K), (CONTROL, K), (CONTROL, G)], "home")])
+    # The first K expires, but the second one (still recent) starts the match.
+    assert feed_all(matcher, [(0.0, CONTROL, K), (0.4, CONTROL, K), (0.7, CONTROL, K), (0.8, CONTROL, G)]) == [None, None, None, "home"]
+
+
+def test_prefix_overlap():
+    matcher = SequenceMatcher(window=1.0)
+    matcher.compile([([(CONTROL, K), (CONTROL, K), (CONTROL, G)], "home")])
+    # "K K K G": the mismatch after "K K" continues from the last "K K".
+    assert feed_all(matcher, [(0.0, CONTROL, K), (0.1, CONTROL, K), (0.2, CONTROL, K), (0.3, CONTROL, G)]) == [None, None, None, "home"]
+
+
+def test_overlapping_sequences():
+    matcher = SequenceMatcher(window=1.0)
+    matcher.compile([
+        ([(CONTROL, K), (CONTROL, G)], "home"),
+        ([(CONTROL, G), (CONTROL, G)], "reload"),
+    ])
+    assert feed_all(matcher, [(0.0, CONTROL, K), (0.1, CONTROL, G)]) == [None, "home"]
+    # A broken-off "K" does not keep the following "G G" from matching.
+    assert feed_all(matcher, [(0.2, CONTROL, K), (0.3, CONTROL, 1), (0.4, CONTROL, G), (0.5, CONTROL, G)]) == [None, None, None, "reload"]
+
+
+def test_sequence_ending_in_another_sequence():
+    matcher = SequenceMatcher(window=1.0)
+    matcher.compile([
+        ([(CONTROL, K), (CONTROL, 1), (CONTROL, 2)], "home"),
+        ([(CONTROL, 1), (CONTROL, 3)], "reload"),
+    ])
+    assert feed_all(matcher, [(0.0, CONTROL, K), (0.1, CONTROL, 1), (0.2, CONTROL, 3)]) == [None, None, "reload"]
+
+
+def test_unmatched_keys_reset():
+    matcher = SequenceMatcher(window=1.0)
+    matcher.compile([([(CONTROL, K), (CONTROL, G)], "home")])
+    assert feed_all(matcher, [(0.0, CONTROL, K), (0.1, 0, 12), (0.2, CONTROL, G)]) == [None, None, None]
+
+
+def test_too_long_sequences_are_ignored():
+    matcher = SequenceMatcher(window=1.0, history=2)
+    matcher.compile([([(CONTROL, K)] * 3, "home")])
+    assert not matcher.active
+
+
+def test_recompile_drops_a_partial_match():
+    matcher = SequenceMatcher(window=1.0)
+    matcher.compile([([(CONTROL, K), (CONTROL, G)], "home")])
+    matcher.feed(0.0, CONTROL, K)
+    matcher.compile([([(CONTROL, G)], "reload")])
+    assert matcher.feed(0.1, CONTROL, G) == "reload"
+
+
+def test_history_is_a_ring_buffer():
+    matcher = SequenceMatcher(window=1.0, history=3)
+    feed_all(matcher, [(float(t), 0, t) for t in range(1, 6)])
+    assert matcher.history() == [(3.0, 0, 3), (4.0, 0, 4), (5.0, 0, 5)]
+
+
+@pytest.fixture
+def trigger_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(listener, "TRIGGER_FILE", tmp_path / "custom_trigger.json")
+    monkeypatch.setattr(SEQUENCE_MATCHER, "window", SEQUENCE_MATCHER.window)
+    monkeypatch.setitem(LAUNCHER_TRIGGER, "flags", LAUNCHER_TRIGGER["flags"])
+    monkeypatch.setitem(LAUNCHER_TRIGGER, "key", LAUNCHER_TRIGGER["key"])
+    for action in TRIGGER_BINDINGS:
+        monkeypatch.setitem(TRIGGER_BINDINGS, action, dict(TRIGGER_BINDINGS[action]))
+    sequences = list(SEQUENCE_TRIGGERS)
+    yield tmp_path / "custom_trigger.json"
+    SEQUENCE_TRIGGERS[:] = sequences
+
+
+def test_custom_trigger_round_trip(trigger_file):
+    double_tap = {"action": "toggle", "steps": [{"flags": OPTION, "key": None}, {"flags": OPTION, "key": None}]}
+    LAUNCHER_TRIGGER.update(flags=CONTROL, key=49)
+    TRIGGER_BINDINGS["home"].update(flags=CONTROL, key=4)
+    SEQUENCE_TRIGGERS[:] = [double_tap]
+    SEQUENCE_MATCHER.window = 0.3
+    listener.save_custom_launcher_trigger()
+    saved = json.loads(trigger_file.read_text())
+    assert saved["sequences"] == [double_tap]
+    # Change everything, then load it back.
+    LAUNCHER_TRIGGER.update(flags=OPTION, key=50)
+    TRIGGER_BINDINGS["home"].update(flags=None, key=None)
+    SEQUENCE_TRIGGERS[:] = []
+    SEQUENCE_MATCHER.window = 1.0
+    listener.load_custom_launcher_trigger()
+    assert LAUNCHER_TRIGGER == {"flags": CONTROL, "key": 49}
+    assert TRIGGER_BINDINGS["home"] == {"flags": CONTROL, "key": 4}
+    assert SEQUENCE_TRIGGERS == [double_tap]
+    assert SEQUENCE_MATCHER.window == 0.3
+
+
+def test_custom_trigger_ignores_unknown_actions(trigger_file):
+    trigger_file.write_text(json.dumps({
+        "flags": CONTROL, "key": 49,
+        "bindings": {"explode": {"flags": CONTROL, "key": 1}},
+        "sequences": [{"action": "explode", "steps": [{"flags": OPTION, "key": None}]}],
+    }))
+    listener.load_custom_launcher_trigger()
+    assert LAUNCHER_TRIGGER == {"flags": CONTROL, "key": 49}
+    assert "explode" not in TRIGGER_BINDINGS
+    assert SEQUENCE_TRIGGERS == []
+
+
+def test_malformed_custom_trigger_is_ignored(trigger_file):
+    trigger_file.write_text(json.dumps({"flags": CONTROL}))
+    before = dict(LAUNCHER_TRIGGER)
+    listener.load_custom_launcher_trigger()
+    assert LAUNCHER_TRIGGER == before
+
+
+# Replay benchmark: a long recording of typing (with some sequences in it) fed through
+# the matcher, which should cost about the same per event however many sequences exist.
+def test_replay_benchmark():
+    rng = random.Random(0)
+    events, timestamp = [], 0.0
+    for _ in range(20_000):
+        timestamp += rng.uniform(0.02, 0.3)
+        if rng.random() < 0.05:
+            events.append((timestamp, OPTION, MODIFIER_KEY))
+        else:
+            events.append((timestamp, rng.choice((0, 0, 0, CONTROL)), rng.randrange(0, 50)))
+    def per_event_ns(sequence_count):
+        matcher = SequenceMatcher(window=0.4)
+        sequences = [([(OPTION, None), (OPTION, None)], "toggle")]
+        sequences += [([(CONTROL, i % 50), (CONTROL, (i * 7) % 50), (CONTROL, (i * 13) % 50)], i) for i in range(sequence_count - 1)]
+        matcher.compile(sequences)
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            for event in events:
+                matcher.feed(*event)
+            best = min(best, time.perf_counter() - start)
+        return 1e9 * best / len(events), matcher.matches
+    results = {count: per_event_ns(count) for count in (1, 10, 100)}
+    print("sequence matcher ns per event:", {count: round(ns) for count, (ns, matches) in results.items()})
+    assert all(matches > 0 for ns, matches in results.values())
+    costs = [ns for ns, matches in results.values()]
+    assert max(costs) < 3 * min(costs), results
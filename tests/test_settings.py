@@ -0,0 +1,85 @@
+# Python libraries
+import json
+import logging
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.constants import DEFAULT_SETTINGS, RECLAIM_AFTER_HIDDEN_MAX_MIN
+from macos_grok_overlay.settings import SETTING_VALIDATORS, load_settings, save_settings
+
+
+def write_settings(tmp_path, data):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps(data) if not isinstance(data, str) else data)
+    return path
+
+
+def test_every_setting_has_a_validator_accepting_its_default():
+    assert set(SETTING_VALIDATORS) == set(DEFAULT_SETTINGS)
+    for key, validate in SETTING_VALIDATORS.items():
+        assert validate(DEFAULT_SETTINGS[key]) == DEFAULT_SETTINGS[key]
+
+
+def test_missing_file_gives_the_defaults(tmp_path):
+    assert load_settings(tmp_path / "missing.json") == DEFAULT_SETTINGS
+
+
+def test_valid_settings_are_kept(tmp_path):
+    data = {
+        "warmth": "hot", "low_power": False, "reclaim_after_hidden_min": 2.5, "log_level": "debug",
+        "internal_link_patterns": ["*.example.com"], "download_folder": "~/Desktop", "unknown": 1,
+    }
+    settings = load_settings(write_settings(tmp_path, data))
+    assert settings == dict(DEFAULT_SETTINGS, **{key: value for key, value in data.items() if key != "unknown"})
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / "settings.json"
+    settings = dict(DEFAULT_SETTINGS, warmth="lazy", reclaim_after_hidden_min=0)
+    save_settings(dict(settings, unknown=True), path)
+    assert load_settings(path) == settings
+
+
+@pytest.mark.parametrize("key, value", [
+    ("reclaim_after_hidden_min", "30"),
+    ("reclaim_after_hidden_min", None),
+    ("reclaim_after_hidden_min", True),
+    ("warmth", "scorching"),
+    ("warmth", 1),
+    ("low_power", "yes"),
+    ("low_power", 1),
+    ("reclaim_on_memory_pressure", None),
+    ("content_blocking", "false"),
+    ("tap_thread", 0),
+    ("log_level", "LOUD"),
+    ("log_level", 10),
+    ("hotkey_backend", None),
+    ("internal_link_patterns", "*.example.com"),
+    ("external_link_patterns", [1, 2]),
+    ("download_folder", ["~/Downloads"]),
+])
+def test_invalid_values_fall_back_to_the_default(tmp_path, caplog, key, value):
+    with caplog.at_level(logging.WARNING, logger="macos_grok_overlay"):
+        settings = load_settings(write_settings(tmp_path, {key: value}))
+    assert settings[key] == DEFAULT_SETTINGS[key]
+    assert [record.getMessage().split(" in ")[0] for record in caplog.records] == [f"Ignoring setting {key}={value!r}"]
+
+
+@pytest.mark.parametrize("value, expected", [(-5, 0), (10**9, RECLAIM_AFTER_HIDDEN_MAX_MIN), (0, 0), (45, 45)])
+def test_reclaim_delay_is_clamped(tmp_path, caplog, value, expected):
+    with caplog.at_level(logging.WARNING, logger="macos_grok_overlay"):
+        settings = load_settings(write_settings(tmp_path, {"reclaim_after_hidden_min": value}))
+    assert settings["reclaim_after_hidden_min"] == expected
+    assert len(caplog.records) == int(value != expected)
+
+
+# The other keys of a file are kept when one of them is invalid.
+def test_one_invalid_value_does_not_discard_the_others(tmp_path):
+    settings = load_settings(write_settings(tmp_path, {"warmth": "lazy", "reclaim_after_hidden_min": "soon", "low_power": False}))
+    assert (settings["warmth"], settings["reclaim_after_hidden_min"], settings["low_power"]) == ("lazy", 30, False)
+
+
+@pytest.mark.parametrize("contents", ["{", "[1, 2]", "null"])
+def test_unreadable_file_gives_the_defaults(tmp_path, contents):
+    assert load_settings(write_settings(tmp_path, contents)) == DEFAULT_SETTINGS
@@ -0,0 +1,146 @@
+# Python libraries
+import contextlib
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.startup import PRIORITY_HIGH, PRIORITY_IDLE, PRIORITY_NORMAL, StartupScheduler
+
+from .fakes import FakeClock, FakeRunLoop
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(0.0)
+
+
+@pytest.fixture
+def run_loop(clock):
+    return FakeRunLoop(clock)
+
+
+# A task that takes `seconds` of (fake) time and records that it ran.
+def work(log, name, clock, seconds=0.01):
+    def task():
+        log.append(name)
+        clock.advance(seconds)
+    return task
+
+
+def test_tasks_run_after_their_dependencies(clock, run_loop):
+    log = []
+    scheduler = StartupScheduler(run_loop, clock)
+    scheduler.add("menus", work(log, "menus", clock), PRIORITY_IDLE, after=["first-paint"])
+    scheduler.add("load-website", work(log, "load-website", clock), PRIORITY_HIGH, after=["webview"])
+    scheduler.add("webview", work(log, "webview", clock))
+    scheduler.start()
+    run_loop.run()
+    assert log == ["webview", "load-website"]
+    assert scheduler.pending() == ["menus"]
+    scheduler.mark("first-paint")
+    run_loop.run()
+    assert log == ["webview", "load-website", "menus"]
+    assert scheduler.pending() == []
+
+
+def test_ready_tasks_run_by_priority_one_per_turn(clock, run_loop):
+    log = []
+    scheduler = StartupScheduler(run_loop, clock)
+    scheduler.add("idle", work(log, "idle", clock), PRIORITY_IDLE)
+    scheduler.add("normal", work(log, "normal", clock), PRIORITY_NORMAL)
+    scheduler.add("high", work(log, "high", clock), PRIORITY_HIGH)
+    scheduler.add("normal-2", work(log, "normal-2", clock), PRIORITY_NORMAL)
+    # Nothing runs before the scheduler is started.
+    assert run_loop.calls == []
+    scheduler.start()
+    assert len(run_loop.calls) == 1
+    run_loop.turn()
+    assert log == ["high"]
+    assert run_loop.run() == 3
+    # Same priority runs in the order added.
+    assert log == ["high", "normal", "normal-2", "idle"]
+
+
+def test_idle_tasks_are_spaced_out(clock, run_loop):
+    scheduler = StartupScheduler(run_loop, clock, idle_delay=0.25)
+    scheduler.add("high", None, PRIORITY_HIGH)
+    scheduler.add("idle-1", None, PRIORITY_IDLE)
+    scheduler.add("idle-2", None, PRIORITY_IDLE)
+    scheduler.start()
+    run_loop.run()
+    assert run_loop.delays == [0.0, 0.25, 0.25]
+    timings = scheduler.timings()
+    assert timings["idle-1"]["start"] == 0.25
+    assert timings["idle-2"]["start"] == 0.5
+
+
+def test_timings_are_measured_with_the_clock(clock, run_loop):
+    clock.advance(5.0)
+    scheduler = StartupScheduler(run_loop, clock)
+    clock.advance(0.1)
+    scheduler.run_now("window", work([], "window", clock, 0.2))
+    scheduler.add("webview", work([], "webview", clock, 0.05), after=["window"])
+    scheduler.start()
+    run_loop.run()
+    timings = scheduler.timings()
+    assert timings["window"]["start"] == pytest.approx(0.1)
+    assert timings["window"]["duration"] == pytest.approx(0.2)
+    assert timings["webview"]["start"] == pytest.approx(0.3)
+    assert timings["webview"]["duration"] == pytest.approx(0.05)
+    assert scheduler.report() == "window 200.0 ms, webview 50.0 ms"
+
+
+def test_failed_task_is_recorded_and_dependents_still_run(clock, run_loop):
+    log = []
+    scheduler = StartupScheduler(run_loop, clock)
+    def fail():
+        raise RuntimeError("no microphone")
+    scheduler.add("microphone", fail)
+    scheduler.add("after", work(log, "after", clock), after=["microphone"])
+    scheduler.start()
+    run_loop.run()
+    assert "RuntimeError: no microphone" in scheduler.timings()["microphone"]["error"]
+    assert log == ["after"]
+
+
+def test_on_complete_is_called_once(clock, run_loop):
+    completed = []
+    scheduler = StartupScheduler(run_loop, clock, on_complete=completed.append)
+    scheduler.add("a", None)
+    scheduler.add("b", None, after=["a"])
+    scheduler.start()
+    assert completed == []
+    run_loop.run()
+    assert completed == [scheduler]
+
+
+def test_on_complete_with_nothing_to_run(clock, run_loop):
+    completed = []
+    scheduler = StartupScheduler(run_loop, clock, on_complete=completed.append)
+    scheduler.run_now("window", None)
+    scheduler.start()
+    assert completed == [scheduler]
+
+
+def test_duplicate_names_are_rejected(clock, run_loop):
+    scheduler = StartupScheduler(run_loop, clock)
+    scheduler.add("a", None)
+    with pytest.raises(ValueError):
+        scheduler.add("a", None)
+    with pytest.raises(ValueError):
+        scheduler.mark("a")
+
+
+def test_tasks_are_traced(clock, run_loop):
+    spans = []
+    class Tracer:
+        @contextlib.contextmanager
+        def span(self, name, category):
+            spans.append((name, category))
+            yield
+    scheduler = StartupScheduler(run_loop, clock, tracer=Tracer())
+    scheduler.run_now("window", None)
+    scheduler.add("webview", None)
+    scheduler.start()
+    run_loop.run()
+    assert spans == [("window", "startup-task"), ("webview", "startup-task")]
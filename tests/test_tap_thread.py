@@ -0,0 +1,100 @@
+# Python libraries
+import queue
+import threading
+import time
+
+# Local libraries
+from macos_grok_overlay.tap_thread import RunLoopThread, TriggerHandoff
+
+from .fakes import FakeClock
+
+
+def test_posts_are_coalesced_into_one_wake():
+    wakes = []
+    handoff = TriggerHandoff(lambda: wakes.append(1), FakeClock())
+    calls = []
+    for i in range(3):
+        handoff.post(calls.append, i)
+    assert len(wakes) == 1
+    assert calls == []
+    handoff.drain()
+    assert calls == [0, 1, 2]
+    handoff.post(calls.append, 3)
+    assert len(wakes) == 2
+    assert handoff.stats()["posted"] == 4
+
+
+def test_latency_is_measured_from_post_to_dispatch():
+    clock = FakeClock()
+    handoff = TriggerHandoff(lambda: None, clock)
+    handoff.post(lambda: None)
+    clock.advance(0.002)
+    handoff.post(lambda: None)
+    clock.advance(0.001)
+    handoff.drain()
+    stats = handoff.stats()
+    assert stats["dispatched"] == 2
+    assert abs(stats["max_latency_sec"] - 0.003) < 1e-9
+    assert abs(stats["mean_latency_sec"] - 0.002) < 1e-9
+
+
+def test_post_during_drain_is_not_lost():
+    wakes = []
+    handoff = TriggerHandoff(lambda: wakes.append(1), FakeClock())
+    calls = []
+    def first():
+        calls.append("first")
+        handoff.post(calls.append, "second")
+    handoff.post(first)
+    handoff.drain()
+    # Queued while draining, so run in the same pass (and a new wake was requested).
+    assert calls == ["first", "second"]
+    assert len(wakes) == 2
+
+
+# A plain Python loop standing in for a CFRunLoop: runs callables until given None.
+def python_run_loop_thread():
+    return RunLoopThread(
+        attach=queue.Queue,
+        run=lambda jobs: [job() for job in iter(jobs.get, None)],
+        stop=lambda jobs: jobs.put(None),
+        name="test-run-loop",
+    )
+
+
+def test_run_loop_thread_starts_and_stops():
+    thread = python_run_loop_thread()
+    assert thread.start()
+    assert thread.is_alive()
+    ran = threading.Event()
+    thread.handle.put(ran.set)
+    assert ran.wait(1.0)
+    assert thread.stop()
+    assert not thread.is_alive()
+
+
+# Benchmark: triggers posted on a run loop thread and dispatched by a "main thread" that
+# sleeps until woken, as the app's main run loop does.
+def test_enqueue_to_dispatch_latency():
+    woken = threading.Event()
+    handoff = TriggerHandoff(woken.set)
+    count = 500
+    dispatched = []
+    tap_thread = python_run_loop_thread()
+    tap_thread.start()
+    def produce():
+        for i in range(count):
+            handoff.post(dispatched.append, i)
+            time.sleep(0.0002)
+    tap_thread.handle.put(produce)
+    deadline = time.monotonic() + 10.0
+    while (len(dispatched) < count) and (time.monotonic() < deadline):
+        if woken.wait(0.1):
+            woken.clear()
+            handoff.drain()
+    tap_thread.stop()
+    stats = handoff.stats()
+    print("handoff latency:", {key: (round(value * 1e6, 1) if key.endswith("_sec") else value) for key, value in stats.items()}, "(us)")
+    assert dispatched == list(range(count))
+    assert stats["wakes"] <= count
+    assert stats["mean_latency_sec"] < 0.01
@@ -0,0 +1,131 @@
+# Local libraries
+from . import pyobjc_stubs
+
+pyobjc_stubs.install()
+
+from macos_grok_overlay import listener
+from macos_grok_overlay.tap_watchdog import (
+    TAP_DISABLED_BY_TIMEOUT,
+    TAP_DISABLED_BY_USER_INPUT,
+    EventTapWatchdog,
+)
+
+from .fakes import FakeClock
+
+
+# Stand-in for an event tap: macOS disables it with `disable()`, and `enable()` only
+# works while re-enabling is allowed (it is not during secure input, for example).
+class FakeTap:
+    def __init__(self):
+        self.enabled = True
+        self.can_enable = True
+        self.enable_calls = 0
+
+    def disable(self):
+        self.enabled = False
+
+    def enable(self):
+        self.enable_calls += 1
+        if self.can_enable:
+            self.enabled = True
+
+    def is_enabled(self):
+        return self.enabled
+
+
+def make_watchdog():
+    tap, clock = FakeTap(), FakeClock()
+    return tap, clock, EventTapWatchdog(tap, clock)
+
+
+def test_other_events_are_ignored():
+    tap, clock, watchdog = make_watchdog()
+    assert watchdog.handle_event(10) is False
+    assert tap.enable_calls == 0
+    assert watchdog.disable_events == 0
+
+
+def test_timeout_reenables_the_tap():
+    tap, clock, watchdog = make_watchdog()
+    tap.disable()
+    assert watchdog.handle_event(TAP_DISABLED_BY_TIMEOUT) is True
+    assert tap.enabled
+    stats = watchdog.stats()
+    assert stats["disabled_by_timeout"] == 1
+    assert stats["reenables"] == 1
+    assert stats["failed_reenables"] == 0
+    assert stats["time_disabled_sec"] == 0.0
+    assert watchdog.disabled_since is None
+
+
+def test_failed_reenable_is_retried_by_check():
+    tap, clock, watchdog = make_watchdog()
+    tap.disable()
+    tap.can_enable = False
+    watchdog.handle_event(TAP_DISABLED_BY_USER_INPUT)
+    assert watchdog.stats()["failed_reenables"] == 1
+    clock.advance(2.0)
+    # Still disabled: the time so far is reported, without ending the disabled period.
+    assert watchdog.stats()["time_disabled_sec"] == 2.0
+    assert watchdog.check() is False
+    tap.can_enable = True
+    clock.advance(3.0)
+    assert watchdog.check() is True
+    stats = watchdog.stats()
+    assert stats["disabled_by_user_input"] == 1
+    # The disabled period was already known, so the checks do not count a new disable event.
+    assert stats["disabled_detected_by_check"] == 0
+    assert stats["disable_events"] == 1
+    assert stats["failed_reenables"] == 2
+    assert stats["reenables"] == 1
+    assert stats["time_disabled_sec"] == 5.0
+
+
+def test_check_detects_a_missed_disable():
+    tap, clock, watchdog = make_watchdog()
+    assert watchdog.check() is True
+    tap.disable()
+    assert watchdog.check() is True
+    assert tap.enabled
+    stats = watchdog.stats()
+    assert stats["disabled_detected_by_check"] == 1
+    assert stats["reenables"] == 1
+
+
+def test_tap_enabled_by_someone_else_ends_disabled_period():
+    tap, clock, watchdog = make_watchdog()
+    tap.disable()
+    tap.can_enable = False
+    watchdog.handle_event(TAP_DISABLED_BY_TIMEOUT)
+    clock.advance(1.5)
+    tap.enabled = True
+    assert watchdog.check() is True
+    assert watchdog.disabled_since is None
+    assert watchdog.stats()["time_disabled_sec"] == 1.5
+    assert watchdog.stats()["reenables"] == 0
+
+
+def test_repeated_disables_accumulate():
+    tap, clock, watchdog = make_watchdog()
+    for event_type in (TAP_DISABLED_BY_TIMEOUT, TAP_DISABLED_BY_TIMEOUT, TAP_DISABLED_BY_USER_INPUT):
+        tap.disable()
+        watchdog.handle_event(event_type)
+        clock.advance(1.0)
+    stats = watchdog.stats()
+    assert stats["disabled_by_timeout"] == 2
+    assert stats["disabled_by_user_input"] == 1
+    assert stats["disable_events"] == 3
+    assert stats["reenables"] == 3
+
+
+# The tap callback passes "tap disabled" notifications to the watchdog (and the event on).
+def test_listener_forwards_disable_events(monkeypatch):
+    monkeypatch.setattr(listener, "handle_new_trigger", None)
+    tap, clock, watchdog = make_watchdog()
+    app = type("App", (), {"trigger_handoff": None, "toggleWindow_": lambda self, sender: None})()
+    callback = listener.global_show_hide_listener(app, watchdog)
+    tap.disable()
+    event = object()
+    assert callback(None, TAP_DISABLED_BY_TIMEOUT, event, None) is event
+    assert tap.enabled
+    assert watchdog.stats()["disabled_by_timeout"] == 1
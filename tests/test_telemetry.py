@@ -0,0 +1,253 @@
+# Python libraries
+import functools
+import json
+import math
+import random
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay import telemetry
+from macos_grok_overlay.telemetry import (
+    PAGE_TIMINGS_VERSION,
+    NavigationTimer,
+    PageLoadRecorder,
+    PageTimingStore,
+    QuantileSketch,
+    stats_main,
+    valid_timings,
+)
+
+from .fakes import FakeClock, FakeRunLoop
+
+QUANTILES = (0.0, 0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 1.0)
+
+
+def lognormal_sample(count, seed=0):
+    rng = random.Random(seed)
+    return [rng.lognormvariate(6.0, 1.5) for _ in range(count)]
+
+
+# The value at quantile q of sorted data, as the sketch defines it.
+def exact_quantile(ordered, q):
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+@pytest.mark.parametrize("relative_accuracy", [0.01, 0.05])
+def test_quantiles_are_within_the_relative_accuracy(relative_accuracy):
+    values = lognormal_sample(20000)
+    sketch = QuantileSketch(relative_accuracy)
+    for value in values:
+        sketch.add(value)
+    ordered = sorted(values)
+    for q in QUANTILES:
+        expected = exact_quantile(ordered, q)
+        assert sketch.quantile(q) == pytest.approx(expected, rel=relative_accuracy), q
+    assert (sketch.min, sketch.max) == (ordered[0], ordered[-1])
+    # Memory is bounded by the value range, not the number of values.
+    assert len(sketch.bins) < math.log(ordered[-1] / ordered[0]) / math.log(sketch.gamma) + 2
+
+
+def test_small_and_out_of_range_values():
+    sketch = QuantileSketch(min_value=0.1, max_value=1000)
+    for value in (0.0, 0.05, 5.0, 10**6, float("nan"), float("inf")):
+        sketch.add(value)
+    assert sketch.count == 4
+    assert sketch.quantile(0.0) == 0.0
+    # Values above max_value are counted in the last bucket.
+    assert sketch.quantile(1.0) == pytest.approx(1000, rel=0.01)
+    assert sketch.max == 10**6
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_decay_halves_the_weight_of_older_values():
+    sketch = QuantileSketch()
+    for _ in range(100):
+        sketch.add(10.0)
+    sketch.decay(0.5)
+    assert sketch.count == pytest.approx(50.0)
+    # 60 new values now outweigh the 100 older ones.
+    for _ in range(60):
+        sketch.add(1000.0)
+    assert sketch.quantile(0.5) == pytest.approx(1000.0, rel=0.01)
+    # Counts that decay to almost nothing are dropped.
+    for _ in range(20):
+        sketch.decay(0.5)
+    assert sketch.bins == {}
+    assert sketch.count == 0
+
+
+# Once old extremes have faded out, they no longer bound the quantiles (or min and max).
+def test_decay_forgets_faded_out_extremes():
+    sketch = QuantileSketch()
+    sketch.add(5.0)
+    sketch.add(90000.0)
+    for _ in range(8):
+        sketch.decay(0.5)
+    for _ in range(100):
+        sketch.add(200.0)
+        sketch.add(400.0)
+    assert sketch.min == pytest.approx(200.0, rel=0.02)
+    assert sketch.max == pytest.approx(400.0, rel=0.02)
+    assert sketch.quantile(0.0) == pytest.approx(200.0, rel=0.01)
+    assert sketch.quantile(1.0) == pytest.approx(400.0, rel=0.01)
+    # Bounds stay exact while the extremes are still counted.
+    sketch.add(1000.0)
+    sketch.decay(0.5)
+    assert sketch.max == 1000.0
+    for _ in range(20):
+        sketch.decay(0.5)
+    assert (sketch.count, sketch.min, sketch.max) == (0, None, None)
+
+def test_to_dict_from_dict_round_trip():
+    sketch = QuantileSketch()
+    for value in lognormal_sample(1000) + [0.01, 0.02]:
+        sketch.add(value)
+    sketch.decay(0.7)
+    data = json.loads(json.dumps(sketch.to_dict()))
+    restored = QuantileSketch.from_dict(data)
+    assert restored.to_dict() == sketch.to_dict()
+    for q in QUANTILES:
+        assert restored.quantile(q) == pytest.approx(sketch.quantile(q), rel=1e-9)
+
+
+def test_valid_timings():
+    timings = {"load": 120, "dns": 1.5, "textarea": -1, "connect": float("nan"), "request": True, "response": "5", "unknown": 3}
+    assert valid_timings(timings) == {"load": 120.0, "dns": 1.5}
+    assert valid_timings(["load", 120]) == {}
+
+
+def test_store_saves_and_loads(tmp_path):
+    path = tmp_path / "page_timings.json"
+    store = PageTimingStore(path)
+    assert store.record({"load": 800, "textarea": 1200, "bogus": 1}) == ["load", "textarea"]
+    assert store.record({"load": 900}) == ["load"]
+    assert store.record({"bogus": 1}) == []
+    reloaded = PageTimingStore(path)
+    assert reloaded.loads == 2
+    assert reloaded.summary()["load"]["count"] == 2
+    assert reloaded.summary()["load"]["p50"] == pytest.approx(800, rel=0.01)
+    assert list(reloaded.summary()) == ["load", "textarea"]
+
+
+def test_store_ignores_other_versions_and_bad_files(tmp_path):
+    path = tmp_path / "page_timings.json"
+    path.write_text(json.dumps({"version": PAGE_TIMINGS_VERSION + 1, "loads": 5, "phases": {}}))
+    assert PageTimingStore(path).loads == 0
+    path.write_text("{")
+    assert PageTimingStore(path).loads == 0
+
+
+def test_store_decays_past_the_limit(tmp_path):
+    store = PageTimingStore(tmp_path / "page_timings.json", limit=10)
+    for _ in range(11):
+        store.record({"load": 100}, save=False)
+    assert store.sketches["load"].count == pytest.approx(5.5)
+
+
+def test_navigation_timer():
+    clock = FakeClock(0.0)
+    timer = NavigationTimer(clock)
+    assert timer.finish() == {}
+    timer.start()
+    clock.advance(0.2)
+    timer.commit()
+    clock.advance(0.3)
+    assert timer.finish() == pytest.approx({"native-total": 500, "native-provisional": 200, "native-commit-to-finish": 300})
+    timer.start()
+    timer.fail()
+    assert timer.finish() == {}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(0.0)
+
+
+@pytest.fixture
+def run_loop(clock):
+    return FakeRunLoop(clock)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PageTimingStore(tmp_path / "page_timings.json")
+
+
+NATIVE = {"native-total": 900.0, "native-provisional": 300.0, "native-commit-to-finish": 600.0}
+PAGE = {"load": 850.0, "textarea": 1400.0}
+
+
+# The native phases (navigation finished) and then the page's phases make one load.
+def test_native_and_page_phases_are_one_load(store, run_loop):
+    recorder = PageLoadRecorder(store, run_loop.call_later, timeout=35.0)
+    assert recorder.navigation_finished(NATIVE) == []
+    assert store.loads == 0
+    assert recorder.page_timing(PAGE) is True
+    assert store.loads == 1
+    assert set(store.sketches) == set(NATIVE) | set(PAGE)
+    # The pending timeout no longer records anything.
+    run_loop.run()
+    assert store.loads == 1
+    assert recorder.stats()["merged"] == 1
+
+
+def test_page_phases_first(store, run_loop):
+    recorder = PageLoadRecorder(store, run_loop.call_later)
+    recorder.page_timing(PAGE)
+    recorder.navigation_finished(NATIVE)
+    assert store.loads == 1
+    assert set(store.sketches) == set(NATIVE) | set(PAGE)
+
+
+def test_native_phases_are_recorded_alone_after_the_timeout(store, run_loop, clock):
+    recorder = PageLoadRecorder(store, run_loop.call_later, timeout=35.0)
+    recorder.navigation_finished(NATIVE)
+    run_loop.turn()
+    assert clock() == 35.0
+    assert store.loads == 1
+    assert set(store.sketches) == set(NATIVE)
+    # A late page-timing event is then a load of its own.
+    recorder.page_timing(PAGE)
+    run_loop.run()
+    assert store.loads == 2
+    assert recorder.stats()["unmerged"] == 2
+
+
+# A new navigation finishing before the page reported records the older one alone.
+def test_next_navigation_flushes_the_previous_one(store, run_loop):
+    recorder = PageLoadRecorder(store, run_loop.call_later)
+    recorder.navigation_finished(NATIVE)
+    recorder.navigation_finished(dict(NATIVE, **{"native-total": 400.0}))
+    assert store.loads == 1
+    recorder.page_timing(PAGE)
+    assert store.loads == 2
+    run_loop.run()
+    assert store.loads == 2
+    assert store.sketches["native-total"].count == 2
+    assert store.sketches["load"].count == 1
+
+
+def test_invalid_page_timings_are_dropped(store, run_loop):
+    recorder = PageLoadRecorder(store, run_loop.call_later)
+    recorder.navigation_finished(NATIVE)
+    assert recorder.page_timing("not timings") is False
+    assert recorder.page_timing({"load": -5}) is False
+    assert recorder.navigation_finished({}) == []
+    recorder.flush()
+    assert store.loads == 1
+    assert recorder.flush() == []
+
+
+def test_stats_main(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "page_timings.json"
+    monkeypatch.setattr(telemetry, "PageTimingStore", functools.partial(PageTimingStore, path))
+    assert stats_main([]) == 1
+    store = PageTimingStore(path)
+    store.record(dict(NATIVE, **PAGE))
+    assert stats_main([]) == 0
+    out = capsys.readouterr().out
+    assert "over the last ~1 loads" in out
+    assert out.index("native-total") < out.index("textarea")
+    assert stats_main(["--json"]) == 0
+    assert json.loads(capsys.readouterr().out)["loads"] == 1
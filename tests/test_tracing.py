@@ -0,0 +1,126 @@
+# Python libraries
+import json
+import os
+import threading
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.tracing import Tracer
+
+from .fakes import FakeClock
+
+MS = 1_000_000  # Nanoseconds, the unit of the tracer's clock.
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(5 * MS)
+
+
+@pytest.fixture
+def tracer(clock):
+    return Tracer(enabled=True, clock=clock)
+
+
+def complete_events(tracer):
+    return {event["name"]: event for event in tracer.events if event["ph"] == "X"}
+
+
+def test_disabled_tracer_records_nothing(clock):
+    tracer = Tracer(clock=clock)
+    with tracer.span("work"):
+        clock.advance(MS)
+    tracer.begin("navigation")
+    assert tracer.end("navigation") is None
+    tracer.add_span("process", 0.0, 1.0)
+    tracer.instant("ready")
+    assert tracer.events == []
+
+
+# Spans are "X" events with a start (from the origin) and duration in microseconds, and a
+# nested span lies within its parent.
+def test_nested_spans(tracer, clock):
+    with tracer.span("outer", "import", module="app"):
+        clock.advance(2 * MS)
+        with tracer.span("inner"):
+            clock.advance(3 * MS)
+        clock.advance(1 * MS)
+    events = complete_events(tracer)
+    outer, inner = events["outer"], events["inner"]
+    assert (outer["ph"], outer["cat"], outer["ts"], outer["dur"], outer["args"]) == ("X", "import", 0.0, 6000.0, {"module": "app"})
+    assert (inner["ts"], inner["dur"], inner["cat"]) == (2000.0, 3000.0, "startup")
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    # Inner spans end first.
+    assert [event["name"] for event in tracer.events] == ["inner", "outer"]
+    for event in tracer.events:
+        assert (event["pid"], event["tid"]) == (os.getpid(), threading.get_ident())
+
+
+def test_span_is_recorded_when_its_body_raises(tracer, clock):
+    with pytest.raises(RuntimeError):
+        with tracer.span("failing"):
+            clock.advance(MS)
+            raise RuntimeError("boom")
+    assert complete_events(tracer)["failing"]["dur"] == 1000.0
+
+
+def test_begin_and_end(tracer, clock):
+    clock.advance(4 * MS)
+    tracer.begin("first-navigation")
+    clock.advance(250 * MS)
+    assert tracer.end("first-navigation", url="https://grok.com/") == 250.0
+    event = complete_events(tracer)["first-navigation"]
+    assert (event["ts"], event["dur"], event["args"]) == (4000.0, 250000.0, {"url": "https://grok.com/"})
+    # Ending a span that is not open does nothing.
+    assert tracer.end("first-navigation") is None
+    assert len(tracer.events) == 1
+
+
+def test_traced_functions(tracer, clock):
+    @tracer.traced()
+    def load():
+        clock.advance(MS)
+        return "loaded"
+    assert load() == "loaded"
+    assert complete_events(tracer)["test_traced_functions.<locals>.load"]["dur"] == 1000.0
+
+
+# Already measured spans (in seconds from the origin) and instants.
+def test_add_span_and_instant(tracer, clock):
+    tracer.add_span("process start", 0.5, 0.25, category="process")
+    clock.advance(7 * MS)
+    tracer.instant("ready", step=3)
+    span, instant = tracer.events
+    assert (span["ph"], span["cat"], span["ts"], span["dur"]) == ("X", "process", 500000.0, 250000.0)
+    assert (instant["ph"], instant["s"], instant["ts"], instant["args"]) == ("i", "p", 7000.0, {"step": 3})
+    assert "dur" not in instant
+
+
+def test_summary_sums_repeated_spans(tracer, clock):
+    for _ in range(3):
+        with tracer.span("tick"):
+            clock.advance(2 * MS)
+    tracer.instant("done")
+    assert tracer.summary() == {"tick": 6.0}
+
+
+def test_write_chrome_trace(tracer, clock, tmp_path):
+    with tracer.span("startup"):
+        clock.advance(MS)
+    path = tracer.write(tmp_path / "trace.json")
+    assert path == tmp_path / "trace.json"
+    with open(path) as f:
+        trace = json.load(f)
+    assert trace["displayTimeUnit"] == "ms"
+    assert trace["traceEvents"] == tracer.events
+
+
+# Without a path, the trace goes to a timestamped file in the log directory.
+def test_write_to_the_log_directory(tracer, tmp_path, monkeypatch):
+    from macos_grok_overlay import health_checks
+    monkeypatch.setattr(health_checks, "LOG_DIR", tmp_path)
+    path = tracer.write()
+    assert path.parent == tmp_path
+    assert path.name.startswith("startup_trace_") and path.suffix == ".json"
+    assert json.loads(path.read_text())["traceEvents"] == []
@@ -0,0 +1,147 @@
+# Python libraries
+import pytest
+
+# Local libraries
+from macos_grok_overlay.warmth import (
+    DEFAULT_WARMTH_POLICY,
+    STATE_COLD,
+    STATE_CREATED,
+    STATE_LOADING,
+    STATE_READY,
+    WarmthController,
+)
+
+from .fakes import FakeClock
+
+
+# Webview stand-in recording what the controller asks of the page.
+class FakePage:
+    def __init__(self):
+        self.calls = []
+
+    def createWebView(self):
+        self.calls.append("create")
+
+    def loadWebsite_(self, sender):
+        self.calls.append("load")
+
+    def showPlaceholder(self):
+        self.calls.append("show-placeholder")
+
+    def hidePlaceholder(self):
+        self.calls.append("hide-placeholder")
+
+    def focusInput(self):
+        self.calls.append("focus")
+
+
+@pytest.fixture
+def page():
+    return FakePage()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(0.0)
+
+
+def controller(policy, page, clock):
+    return WarmthController(policy, page, clock=clock, memory=lambda: 100 * 2**20)
+
+
+# Launch as the app does: the webview task, then the load task.
+def launch(warmth):
+    warmth.launch()
+    states = [warmth.state]
+    warmth.preload()
+    states.append(warmth.state)
+    return states
+
+
+def test_lazy_creates_and_loads_on_the_first_summon(page, clock):
+    warmth = controller("lazy", page, clock)
+    assert launch(warmth) == [STATE_COLD, STATE_COLD]
+    assert page.calls == []
+    clock.advance(10.0)
+    # Not ready: the placeholder is shown and the input is not focused yet.
+    assert warmth.summon() is False
+    assert warmth.state == STATE_LOADING
+    assert page.calls == ["create", "load", "show-placeholder"]
+    # Summoning again while it loads does not repeat any of it.
+    assert warmth.summon() is False
+    clock.advance(0.8)
+    warmth.navigation_finished()
+    assert warmth.state == STATE_READY
+    assert page.calls == ["create", "load", "show-placeholder", "hide-placeholder", "focus"]
+    assert warmth.stats()["time_to_interactive_ms"] == 800.0
+    assert warmth.stats()["since_launch_ms"] == 10800.0
+    assert warmth.summon() is True
+
+
+def test_warm_loads_at_launch(page, clock):
+    warmth = controller("warm", page, clock)
+    assert launch(warmth) == [STATE_CREATED, STATE_LOADING]
+    assert page.calls == ["create", "load"]
+    clock.advance(0.5)
+    # Hidden when the load finishes, so nothing is focused.
+    warmth.navigation_finished()
+    assert warmth.state == STATE_READY
+    assert page.calls == ["create", "load"]
+    assert warmth.summon() is True
+    warmth.dismiss()
+    assert page.calls == ["create", "load"]
+
+
+def test_warm_summoned_while_loading(page, clock):
+    warmth = controller("warm", page, clock)
+    launch(warmth)
+    assert warmth.summon() is False
+    warmth.navigation_finished()
+    # No placeholder outside the lazy policy, and the visible page gets focus when ready.
+    assert page.calls == ["create", "load", "focus"]
+
+
+def test_hot_keeps_the_input_focused_while_hidden(page, clock):
+    warmth = controller("hot", page, clock)
+    assert launch(warmth) == [STATE_CREATED, STATE_LOADING]
+    warmth.navigation_finished()
+    assert page.calls == ["create", "load", "focus"]
+    # Already focused, so showing needs no page work.
+    assert warmth.summon() is False
+    warmth.dismiss()
+    assert page.calls == ["create", "load", "focus", "focus"]
+
+
+@pytest.mark.parametrize("policy", ["lazy", "warm", "hot"])
+def test_reset_recreates_on_the_next_summon(page, clock, policy):
+    warmth = controller(policy, page, clock)
+    launch(warmth)
+    warmth.summon()
+    warmth.navigation_finished()
+    warmth.dismiss()
+    page.calls.clear()
+    warmth.reset()
+    assert warmth.state == STATE_COLD
+    assert warmth.summon() is False
+    assert page.calls[:2] == ["create", "load"]
+    assert warmth.state == STATE_LOADING
+
+
+def test_later_navigations_do_not_change_state(page, clock):
+    warmth = controller("warm", page, clock)
+    launch(warmth)
+    warmth.navigation_finished()
+    metrics = warmth.stats()
+    clock.advance(5.0)
+    warmth.navigation_finished()
+    assert warmth.stats() == metrics
+    # Before anything was requested, a finished navigation is ignored too.
+    cold = controller("lazy", FakePage(), clock)
+    cold.navigation_finished()
+    assert cold.state == STATE_COLD
+
+
+def test_unknown_policy_falls_back_to_the_default(page, clock):
+    warmth = controller("scorching", page, clock)
+    assert warmth.policy == DEFAULT_WARMTH_POLICY
+    assert warmth.stats()["policy"] == DEFAULT_WARMTH_POLICY
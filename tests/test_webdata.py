@@ -0,0 +1,199 @@
+# Python libraries
+import os
+import threading
+import time
+
+import pytest
+
+# Local libraries
+from macos_grok_overlay.webdata import (
+    WEB_DATA_CATEGORIES,
+    WEB_DATA_PRESETS,
+    WebDataClearer,
+    directory_size,
+    modified_since,
+    resolve_data_types,
+    web_data_directories,
+)
+
+from .fakes import FakeClock
+
+DISK_CACHE = "WKWebsiteDataTypeDiskCache"
+MEMORY_CACHE = "WKWebsiteDataTypeMemoryCache"
+COOKIES = "WKWebsiteDataTypeCookies"
+LOCAL_STORAGE = "WKWebsiteDataTypeLocalStorage"
+
+
+# Website data store stand-in: each item is a (site, data type, modification time) with
+# a file of `size` bytes in `directory`. Completion handlers are queued and only run by
+# `run_pending`, as WebKit calls them later on the main thread.
+class FakeDataStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self.items = []
+        self.pending = []
+        self.removals = []
+
+    def add(self, site, data_type, modified, size=1000):
+        path = os.path.join(self.directory, f"{site}-{data_type}-{len(self.items)}")
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        self.items.append((site, data_type, modified, path))
+
+    def fetch_records(self, types, callback):
+        sites = sorted({site for site, data_type, _, _ in self.items if data_type in types})
+        self.pending.append(lambda: callback(sites))
+
+    def remove(self, types, since, callback):
+        self.removals.append((sorted(types), since))
+        def run():
+            for item in [item for item in self.items if (item[1] in types) and (item[2] >= since)]:
+                self.items.remove(item)
+                os.remove(item[3])
+            callback()
+        self.pending.append(run)
+
+    def run_pending(self):
+        while self.pending:
+            self.pending.pop(0)()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(100_000.0)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FakeDataStore(str(tmp_path))
+    store.add("grok.com", DISK_CACHE, 10_000.0, size=4000)
+    store.add("grok.com", DISK_CACHE, 99_000.0, size=3000)
+    store.add("x.com", DISK_CACHE, 99_500.0, size=2000)
+    store.add("grok.com", COOKIES, 50_000.0, size=100)
+    store.add("grok.com", LOCAL_STORAGE, 50_000.0, size=500)
+    return store
+
+
+# The data directories are measured in the background, queued with the store's callbacks.
+@pytest.fixture
+def clearer(store, clock, tmp_path):
+    return WebDataClearer(store, [str(tmp_path)], clock=clock, background=store.pending.append)
+
+
+def test_resolve_data_types():
+    assert resolve_data_types("cookies") == [COOKIES]
+    assert resolve_data_types(["memory-cache", "disk-cache", "memory-cache"]) == [MEMORY_CACHE] + list(WEB_DATA_CATEGORIES["disk-cache"])
+    for categories in ([], ["cookies", "history"], "everything"):
+        with pytest.raises(ValueError):
+            resolve_data_types(categories)
+
+
+def test_modified_since():
+    assert modified_since(None, 5000.0) == 0.0
+    assert modified_since(3600, 5000.0) == 1400.0
+    with pytest.raises(ValueError):
+        modified_since(-1, 5000.0)
+
+
+def test_presets_name_known_categories():
+    for categories, max_age in WEB_DATA_PRESETS.values():
+        assert resolve_data_types(categories)
+        assert (max_age is None) or (max_age > 0)
+    assert set(WEB_DATA_PRESETS["all"][0]) == set(WEB_DATA_CATEGORIES)
+
+
+def test_clear_reports_records_and_bytes(clearer, store, clock):
+    reports = []
+    types = clearer.clear(["disk-cache"], done=reports.append)
+    assert COOKIES not in types
+    # Nothing is reported until the store has finished.
+    assert reports == []
+    clock.advance(0.25)
+    store.run_pending()
+    [report] = reports
+    assert report == {
+        "categories": ["disk-cache"], "max_age": None, "records_removed": 2, "records_remaining": 0,
+        "bytes_removed": 9000, "duration_ms": 250.0,
+    }
+    assert [item[:2] for item in store.items] == [("grok.com", COOKIES), ("grok.com", LOCAL_STORAGE)]
+    assert clearer.stats() == {"clears": 1, "last": report}
+
+
+# Only data modified within the maximum age is removed, so a site can keep a record.
+def test_clear_recent_data_only(clearer, store, clock):
+    reports = []
+    clearer.clear("disk-cache", max_age=1200, done=reports.append)
+    store.run_pending()
+    assert store.removals == [(sorted(WEB_DATA_CATEGORIES["disk-cache"]), 98_800.0)]
+    [report] = reports
+    assert (report["categories"], report["max_age"]) == (["disk-cache"], 1200)
+    assert (report["records_removed"], report["records_remaining"], report["bytes_removed"]) == (1, 1, 5000)
+
+
+def test_clear_preset(clearer, store):
+    reports = []
+    clearer.clear_preset("cookies", done=reports.append)
+    store.run_pending()
+    assert reports[0]["bytes_removed"] == 100
+    clearer.clear_preset("all", done=reports.append)
+    store.run_pending()
+    assert store.items == []
+    assert reports[1]["categories"] == list(WEB_DATA_CATEGORIES)
+    assert clearer.stats()["clears"] == 2
+    with pytest.raises(ValueError):
+        clearer.clear_preset("history")
+
+
+def test_invalid_request_does_not_touch_the_store(clearer, store):
+    with pytest.raises(ValueError):
+        clearer.clear(["cache"])
+    with pytest.raises(ValueError):
+        clearer.clear(["cookies"], max_age=-5)
+    assert store.pending == []
+    assert clearer.stats() == {"clears": 0, "last": None}
+
+
+def test_clear_without_a_callback(clearer, store):
+    clearer.clear("storage")
+    store.run_pending()
+    assert clearer.stats()["last"]["records_removed"] == 1
+
+
+# Measuring runs on another thread, and its result is handed back through `post`.
+def test_directories_are_measured_off_the_calling_thread(store, tmp_path):
+    measured_on, posted = [], []
+    def size(paths):
+        measured_on.append(threading.current_thread())
+        return 0
+    clearer = WebDataClearer(store, [str(tmp_path)], size=size, post=posted.append)
+    clearer.clear("cookies")
+    for _ in range(2):
+        deadline = time.monotonic() + 10
+        while (not posted) and (time.monotonic() < deadline):
+            time.sleep(0.01)
+        posted.pop(0)()
+        store.run_pending()
+    assert len(measured_on) == 2
+    assert threading.current_thread() not in measured_on
+    assert clearer.stats()["last"]["records_removed"] == 1
+
+
+def test_without_data_directories_nothing_is_measured(store):
+    clearer = WebDataClearer(store, background=None)
+    reports = []
+    clearer.clear("cookies", done=reports.append)
+    store.run_pending()
+    assert (reports[0]["records_removed"], reports[0]["bytes_removed"]) == (1, 0)
+
+
+def test_directory_size(tmp_path):
+    (tmp_path / "a").write_bytes(b"x" * 10)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b").write_bytes(b"x" * 5)
+    assert directory_size([str(tmp_path), str(tmp_path / "missing")]) == 15
+
+
+def test_web_data_directories():
+    directories = web_data_directories("com.example.overlay", home="/Users/me")
+    assert directories[0] == "/Users/me/Library/Caches/com.example.overlay/WebKit"
+    assert "/Users/me/Library/WebKit/com.example.overlay" in directories